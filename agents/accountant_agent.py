@@ -1,8 +1,7 @@
 # In agentic-system/agents/accountant_agent.py
 
 import os
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain.agents import AgentExecutor
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
@@ -10,9 +9,18 @@ from typing import Optional, Dict, Any
 
 # Import the specific tool for this agent
 from tools.budget_tools import get_financial_report
+from services.entity_service import PROJECT, resolve_or_suggest
+from services.serialization_service import to_observation
+from services.prefetch_service import use_prefetched
+from services.llm_service import create_chat_model
+from tools.query_filters import QueryFilterInput
+from agents.react_runtime import create_budgeted_react_agent
+from agents.planner import QueryPlanner
+from config import settings
 
 # --- 1. Define the LLM ---
-llm = ChatGoogleGenerativeAI(
+# create_chat_model wraps Gemini with a timeout, retries and a shared circuit breaker.
+llm = create_chat_model(
     model="gemini-2.0-flash",
     temperature=0,
     convert_system_message_to_human=True
@@ -20,19 +28,36 @@ llm = ChatGoogleGenerativeAI(
 
 # --- 2. Define the Tools with Input Schemas ---
 
-class FinancialReportInput(BaseModel):
+class FinancialReportInput(QueryFilterInput):
     project_name: Optional[str] = Field(None, description="The name of the project. If omitted, a high-level summary of all project budgets will be returned.")
 
 @tool(args_schema=FinancialReportInput)
-def get_financial_report_tool(project_name: Optional[str] = None) -> Dict[str, Any]:
+def get_financial_report_tool(
+    project_name: Optional[str] = None,
+    period: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    project_type: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> str:
     """
     Use this tool to get financial reports.
     If the user asks for a specific project's financials, provide the 'project_name'.
     If the user asks for a general budget overview or a summary of all projects, call this tool without any arguments.
-    **IMPORTANT: If the user's input is a simple greeting like "hi" or a conversational question that does not require specific data, you should respond politely without using a tool. Only use tools when a specific question about data is asked.**
-
+    Project names are matched loosely; if no match is found, the closest known names are returned as 'candidates'.
+    To narrow the results, pass a 'period' (e.g. "this_quarter") or dates, a 'project_type' and/or a 'limit'.
     """
-    return get_financial_report(project_name=project_name)
+    if project_name:
+        canonical, suggestion = resolve_or_suggest(PROJECT, project_name, "project")
+        if suggestion:
+            return to_observation(suggestion)
+        project_name = canonical
+    # The unfiltered overview is usually already being fetched in the background (see prefetch_service).
+    return to_observation(use_prefetched(
+        "get_financial_report", get_financial_report,
+        project_name=project_name, start_date=start_date, end_date=end_date,
+        period=period, project_type=project_type, limit=limit,
+    ))
 
 
 # A list of all tools the Accountant Agent can use.
@@ -48,25 +73,28 @@ Answer the user's questions based on the data you retrieve from your financial t
 
 IMPORTANT BEHAVIOR RULES:
 
-If the user's input is a simple greeting (e.g., “hi”, “hello”, “good morning”) or small talk (e.g., “how are you?”, “what’s up?”, “thank you”), you should respond politely and conversationally without using any tools.
+If the user's input is a simple greeting (e.g., “hi”, “hello”) or small talk (e.g., “how are you?”, “thank you”), do not use any tools. Reply in the format below with a single line, e.g.:
+Thought: This is small talk, no tool is needed.
+Final Answer: Hello! Which project's finances can I help you with?
 
 Only use tools when the question involves a request for specific financial data.
 
-If the user says something ambiguous or vague, ask a clarifying question first.
+If the user says something ambiguous or vague, ask a clarifying question as your Final Answer.
+
 You have access to the following tools:
 
 {tools}
 
-To answer the user's question, you must use the following format:
+Always use the following format:
 
 Question: the input question you must answer
-Thought: I need to determine if the user is asking for a specific project's financials or a general summary.
+Thought: decide whether the user is asking for a specific project's financials or a general summary.
 Action: the action to take, which should be one of [{tool_names}]
-Action Input: the input to the action, as a JSON object. For a specific project, it would be {"project_name": "Project Name"}. For a general summary, it would be an empty object {}.
+Action Input: the input to the action, as a JSON object. For a specific project: {{"project_name": "Project Name"}}. For a general summary: {{}}.
 Observation: the result of the action
 ... (this Thought/Action/Action Input/Observation can repeat N times)
 Thought: I now have the financial data and can answer the user's question.
-Final Answer: Provide a clear, structured summary of the financial data. For example, list the project budget, then activity budgets, then rebates.
+Final Answer: a clear, structured summary of the financial data, e.g. the project budget, then activity budgets, then rebates.
 
 Begin!
 
@@ -78,7 +106,8 @@ prompt = ChatPromptTemplate.from_template(prompt_template)
 
 
 # --- 4. Create the Agent ---
-accountant_agent = create_react_agent(llm, accountant_tools, prompt)
+# Like create_react_agent, plus scratchpad trimming and a prompt token budget per question.
+accountant_agent = create_budgeted_react_agent(llm, accountant_tools, prompt, agent_name="accountant")
 
 
 # --- 5. Create the Agent Executor ---
@@ -87,6 +116,12 @@ accountant_agent_executor = AgentExecutor(
     tools=accountant_tools,
     verbose=True,
     handle_parsing_errors=True,
+    max_iterations=settings.AGENT_MAX_ITERATIONS,
 )
 
+
+# --- 6. Create the Query Planner ---
+# Compound questions are split into concurrent tool calls instead of one ReAct round trip per part.
+accountant_planner = QueryPlanner(llm, accountant_tools, role="accountant")
+
 print("Accountant Agent and Executor created successfully.")
\ No newline at end of file
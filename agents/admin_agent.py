@@ -1,8 +1,7 @@
 # In agentic-system/agents/admin_agent.py
 
 import os
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain.agents import AgentExecutor
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
@@ -11,10 +10,18 @@ from typing import Optional, Dict, Any
 # Import all the tools this agent will have access to
 from tools.performance_tools import get_staff_performance
 from tools.project_tools import get_data_by_village, get_projects_by_beneficiary
+from services.entity_service import STAFF, VILLAGE, resolve_or_suggest
+from services.serialization_service import to_observation
+from services.llm_service import create_chat_model
+from tools.query_filters import QueryFilterInput
+from agents.react_runtime import create_budgeted_react_agent
+from agents.planner import QueryPlanner
+from config import settings
 
 # --- 1. Define the LLM ---
+# create_chat_model wraps Gemini with a timeout, retries and a shared circuit breaker.
 # We can reuse the same LLM configuration.
-llm = ChatGoogleGenerativeAI(
+llm = create_chat_model(
     model="gemini-2.0-flash",
     temperature=0,
     convert_system_message_to_human=True
@@ -23,41 +30,76 @@ llm = ChatGoogleGenerativeAI(
 # --- 2. Define the Tools with Input Schemas ---
 # We create a clear Pydantic schema for each tool's input to ensure reliability.
 
-class StaffPerformanceInput(BaseModel):
+class StaffPerformanceInput(QueryFilterInput):
     staff_name: Optional[str] = Field(None, description="The full name of the staff member. If omitted, a summary for all staff will be returned.")
 
 @tool(args_schema=StaffPerformanceInput)
-def get_staff_performance_tool(staff_name: Optional[str] = None) -> Dict[str, Any]:
+def get_staff_performance_tool(
+    staff_name: Optional[str] = None,
+    period: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    project_type: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> str:
     """
     Use this tool to get a performance summary for a specific staff member or for all staff members.
     If you know the staff member's name, provide it. Otherwise, you can leave it empty to get a report on everyone.
+    Names are matched loosely; if no match is found, the closest known names are returned as 'candidates'.
+    To narrow the results, pass a 'period' (e.g. "this_quarter") or dates, a 'project_type' and/or a 'limit'.
     """
-    return get_staff_performance(staff_name=staff_name)
-
-
-class VillageDataInput(BaseModel):
+    if staff_name:
+        # Map loosely typed names ("ramesh", "Ramesh K.") onto the stored spelling.
+        canonical, suggestion = resolve_or_suggest(STAFF, staff_name, "staff member")
+        if suggestion:
+            return to_observation(suggestion)
+        staff_name = canonical
+    return to_observation(get_staff_performance(
+        staff_name=staff_name, start_date=start_date, end_date=end_date,
+        period=period, project_type=project_type, limit=limit,
+    ))
+
+
+class VillageDataInput(QueryFilterInput):
     village_name: Optional[str] = Field(None, description="The name of the village. If omitted, a summary for all villages will be returned.")
 
 @tool(args_schema=VillageDataInput)
-def get_data_by_village_tool(village_name: Optional[str] = None) -> Dict[str, Any]:
+def get_data_by_village_tool(
+    village_name: Optional[str] = None,
+    period: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    project_type: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> str:
     """
     Use this tool to get a summary of projects and activities related to a specific village or all villages.
     If you know the village name, provide it. Otherwise, leave it empty for a full summary.
+    Names are matched loosely; if no match is found, the closest known names are returned as 'candidates'.
+    To narrow the results, pass a 'period' (e.g. "this_quarter") or dates, a 'project_type' and/or a 'limit'.
     """
-    return get_data_by_village(village_name=village_name)
+    if village_name:
+        canonical, suggestion = resolve_or_suggest(VILLAGE, village_name, "village")
+        if suggestion:
+            return to_observation(suggestion)
+        village_name = canonical
+    return to_observation(get_data_by_village(
+        village_name=village_name, start_date=start_date, end_date=end_date,
+        period=period, project_type=project_type, limit=limit,
+    ))
 
 
 class BeneficiaryProjectsInput(BaseModel):
     beneficiary_name: str = Field(..., description="The name of the beneficiary group or individual to search for.")
 
 @tool(args_schema=BeneficiaryProjectsInput)
-def get_projects_by_beneficiary_tool(beneficiary_name: str) -> Dict[str, Any]:
+def get_projects_by_beneficiary_tool(beneficiary_name: str) -> str:
     """
 
     Use this tool to find all projects and activities associated with a specific beneficiary.
     You must provide the beneficiary's name.
     """
-    return get_projects_by_beneficiary(beneficiary_name=beneficiary_name)
+    return to_observation(get_projects_by_beneficiary(beneficiary_name=beneficiary_name))
 
 
 # A list of all tools the Admin Agent can use.
@@ -77,27 +119,30 @@ Answer the user's question based on the data you retrieve from the tools.
 
 IMPORTANT BEHAVIOR RULES:
 
-If the user's input is a simple greeting (e.g., “hi”, “hello”, “good morning”) or small talk (e.g., “how are you?”, “what’s up?”, “thank you”), you should respond politely and conversationally without using any tools.
-
-Example: If the user says “How are you?”, just say something like “I’m doing great, thank you! How can I support your work today?”
+If the user's input is a simple greeting (e.g., “hi”, “hello”) or small talk (e.g., “how are you?”, “thank you”), do not use any tools. Reply in the format below with a single line, e.g.:
+Thought: This is small talk, no tool is needed.
+Final Answer: I’m doing great, thank you! How can I support your work today?
 
 Only use tools when the question involves a request for specific data related to staff, village, or beneficiaries.
+Prefer narrowing a tool call (a name, a period, a project type) over fetching a summary for everyone.
+
+If the user says something ambiguous or vague, ask a clarifying question as your Final Answer.
 
-If the user says something ambiguous or vague, ask a clarifying question first.
 You have access to the following tools:
 
 {tools}
 
-To answer the user's question, you must use the following format:
+Always use the following format:
 
 Question: the input question you must answer
-Thought: you should always think about what to do and which tool is most appropriate. If no tool is needed, I will just provide a conversational response.
+Thought: think about what to do and which tool is most appropriate.
 Action: the action to take, should be one of [{tool_names}]
 Action Input: the input to the action, as a JSON object matching the tool's input schema.
 Observation: the result of the action
 ... (this Thought/Action/Action Input/Observation can repeat N times)
 Thought: I now know the final answer
 Final Answer: the final answer to the original input question. Provide a clear and concise summary of the findings.
+
 Begin!
 
 Question: {input}
@@ -108,7 +153,8 @@ prompt = ChatPromptTemplate.from_template(prompt_template)
 
 
 # --- 4. Create the Agent ---
-admin_agent = create_react_agent(llm, admin_tools, prompt)
+# Like create_react_agent, plus scratchpad trimming and a prompt token budget per question.
+admin_agent = create_budgeted_react_agent(llm, admin_tools, prompt, agent_name="admin")
 
 
 # --- 5. Create the Agent Executor ---
@@ -117,6 +163,12 @@ admin_agent_executor = AgentExecutor(
     tools=admin_tools,
     verbose=True,
     handle_parsing_errors=True,
+    max_iterations=settings.AGENT_MAX_ITERATIONS,
 )
 
+
+# --- 6. Create the Query Planner ---
+# Compound questions are split into concurrent tool calls instead of one ReAct round trip per part.
+admin_planner = QueryPlanner(llm, admin_tools, role="admin")
+
 print("Admin Agent and Executor created successfully.")
\ No newline at end of file
@@ -0,0 +1,250 @@
+# In agentic-system/agents/planner.py
+
+import asyncio
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import BaseTool, render_text_description_and_args
+
+from config import settings
+from services.cancellation_service import record_llm_tokens
+from services.deadline_service import check_deadline
+from services.metrics_service import metrics
+from services.serialization_service import dumps_str, estimate_tokens, loads
+
+# ==============================================================================
+#  Compound questions ("how are Ramesh and Sita doing, and what's happening in
+#  village X?") cost the ReAct loop one LLM round trip per tool call, all in
+#  sequence. The planner asks the LLM once for the independent tool calls the
+#  question needs, runs them concurrently, and writes the answer in a single
+#  synthesis call: two LLM calls however many parts the question has.
+#  Questions that are not compound (or whose plan cannot be used) go to the
+#  role's ReAct agent as before; a cheap wording check keeps most of those
+#  from paying for a planning call at all.
+#
+#  The same plan-and-run steps serve the structured response mode, where the
+#  tool results go to the client as JSON and the LLM only writes a summary.
+# ==============================================================================
+
+metrics.describe("planner_total", "Questions seen by the query planner, by role and outcome (planned, single, skipped, invalid).")
+metrics.describe("planner_seconds", "Time spent on the planning LLM call, by role and outcome.")
+metrics.describe("planner_calls", "Concurrent tool calls per planned question, by role.")
+metrics.describe("structured_output_tokens_saved_total", "Estimated output tokens not generated because tool data was passed through as JSON, by role.")
+
+# Words and punctuation that join several requests in one question.
+_COMPOUND_PATTERN = re.compile(r"\b(and|also|plus|as well as|along with|together with|both)\b|[,;&]|\?.+\S", re.IGNORECASE)
+_JSON_FENCE_PATTERN = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+PLANNER_PROMPT_TEMPLATE = """
+You prepare the data lookups for the {role} assistant of an NGO. Split the user's question into independent sub-questions that are each answered by exactly one tool call.
+
+Tools:
+{tools}
+
+Rules:
+- Only split questions that ask for several independent things (for example two staff members and a village). Otherwise return the one call it needs.
+- Every call must use one of the tools above, with arguments that match its input schema. Leave out the arguments you do not need.
+- Use at most {max_calls} calls.
+- For greetings, small talk or vague questions, return no calls.
+
+Respond with JSON only, in this form:
+{{"calls": [{{"question": "the sub-question", "tool": "tool_name", "args": {{"name_of_argument": "value"}}}}]}}
+
+Question: {input}
+"""
+
+SYNTHESIS_PROMPT_TEMPLATE = """
+You are a {role} assistant for our organization. Answer the user's question using only the tool results below, which were gathered for its parts.
+Provide a clear and concise summary of the findings for every part. If a result is an error or lists 'candidates' instead of data, say so for that part and mention the candidates.
+
+Question: {input}
+
+{results}
+
+Answer:
+"""
+
+# In structured mode the client shows the tool data itself, so the LLM only writes a caption.
+SUMMARY_PROMPT_TEMPLATE = """
+You are a {role} assistant for our organization. The data below answers the user's question and is shown to them in full, as a table or list.
+Write one or two sentences that summarise what it shows (for example how many records there are, or what stands out). Do not repeat the data item by item.
+If a result is an error or lists 'candidates' instead of data, say so briefly.
+
+Question: {input}
+
+{results}
+
+Summary:
+"""
+
+planner_prompt = PromptTemplate.from_template(PLANNER_PROMPT_TEMPLATE)
+synthesis_prompt = PromptTemplate.from_template(SYNTHESIS_PROMPT_TEMPLATE)
+summary_prompt = PromptTemplate.from_template(SUMMARY_PROMPT_TEMPLATE)
+
+
+def looks_compound(query: str) -> bool:
+    """True if the wording suggests several requests in one question; short questions never qualify."""
+    return len(query.split()) >= 5 and bool(_COMPOUND_PATTERN.search(query))
+
+
+def _text_of(message: Any) -> str:
+    return str(getattr(message, "content", message)).strip()
+
+
+def _as_data(observation: str) -> Any:
+    # Tool wrappers return their result as JSON text (see to_observation); hand it on as JSON.
+    try:
+        return loads(observation)
+    except ValueError:
+        return observation
+
+
+class QueryPlanner:
+    """
+    Plans, runs and answers compound questions (and structured-mode questions) for one role's tools.
+
+    Args:
+        llm: The chat model (normally the role agent's ResilientLLM).
+        tools: The role's agent tools.
+        role: The role label used in prompts, logs and metrics.
+        max_calls: At most this many tool calls per question.
+        max_prompt_tokens: Ceiling for the synthesis prompt; tool results are cut to fit.
+    """
+
+    def __init__(
+        self,
+        llm: Any,
+        tools: Sequence[BaseTool],
+        role: str,
+        max_calls: int = settings.PLANNER_MAX_CALLS,
+        max_prompt_tokens: int = settings.AGENT_MAX_PROMPT_TOKENS,
+    ):
+        self.llm = llm
+        self.tools = {t.name: t for t in tools}
+        self.role = role
+        self.max_calls = max_calls
+        self.max_prompt_tokens = max_prompt_tokens
+        self._rendered_tools = render_text_description_and_args(list(tools))
+
+    async def plan(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        """Asks the LLM for the tool calls; None if the answer is not a usable plan."""
+        prompt_text = planner_prompt.format(role=self.role, tools=self._rendered_tools, max_calls=self.max_calls, input=query)
+        record_llm_tokens(spent=estimate_tokens(prompt_text))
+        message = await self.llm.ainvoke(prompt_text)
+        try:
+            plan = loads(_JSON_FENCE_PATTERN.sub("", _text_of(message)))
+            calls = plan["calls"]
+        except (ValueError, KeyError, TypeError):
+            return None
+        if not isinstance(calls, list):
+            return None
+        for call in calls:
+            if not isinstance(call, dict) or call.get("tool") not in self.tools or not isinstance(call.get("args", {}), dict):
+                return None
+        return calls[:self.max_calls]
+
+    async def _timed_plan(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        """plan(), recording the planning call's time and outcome."""
+        started = time.monotonic()
+        calls = await self.plan(query)
+        outcome = "invalid" if calls is None else "single" if len(calls) < 2 else "planned"
+        metrics.inc("planner_total", role=self.role, outcome=outcome)
+        metrics.observe("planner_seconds", time.monotonic() - started, role=self.role, outcome=outcome)
+        return calls
+
+    async def _run_calls(self, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        metrics.observe("planner_calls", len(calls), role=self.role)
+        return list(await asyncio.gather(*(self._run_call(call) for call in calls)))
+
+    async def _run_call(self, call: Dict[str, Any]) -> Dict[str, Any]:
+        tool = self.tools[call["tool"]]
+        args = call.get("args") or {}
+        try:
+            # Sync tools run in the executor with a copy of this context (read ledger, deadline).
+            observation = await tool.ainvoke(args)
+        except Exception as e:
+            observation = f"Error: the tool call failed ({e})."
+        return {"question": call.get("question") or "", "tool": tool.name, "tool_input": args, "observation": str(observation)}
+
+    def _results_prompt(self, template: PromptTemplate, query: str, steps: List[Dict[str, Any]], max_tokens: int) -> str:
+        def render(limit: Optional[int]) -> str:
+            parts = []
+            for number, step in enumerate(steps, start=1):
+                observation = step["observation"]
+                if limit is not None and len(observation) > limit:
+                    observation = observation[:limit] + " ...(cut to fit)"
+                parts.append(
+                    f"Part {number}: {step['question']}\n"
+                    f"Tool: {step['tool']} {dumps_str(step['tool_input'])}\n"
+                    f"Result: {observation}"
+                )
+            return template.format(role=self.role, input=query, results="\n\n".join(parts))
+
+        prompt_text = render(None)
+        if max_tokens and estimate_tokens(prompt_text) > max_tokens:
+            # Share what is left of the budget equally between the results.
+            overhead = len(render(0))
+            prompt_text = render(max((max_tokens * 4 - overhead) // len(steps), 200))
+        return prompt_text
+
+    async def answer(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Answers a compound question through concurrent tool calls.
+
+        Returns:
+            {"output", "partial", "planned_steps"} like an agent result, or None when the
+            question should go to the ReAct agent instead (not compound, or no usable plan).
+        """
+        if not looks_compound(query):
+            metrics.inc("planner_total", role=self.role, outcome="skipped")
+            return None
+
+        calls = await self._timed_plan(query)
+        if calls is None or len(calls) < 2:
+            # One call (or none) gains nothing over the ReAct loop, which also handles clarifications.
+            print(f"Planner ({self.role}): no compound plan, handing the question to the agent.")
+            return None
+
+        print(f"Planner ({self.role}): running {len(calls)} tool calls concurrently.")
+        steps = await self._run_calls(calls)
+
+        check_deadline("the answer synthesis")
+        prompt_text = self._results_prompt(synthesis_prompt, query, steps, self.max_prompt_tokens)
+        record_llm_tokens(spent=estimate_tokens(prompt_text))
+        message = await self.llm.ainvoke(prompt_text)
+        return {"output": _text_of(message), "partial": False, "planned_steps": steps}
+
+    async def answer_structured(self, query: str, calls: Optional[List[Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Answers with the tool results themselves: the output is {"summary", "data"}, where
+        'data' holds each tool call and its JSON result and the LLM only writes the summary.
+
+        Args:
+            query: The user's question.
+            calls: The tool calls to make, when the caller already knows them (the staff
+                role has a single tool); otherwise they are planned from the question.
+
+        Returns:
+            An agent-like result, or None when there is no data to look up (small talk,
+            unclear questions), so the agent should answer in prose.
+        """
+        if calls is None:
+            calls = await self._timed_plan(query)
+        if not calls:
+            return None
+
+        steps = await self._run_calls(calls)
+        check_deadline("the summary")
+        # The summary only needs a glimpse of the data; the client gets all of it.
+        prompt_text = self._results_prompt(summary_prompt, query, steps, settings.STRUCTURED_SUMMARY_MAX_PROMPT_TOKENS)
+        record_llm_tokens(spent=estimate_tokens(prompt_text))
+        summary = _text_of(await self.llm.ainvoke(prompt_text))
+
+        data = [{"tool": step["tool"], "tool_input": step["tool_input"], "result": _as_data(step["observation"])} for step in steps]
+        # Writing the data out as prose would take at least as many tokens as the data itself.
+        saved = sum(estimate_tokens(step["observation"]) for step in steps) - estimate_tokens(summary)
+        if saved > 0:
+            metrics.inc("structured_output_tokens_saved_total", saved, role=self.role)
+        return {"output": {"summary": summary, "data": data}, "partial": False, "planned_steps": steps}
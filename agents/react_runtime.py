@@ -0,0 +1,196 @@
+# In agentic-system/agents/react_runtime.py
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from langchain.agents.output_parsers import ReActSingleInputOutputParser
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from langchain_core.tools import BaseTool, render_text_description
+
+from config import settings
+from services.cancellation_service import record_llm_tokens
+from services.deadline_service import remaining_time
+from services.metrics_service import metrics
+from services.serialization_service import estimate_tokens, estimate_tokens_for_length
+
+# ==============================================================================
+#  A drop-in replacement for create_react_agent that keeps the prompt in check.
+#  The standard ReAct agent re-sends the whole Thought/Action/Observation log
+#  on every iteration, so a question that pulls a large summary pays for it
+#  again on every following call. This runtime:
+#    - keeps only the newest observations verbatim and cuts older ones to a preview,
+#    - estimates the prompt tokens of every iteration and records them as metrics,
+#    - stops with a partial answer instead of calling the LLM once a question's
+#      total prompt tokens would exceed AGENT_MAX_PROMPT_TOKENS, or when the
+#      request deadline leaves less than AGENT_MIN_ITERATION_SECONDS.
+#  Iterations themselves are capped on each AgentExecutor (AGENT_MAX_ITERATIONS).
+# ==============================================================================
+
+metrics.describe("agent_prompt_tokens", "Estimated prompt tokens per agent iteration, by agent and iteration.")
+metrics.describe("agent_completion_tokens", "Estimated completion tokens per agent iteration, by agent.")
+metrics.describe("agent_question_prompt_tokens", "Estimated prompt tokens per question across all iterations, by agent.")
+metrics.describe("agent_iterations", "LLM iterations per question, by agent.")
+metrics.describe("agent_early_stops_total", "Questions stopped early with a partial answer, by agent and reason (tokens, deadline).")
+
+# The stop sequence create_react_agent uses, so the model does not invent its own observations.
+_STOP = ["\nObservation"]
+_PARTIAL_PREVIEW_CHARS = 1500
+
+
+def _time_is_short() -> bool:
+    remaining = remaining_time()
+    return remaining is not None and remaining < settings.AGENT_MIN_ITERATION_SECONDS
+
+
+def format_scratchpad(
+    steps: Sequence[Tuple[AgentAction, Any]],
+    keep_recent: int = settings.AGENT_SCRATCHPAD_KEEP_STEPS,
+    old_observation_chars: int = settings.AGENT_OLD_OBSERVATION_CHARS,
+) -> str:
+    """
+    Builds the ReAct scratchpad like format_log_to_str, but only the last 'keep_recent'
+    observations are included in full. The model has already reasoned about older
+    ones; a preview is enough to keep the thread of the conversation.
+    """
+    first_recent = len(steps) - max(keep_recent, 0)
+    return "".join(
+        _scratchpad_entry(action, observation, index < first_recent, old_observation_chars)
+        for index, (action, observation) in enumerate(steps)
+    )
+
+
+def _scratchpad_entry(action: AgentAction, observation: Any, shorten: bool, old_observation_chars: int) -> str:
+    text = str(observation)
+    if shorten and len(text) > old_observation_chars:
+        text = f"{text[:old_observation_chars]} ... [{len(text) - old_observation_chars} more characters omitted; already summarised above]"
+    return f"{action.log}\nObservation: {text}\nThought: "
+
+
+def earlier_scratchpad_lengths(
+    steps: Sequence[Tuple[AgentAction, Any]],
+    keep_recent: int = settings.AGENT_SCRATCHPAD_KEEP_STEPS,
+    old_observation_chars: int = settings.AGENT_OLD_OBSERVATION_CHARS,
+) -> List[int]:
+    """
+    len(format_scratchpad(steps[:k])) for every k < len(steps): the scratchpads the earlier
+    iterations sent. Each step is formatted once in full and once shortened, instead of
+    building every earlier scratchpad again.
+    """
+    full = [len(_scratchpad_entry(action, observation, False, old_observation_chars)) for action, observation in steps]
+    short = [len(_scratchpad_entry(action, observation, True, old_observation_chars)) for action, observation in steps]
+    lengths = []
+    for k in range(len(steps)):
+        first_recent = max(k - max(keep_recent, 0), 0)
+        lengths.append(sum(short[:first_recent]) + sum(full[first_recent:k]))
+    return lengths
+
+
+# Why an agent stopped early: (metric label, log line, what the user is told).
+_STOP_REASONS = {
+    "tokens": (
+        "prompt token budget reached",
+        "I had to stop before finishing because answering this question needs more data than one answer allows.",
+    ),
+    "deadline": (
+        "request deadline approaching",
+        "I had to stop before finishing because this request ran out of time.",
+    ),
+}
+
+
+def _partial_finish(steps: Sequence[Tuple[AgentAction, Any]], agent_name: str, reason: str) -> AgentFinish:
+    log_text, message = _STOP_REASONS[reason]
+    metrics.inc("agent_early_stops_total", agent=agent_name, reason=reason)
+    print(f"{agent_name}: {log_text}; returning a partial answer.")
+    output = message + " Please ask a narrower question (a name, a period or a project type)."
+    if steps:
+        last = str(steps[-1][1])
+        preview = last[:_PARTIAL_PREVIEW_CHARS] + (" ..." if len(last) > _PARTIAL_PREVIEW_CHARS else "")
+        output += f"\n\nThe data retrieved so far was:\n{preview}"
+    return AgentFinish(return_values={"output": output, "partial": True}, log=f"Stopped early: {log_text}.")
+
+
+def create_budgeted_react_agent(
+    llm: Runnable,
+    tools: Sequence[BaseTool],
+    prompt: BasePromptTemplate,
+    agent_name: str,
+    max_prompt_tokens: int = settings.AGENT_MAX_PROMPT_TOKENS,
+) -> Runnable:
+    """
+    Same contract as langchain's create_react_agent (the prompt needs 'tools', 'tool_names',
+    'input' and 'agent_scratchpad'), with scratchpad trimming and prompt token accounting.
+
+    Args:
+        llm: The chat model (normally a ResilientLLM).
+        tools: The tools the agent may call.
+        prompt: The ReAct prompt template.
+        agent_name: Label used in logs and metrics.
+        max_prompt_tokens: Estimated prompt tokens allowed per question, summed over iterations.
+    """
+    missing = {"tools", "tool_names", "agent_scratchpad"}.difference(prompt.input_variables + list(prompt.partial_variables))
+    if missing:
+        raise ValueError(f"Prompt missing required variables: {missing}")
+
+    prompt = prompt.partial(
+        tools=render_text_description(list(tools)),
+        tool_names=", ".join(t.name for t in tools),
+    )
+    llm_with_stop = llm.bind(stop=_STOP)
+    parser = ReActSingleInputOutputParser()
+
+    def render(inputs: Dict[str, Any], steps: Sequence[Tuple[AgentAction, Any]]):
+        values = {key: value for key, value in inputs.items() if key != "intermediate_steps"}
+        return prompt.invoke({**values, "agent_scratchpad": format_scratchpad(steps)})
+
+    def prepare(inputs: Dict[str, Any]):
+        """Renders this iteration's prompt; returns (prompt, None) or (None, AgentFinish) when over budget."""
+        steps = list(inputs.get("intermediate_steps", []))
+        prompt_value = render(inputs, steps)
+        tokens = estimate_tokens(prompt_value.to_string())
+        # The earlier prompts differ from this one only in their scratchpad, so their sizes follow
+        # from the prompt without one and the scratchpad lengths; none of them is rendered again.
+        spent = 0
+        if steps:
+            base = len(render(inputs, []).to_string())
+            spent = sum(estimate_tokens_for_length(base + length) for length in earlier_scratchpad_lengths(steps))
+        metrics.observe("agent_prompt_tokens", tokens, agent=agent_name, iteration=len(steps) + 1)
+        stop_reason = None
+        if max_prompt_tokens and spent + tokens > max_prompt_tokens:
+            stop_reason = "tokens"
+        elif steps and _time_is_short():
+            # With data already gathered, a partial answer now beats a timeout with nothing.
+            stop_reason = "deadline"
+        if stop_reason:
+            metrics.observe("agent_question_prompt_tokens", spent, agent=agent_name)
+            metrics.observe("agent_iterations", len(steps), agent=agent_name)
+            return None, _partial_finish(steps, agent_name, stop_reason)
+        record_llm_tokens(spent=tokens)
+        return prompt_value, spent + tokens
+
+    def finish(message: Any, steps_taken: int, total_tokens: int) -> Union[AgentAction, AgentFinish]:
+        text = getattr(message, "content", message)
+        metrics.observe("agent_completion_tokens", estimate_tokens(str(text)), agent=agent_name)
+        decision = parser.invoke(message)
+        if isinstance(decision, AgentFinish):
+            metrics.observe("agent_question_prompt_tokens", total_tokens, agent=agent_name)
+            metrics.observe("agent_iterations", steps_taken + 1, agent=agent_name)
+        return decision
+
+    def plan(inputs: Dict[str, Any], config: Optional[RunnableConfig] = None):
+        prompt_value, budget_result = prepare(inputs)
+        if prompt_value is None:
+            return budget_result
+        message = llm_with_stop.invoke(prompt_value, config)
+        return finish(message, len(inputs.get("intermediate_steps", [])), budget_result)
+
+    async def aplan(inputs: Dict[str, Any], config: Optional[RunnableConfig] = None):
+        prompt_value, budget_result = prepare(inputs)
+        if prompt_value is None:
+            return budget_result
+        message = await llm_with_stop.ainvoke(prompt_value, config)
+        return finish(message, len(inputs.get("intermediate_steps", [])), budget_result)
+
+    return RunnableLambda(plan, afunc=aplan, name=agent_name)
+
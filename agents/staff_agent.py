@@ -1,19 +1,25 @@
 # In agentic-system/agents/staff_agent.py
 
 import os
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain.agents import AgentExecutor
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
 
 # Import the specific tool for this agent
 from tools.performance_tools import get_my_performance
+from services.serialization_service import to_observation
+from services.prefetch_service import use_prefetched
+from services.llm_service import create_chat_model
+from agents.react_runtime import create_budgeted_react_agent
+from agents.planner import QueryPlanner
+from config import settings
 
 # --- 1. Define the LLM ---
+# create_chat_model wraps Gemini with a timeout, retries and a shared circuit breaker.
 # Initialize the Gemini model from Google AI Studio.
 # Make sure GOOGLE_API_KEY is set in your .env file.
-llm = ChatGoogleGenerativeAI(
+llm = create_chat_model(
     model="gemini-2.0-flash",
     temperature=0,
     convert_system_message_to_human=True # Helps with some models
@@ -35,7 +41,8 @@ def get_my_performance_tool(user_id: str) -> str:
 
     """
     # This is a wrapper. The actual logic is in the imported function.
-    return get_my_performance(user_id=user_id)
+    # The result is usually already being fetched in the background (see prefetch_service).
+    return to_observation(use_prefetched("get_my_performance", get_my_performance, user_id=user_id))
 
 
 # A list of all tools the Staff Agent can use.
@@ -50,28 +57,28 @@ staff_tools = [
 prompt_template = """
 You are a helpful assistant for our organization's staff members.
 Your goal is to answer their questions about their own work assignments.
+The person asking has the user_id "{user_id}". Always pass exactly this value to the tool.
 
 IMPORTANT BEHAVIOR RULES:
 
-If the user's input is a simple greeting (e.g., “hi”, “hello”, “good morning”) or small talk (e.g., “how are you?”, “what’s up?”, “thank you”), you should respond politely and conversationally in a natural sentence, without using any tools or following the format below.
+If the user's input is a simple greeting (e.g., “hi”, “hello”) or small talk (e.g., “how are you?”, “thank you”), do not use any tools. Reply in the format below with a single line, e.g.:
+Thought: This is small talk, no tool is needed.
+Final Answer: I’m doing well, thank you! How can I assist you today?
 
-Example: If the user says “How are you?”, just say something like “I’m doing well, thank you! How can I assist you today?”
+Only use tools when the question asks about the user's own projects or activities.
 
-Only use tools when the question involves a request for specific financial data.
-
-If the user says something ambiguous or vague, ask a clarifying question first.
+If the user says something ambiguous or vague, ask a clarifying question as your Final Answer.
 
 You have access to the following tools:
 
-
 {tools}
 
-To answer the user's question, you must use the following format:
+Always use the following format:
 
 Question: the input question you must answer
 Thought: you should always think about what to do.
 Action: the action to take, should be one of [{tool_names}]
-Action Input: the input to the action, which must be a JSON object matching the tool's schema. For example: {{"user_id": "some_user_id_abc123"}}
+Action Input: the input to the action, as a JSON object matching the tool's schema, e.g. {{"user_id": "{user_id}"}}
 Observation: the result of the action
 ... (this Thought/Action/Action Input/Observation can repeat N times)
 Thought: I now know the final answer
@@ -87,8 +94,9 @@ prompt = ChatPromptTemplate.from_template(prompt_template)
 
 
 # --- 4. Create the Agent ---
-# The create_react_agent function binds the LLM, tools, and prompt together.
-staff_agent = create_react_agent(llm, staff_tools, prompt)
+# create_budgeted_react_agent binds the LLM, tools, and prompt together like create_react_agent,
+# and additionally trims old observations and caps the prompt tokens spent per question.
+staff_agent = create_budgeted_react_agent(llm, staff_tools, prompt, agent_name="staff")
 
 
 # --- 5. Create the Agent Executor ---
@@ -101,6 +109,13 @@ staff_agent_executor = AgentExecutor(
     tools=staff_tools,
     verbose=True, # Set to True to see the agent's thoughts and actions in the console. Great for debugging.
     handle_parsing_errors=True,
+    max_iterations=settings.AGENT_MAX_ITERATIONS,
 )
 
+
+# --- 6. Create the Query Planner ---
+# Staff have a single tool, so the planner is only used for structured responses,
+# where the chat router supplies the one call itself.
+staff_planner = QueryPlanner(llm, staff_tools, role="staff")
+
 print("Staff Agent and Executor created successfully.")
\ No newline at end of file
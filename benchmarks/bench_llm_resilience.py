@@ -0,0 +1,68 @@
+# In agentic-system/benchmarks/bench_llm_resilience.py
+#
+# Exercises ResilientLLM against FakeLLM. Run from the project root:
+#   python -m benchmarks.bench_llm_resilience
+#
+# 1. Tail latency with and without hedging on a heavy-tailed upstream.
+# 2. Retries absorbing a moderate error rate.
+# 3. The circuit breaker opening on a hard outage and failing fast.
+
+import asyncio
+import time
+
+from benchmarks.fake_llm import FakeLLM, heavy_tail_latency
+from services.llm_service import CircuitBreaker, CircuitOpenError, ResilientLLM
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * p / 100.0), len(ordered) - 1)]
+
+
+async def measure(llm: ResilientLLM, calls: int):
+    latencies, failures = [], 0
+    for _ in range(calls):
+        started = time.monotonic()
+        try:
+            await llm.ainvoke("hello")
+        except Exception:
+            failures += 1
+        latencies.append(time.monotonic() - started)
+    return latencies, failures
+
+
+async def main():
+    print("--- hedging on a heavy-tailed upstream (5% of calls take 0.5s) ---")
+    for hedge in (False, True):
+        fake = FakeLLM(latency=heavy_tail_latency(median=0.02, tail=0.5))
+        llm = ResilientLLM(fake, CircuitBreaker("bench", 5, 30), timeout=5, hedge=hedge, hedge_percentile=90, hedge_min_samples=20)
+        latencies, _ = await measure(llm, 1000)
+        print(f"  hedge={hedge!s:5}  p50 {percentile(latencies, 50) * 1000:6.1f} ms  "
+              f"p99 {percentile(latencies, 99) * 1000:7.1f} ms  upstream calls {fake.calls}  hedged {llm.hedged_calls}")
+
+    print("--- retries with a 20% injected error rate ---")
+    for retries in (0, 2):
+        fake = FakeLLM(latency=lambda: 0.005, error_rate=0.2, seed=3)
+        llm = ResilientLLM(fake, CircuitBreaker("bench", 50, 30), timeout=5, max_retries=retries, base_delay=0.01)
+        _, failures = await measure(llm, 200)
+        print(f"  max_retries={retries}  failed requests {failures}/200  upstream calls {fake.calls}")
+
+    print("--- circuit breaker during a full outage ---")
+    fake = FakeLLM(latency=lambda: 0.05, error_rate=1.0)
+    breaker = CircuitBreaker("bench", failure_threshold=5, reset_timeout=30)
+    llm = ResilientLLM(fake, breaker, timeout=5, max_retries=0)
+    started = time.monotonic()
+    rejected = 0
+    for _ in range(50):
+        try:
+            await llm.ainvoke("hello")
+        except CircuitOpenError:
+            rejected += 1
+        except Exception:
+            pass
+    print(f"  50 requests in {time.monotonic() - started:.2f}s, {rejected} rejected without calling upstream, "
+          f"upstream calls {fake.calls}, breaker {breaker.snapshot()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
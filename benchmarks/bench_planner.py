@@ -0,0 +1,163 @@
+# In agentic-system/benchmarks/bench_planner.py
+#
+# Compares the query planner with the single ReAct loop on FakeLLM and fake tools.
+# Run from the project root:  python -m benchmarks.bench_planner
+#
+# Every LLM call takes a first-token delay plus decoding time, every tool call a fixed
+# Firestore-like delay. The ReAct loop pays one LLM round trip per tool call, in sequence;
+# the planner pays one planning call, runs the tools concurrently and writes the answer in
+# one synthesis call. Three questions are measured:
+#   compound  - three independent parts (the case the planner is for),
+#   single    - worded like a compound question but needing one tool call (planner overhead),
+#   simple    - a plain question the wording check sends straight to the agent.
+
+import asyncio
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.agents import AgentExecutor
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.tools import tool
+from pydantic import BaseModel, Field
+
+from agents.planner import QueryPlanner
+from agents.react_runtime import create_budgeted_react_agent
+from benchmarks.fake_llm import FakeLLM
+from services.metrics_service import metrics
+from services.serialization_service import dumps_str
+
+FIRST_TOKEN_SECONDS = 0.5
+SECONDS_PER_TOKEN = 0.01
+TOOL_SECONDS = 0.3
+REPEATS = 3
+
+STAFF = ("Ramesh Kumar", "Sita Devi")
+VILLAGES = ("Kothrud",)
+
+QUESTIONS = {
+    "compound": "How are Ramesh Kumar and Sita Devi doing, and what's happening in Kothrud?",
+    "single": "Show the projects and activities of Ramesh Kumar",
+    "simple": "How is Sita Devi doing?",
+}
+
+
+class StaffInput(BaseModel):
+    staff_name: Optional[str] = Field(None, description="The full name of the staff member.")
+
+
+class VillageInput(BaseModel):
+    village_name: Optional[str] = Field(None, description="The name of the village.")
+
+
+@tool(args_schema=StaffInput)
+def get_staff_performance_tool(staff_name: Optional[str] = None) -> str:
+    """Use this tool to get a performance summary for a staff member."""
+    time.sleep(TOOL_SECONDS)
+    return dumps_str({"status": "success", "staff_name": staff_name, "assigned_projects": ["Watershed Phase II"], "assigned_activities": ["Farmer Training"] * 5})
+
+
+@tool(args_schema=VillageInput)
+def get_data_by_village_tool(village_name: Optional[str] = None) -> str:
+    """Use this tool to get a summary of projects and activities in a village."""
+    time.sleep(TOOL_SECONDS)
+    return dumps_str({"status": "success", "village_name": village_name, "projects": ["Watershed Phase II"], "activities": ["Soil Testing"] * 5})
+
+
+TOOLS = [get_staff_performance_tool, get_data_by_village_tool]
+
+REACT_PROMPT = ChatPromptTemplate.from_template("""
+You are an administrative assistant. You have access to the following tools:
+
+{tools}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question
+
+Begin!
+
+Question: {input}
+Thought:{agent_scratchpad}
+""")
+
+
+def _prompt_text(prompt: Any) -> str:
+    return prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+
+
+def lookups_for(question: str) -> List[Tuple[str, Dict[str, str]]]:
+    """The tool calls a sensible model would make for one of the benchmark questions."""
+    calls = [("get_staff_performance_tool", {"staff_name": name}) for name in STAFF if name in question]
+    calls += [("get_data_by_village_tool", {"village_name": name}) for name in VILLAGES if name in question]
+    return calls
+
+
+def _answer(parts: int) -> str:
+    # Roughly the length of a real summary: a couple of sentences per part.
+    return " ".join(["Ramesh Kumar is assigned to the Watershed Phase II project and ran five farmer trainings."] * (2 * parts))
+
+
+def fake_react_model(prompt: Any) -> str:
+    text = _prompt_text(prompt)
+    question = text.rsplit("Question: ", 1)[1].split("\n", 1)[0]
+    calls = lookups_for(question)
+    done = len(re.findall(r"\nObservation: ", text.rsplit("Question: ", 1)[1]))
+    if done < len(calls):
+        name, args = calls[done]
+        return f"Thought: I need more data.\nAction: {name}\nAction Input: {dumps_str(args)}"
+    return f"Thought: I now know the final answer\nFinal Answer: {_answer(len(calls))}"
+
+
+def fake_planner_model(prompt: Any) -> str:
+    text = _prompt_text(prompt)
+    question = text.rsplit("Question: ", 1)[1].split("\n", 1)[0]
+    if "Respond with JSON only" in text:
+        return dumps_str({"calls": [{"question": f"{name} for {args}", "tool": name, "args": args} for name, args in lookups_for(question)]})
+    return _answer(len(lookups_for(question)))
+
+
+def build() -> Tuple[AgentExecutor, QueryPlanner]:
+    react_llm = FakeLLM(respond=fake_react_model, latency=lambda: FIRST_TOKEN_SECONDS, seconds_per_token=SECONDS_PER_TOKEN)
+    planner_llm = FakeLLM(respond=fake_planner_model, latency=lambda: FIRST_TOKEN_SECONDS, seconds_per_token=SECONDS_PER_TOKEN)
+    agent = create_budgeted_react_agent(react_llm, TOOLS, REACT_PROMPT, agent_name="bench")
+    executor = AgentExecutor(agent=agent, tools=TOOLS, handle_parsing_errors=True, max_iterations=10)
+    return executor, QueryPlanner(planner_llm, TOOLS, role="admin")
+
+
+async def timed(work) -> float:
+    started = time.monotonic()
+    await work
+    return time.monotonic() - started
+
+
+async def with_planner(planner: QueryPlanner, executor: AgentExecutor, question: str) -> None:
+    # The same path as answer_chat: the planner first, the agent if it declines.
+    if await planner.answer(question) is None:
+        await executor.ainvoke({"input": question})
+
+
+async def main():
+    executor, planner = build()
+    print(f"LLM: {FIRST_TOKEN_SECONDS}s first token + {SECONDS_PER_TOKEN * 1000:.0f} ms/token; tools: {TOOL_SECONDS}s each; {REPEATS} runs.\n")
+    print(f"{'question':<10}{'tool calls':>11}{'ReAct loop':>12}{'planner path':>14}{'speedup':>9}")
+    for label, question in QUESTIONS.items():
+        baseline = [await timed(executor.ainvoke({"input": question})) for _ in range(REPEATS)]
+        planned = [await timed(with_planner(planner, executor, question)) for _ in range(REPEATS)]
+        base, plan = sum(baseline) / REPEATS, sum(planned) / REPEATS
+        print(f"{label:<10}{len(lookups_for(question)):>11}{base:>10.2f} s{plan:>12.2f} s{base / plan:>8.1f}x")
+
+    count, total = metrics.summary_totals("planner_seconds")
+    print(f"\nPlanning calls: {count}, mean {total / max(count, 1):.2f} s each "
+          "(paid in full by questions the planner hands back to the agent).")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
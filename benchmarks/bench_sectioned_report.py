@@ -0,0 +1,146 @@
+# In agentic-system/benchmarks/bench_sectioned_report.py
+#
+# Compares single-call and sectioned report generation. Run from the project root:
+#   python -m benchmarks.bench_sectioned_report           (FakeLLM, offline)
+#   python -m benchmarks.bench_sectioned_report --live    (the configured Gemini model)
+#
+# Latency: the fake writer takes a fixed first-token delay plus a per-token decoding
+#          time for the text it returns, which is what makes long reports slow.
+# Coverage: the share of data values (after compaction) mentioned in the report, and how
+#          many are mentioned more than once (fields with equal values count too). The
+#          fake writer echoes every data point it is given, so offline this only shows
+#          that no field was lost; with --live it is a rough proxy, since the model may
+#          rephrase values. The partition and the stitched report are checked properly
+#          by benchmarks/check_sectioned_report.py.
+
+import argparse
+import asyncio
+import re
+import time
+from typing import Any, Dict, List, Tuple
+
+from langchain.chains import LLMChain
+
+from benchmarks.fake_llm import FakeLLM
+from generators import report_generator
+from generators.report_generator import _clean, generate_activity_report
+from services.serialization_service import loads
+
+FIRST_TOKEN_SECONDS = 0.4
+SECONDS_PER_TOKEN = 0.01  # ~100 output tokens per second
+
+_DATA_MARKERS = ("**Additional Data Points:**", "**Data Points for this Section:**", "**Key Facts:**")
+
+
+def sample_funder_form(fields_per_topic: int = 10) -> Dict[str, Any]:
+    """A long funder-report form with fields for every section plus noise compaction removes."""
+    form: Dict[str, Any] = {
+        "Project Name": "Watershed Development Phase II",
+        "Village": "Kothrud",
+        "Activity Date": "2025-03-14",
+        "Photo": "https://storage.example.org/photos/activity-123.jpg",
+        "Notes": "",
+    }
+    for i in range(fields_per_topic):
+        form[f"Training Topic {i + 1}"] = f"Soil and water conservation module {i + 1}"
+        form[f"Male Attendees Session {i + 1}"] = 20 + i
+        form[f"Female Attendees Session {i + 1}"] = 25 + i
+        form[f"Outcome {i + 1}"] = f"{3 + i} farmers adopted contour bunding on their plots"
+        form[f"Expense Item {i + 1}"] = f"Rs {1500 + 100 * i} for training materials"
+    return form
+
+
+def _prompt_text(prompt: Any) -> str:
+    return prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+
+
+def _data_points(prompt: str) -> Dict[str, Any]:
+    for marker in _DATA_MARKERS:
+        if marker in prompt:
+            block = prompt.split(marker, 1)[1].split("**---", 1)[0].strip()
+            try:
+                data = loads(block)
+            except ValueError:
+                return {}
+            return data if isinstance(data, dict) else {}
+    return {}
+
+
+def fake_writer(prompt: Any) -> str:
+    """Writes one sentence per data point, like a (very dull) report writer would."""
+    text = _prompt_text(prompt)
+    if "**--- Title ---**" in text:
+        return "Activity Report: Watershed Development Phase II"
+    sentences = [f"The {label.lower()} was {value}." for label, value in _data_points(text).items()]
+    body = " ".join(sentences) or "The activity was carried out as planned."
+    if "**Additional Data Points:**" in text:
+        return "Activity Report: Watershed Development Phase II\n\n" + body
+    return body
+
+
+def use_fake_llm() -> FakeLLM:
+    # A fixed first-token delay plus decoding time for the reply, which is what makes long reports slow.
+    fake = FakeLLM(respond=fake_writer, latency=lambda: FIRST_TOKEN_SECONDS, seconds_per_token=SECONDS_PER_TOKEN)
+    report_generator.report_generation_chain = LLMChain(llm=fake, prompt=report_generator.report_generator_prompt)
+    report_generator.section_generation_chain = LLMChain(llm=fake, prompt=report_generator.section_generator_prompt)
+    report_generator.title_generation_chain = LLMChain(llm=fake, prompt=report_generator.title_generator_prompt)
+    return fake
+
+
+def _expected_values(form: Dict[str, Any]) -> List[str]:
+    return [str(value) for value in (_clean(form) or {}).values()]
+
+
+def coverage(report_text: str, values: List[str]) -> Tuple[float, int]:
+    """Share of data values mentioned in the report, and how many are mentioned more than once."""
+    mentioned = [len(re.findall(re.escape(value), report_text)) for value in values]
+    covered = sum(1 for count in mentioned if count)
+    return covered / max(len(values), 1), sum(1 for count in mentioned if count > 1)
+
+
+async def run(mode: str, form: Dict[str, Any], repeats: int):
+    latencies, report = [], None
+    for _ in range(repeats):
+        started = time.monotonic()
+        report = await generate_activity_report("We held a series of watershed trainings for local farmers.", form, mode=mode)
+        latencies.append(time.monotonic() - started)
+    return sum(latencies) / len(latencies), report
+
+
+async def main(live: bool, repeats: int, fields_per_topic: int):
+    if live:
+        if report_generator.report_generation_chain is None:
+            raise SystemExit("--live needs GOOGLE_API_KEY to be set.")
+        fake = None
+    else:
+        fake = use_fake_llm()
+
+    form = sample_funder_form(fields_per_topic)
+    values = _expected_values(form)
+    print(f"Form with {len(form)} fields ({len(values)} after compaction), {repeats} run(s) per mode, "
+          f"{'live model' if live else 'FakeLLM'}.\n")
+    print(f"{'mode':<11}{'mean latency':>14}{'LLM calls':>11}{'coverage':>10}{'repeated':>10}  sections")
+    results = {}
+    for mode in ("single", "sectioned"):
+        calls_before = fake.calls if fake else 0
+        latency, report = await run(mode, form, repeats)
+        calls = (fake.calls - calls_before) // repeats if fake else "-"
+        covered, repeated = coverage(report.report_text, values)
+        results[mode] = (latency, covered)
+        print(f"{mode:<11}{latency:>12.2f} s{calls:>11}{covered:>10.0%}{repeated:>10}  {', '.join(report.sections) or '-'}")
+
+    speedup = results["single"][0] / max(results["sectioned"][0], 1e-9)
+    print(f"\nSectioned mode is {speedup:.1f}x faster.")
+    if not live:
+        # With the echoing writer, anything short of full coverage means a field was lost.
+        assert results["single"][1] == results["sectioned"][1] == 1.0, "a data point is missing from a report"
+        print("Both modes mention every data point.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--live", action="store_true", help="Use the configured Gemini model instead of FakeLLM.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--fields-per-topic", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.live, args.repeats, args.fields_per_topic))
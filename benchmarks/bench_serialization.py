@@ -0,0 +1,71 @@
+# In agentic-system/benchmarks/bench_serialization.py
+#
+# Compares the old serialisation path for large tool results with the orjson path.
+# Run from the project root:  python -m benchmarks.bench_serialization
+#
+# Old path: the tool returns a dict, LangChain stringifies it with str() for the
+#           observation, and the response is encoded with the stdlib json module.
+# New path: the dict is encoded once with orjson (compact, sorted keys) and the
+#           same text is used for the observation and the response body.
+
+import gzip
+import json
+import random
+import timeit
+from collections import defaultdict
+
+from services.serialization_service import dumps, to_observation
+
+
+def build_all_staff_payload(staff_count: int = 300, seed: int = 42) -> dict:
+    """Shape of get_staff_performance(None): projects and activities grouped by staff."""
+    rng = random.Random(seed)
+    summary = defaultdict(lambda: {"projects": [], "activities": []})
+    for i in range(staff_count):
+        name = f"Staff Member {i:03d}"
+        for p in range(rng.randint(5, 40)):
+            summary[name]["projects"].append(f"Watershed Development Project {rng.randint(1, 500)}")
+        for a in range(rng.randint(20, 150)):
+            summary[name]["activities"].append(f"Farmer Training Session {rng.randint(1, 5000)}")
+    return {"status": "success", "summary_by_staff": dict(summary)}
+
+
+def build_all_village_payload(village_count: int = 500, seed: int = 7) -> dict:
+    """Shape of get_data_by_village(None): projects and activities grouped by village."""
+    rng = random.Random(seed)
+    summary = {}
+    for i in range(village_count):
+        summary[f"Village {i:03d}"] = {
+            "projects": [f"Project {rng.randint(1, 800)}" for _ in range(rng.randint(1, 25))],
+            "activities": [f"Activity {rng.randint(1, 9000)}" for _ in range(rng.randint(10, 120))],
+        }
+    return {"status": "success", "summary_by_village": summary}
+
+
+def old_path(payload: dict):
+    observation = str(payload)
+    body = json.dumps({"response": payload, "session_id": None}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return observation, body
+
+
+def new_path(payload: dict):
+    observation = to_observation(payload)
+    body = dumps({"response": payload, "session_id": None})
+    return observation, body
+
+
+def run(name: str, payload: dict, number: int = 20) -> None:
+    old_obs, old_body = old_path(payload)
+    new_obs, new_body = new_path(payload)
+    old_time = timeit.timeit(lambda: old_path(payload), number=number) / number
+    new_time = timeit.timeit(lambda: new_path(payload), number=number) / number
+    print(f"--- {name} ---")
+    print(f"  time per request:  old {old_time * 1000:8.2f} ms   new {new_time * 1000:8.2f} ms   ({old_time / new_time:.1f}x)")
+    print(f"  observation chars: old {len(old_obs):8d}      new {len(new_obs):8d}")
+    print(f"  body bytes:        old {len(old_body):8d}      new {len(new_body):8d}")
+    print(f"  gzip body bytes:   {len(gzip.compress(new_body, compresslevel=6)):8d}")
+
+
+if __name__ == "__main__":
+    run("all-staff summary", build_all_staff_payload())
+    run("all-village summary", build_all_village_payload())
@@ -0,0 +1,131 @@
+# In agentic-system/benchmarks/bench_structured_mode.py
+#
+# Compares the text and structured chat response modes on FakeLLM and a fake tool.
+# Run from the project root:  python -m benchmarks.bench_structured_mode [--staff N]
+#
+# The question asks for every staff member's assignments, so the tool returns a long
+# list. In text mode the ReAct agent re-writes that list as prose in its Final Answer,
+# and decoding those tokens is most of the latency. In structured mode the tool result
+# is passed through as JSON and the LLM only writes a one- or two-sentence summary.
+# Both modes must hand the client every staff member in the payload.
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Dict, Optional
+
+from langchain.agents import AgentExecutor
+from langchain_core.tools import tool
+from pydantic import BaseModel, Field
+
+from agents.planner import QueryPlanner
+from agents.react_runtime import create_budgeted_react_agent
+from benchmarks.bench_planner import REACT_PROMPT, _prompt_text
+from benchmarks.fake_llm import FakeLLM
+from services.serialization_service import dumps_str, estimate_tokens, loads
+
+FIRST_TOKEN_SECONDS = 0.5
+SECONDS_PER_TOKEN = 0.005  # ~200 output tokens per second
+
+QUESTION = "List the projects and activities of all staff members"
+
+PAYLOAD: Dict[str, Any] = {}
+
+
+def build_staff_payload(staff_count: int, seed: int = 42) -> Dict[str, Any]:
+    """Shape of get_staff_performance(None), with a few assignments per staff member."""
+    rng = random.Random(seed)
+    summary = {}
+    for i in range(staff_count):
+        summary[f"Staff Member {i:03d}"] = {
+            "projects": [f"Watershed Development Project {rng.randint(1, 500)}" for _ in range(rng.randint(1, 4))],
+            "activities": [f"Farmer Training Session {rng.randint(1, 5000)}" for _ in range(rng.randint(3, 10))],
+        }
+    return {"status": "success", "summary_by_staff": summary}
+
+
+class StaffInput(BaseModel):
+    staff_name: Optional[str] = Field(None, description="The full name of the staff member. Leave it out for all staff.")
+
+
+@tool(args_schema=StaffInput)
+def get_staff_performance_tool(staff_name: Optional[str] = None) -> str:
+    """Use this tool to get a performance summary for a staff member, or for all staff."""
+    return dumps_str(PAYLOAD)
+
+
+TOOLS = [get_staff_performance_tool]
+
+
+def _prose(payload: Dict[str, Any]) -> str:
+    # What the agent writes when asked to list everything: every name, in sentences.
+    return "\n".join(
+        f"{name} works on {', '.join(entry['projects'])} and ran {', '.join(entry['activities'])}."
+        for name, entry in payload["summary_by_staff"].items()
+    )
+
+
+def fake_react_model(prompt: Any) -> str:
+    text = _prompt_text(prompt)
+    if "\nObservation: " not in text.rsplit("Question: ", 1)[1]:
+        return "Thought: I need the data for all staff.\nAction: get_staff_performance_tool\nAction Input: {}"
+    return f"Thought: I now know the final answer\nFinal Answer: {_prose(PAYLOAD)}"
+
+
+def fake_planner_model(prompt: Any) -> str:
+    text = _prompt_text(prompt)
+    if "Respond with JSON only" in text:
+        return dumps_str({"calls": [{"question": QUESTION, "tool": "get_staff_performance_tool", "args": {}}]})
+    return f"There are {len(PAYLOAD['summary_by_staff'])} staff members with assignments; most run several trainings each."
+
+
+def staff_in(output: Any) -> int:
+    """How many staff members the client can see in an answer."""
+    if isinstance(output, dict):
+        result = output["data"][0]["result"]
+        return len(result["summary_by_staff"]) if isinstance(result, dict) else 0
+    return sum(1 for name in PAYLOAD["summary_by_staff"] if name in output)
+
+
+async def timed(work) -> Dict[str, Any]:
+    started = time.monotonic()
+    result = await work
+    return {"seconds": time.monotonic() - started, "result": result}
+
+
+async def main(staff_count: int):
+    PAYLOAD.update(build_staff_payload(staff_count))
+    react_llm = FakeLLM(respond=fake_react_model, latency=lambda: FIRST_TOKEN_SECONDS, seconds_per_token=SECONDS_PER_TOKEN)
+    planner_llm = FakeLLM(respond=fake_planner_model, latency=lambda: FIRST_TOKEN_SECONDS, seconds_per_token=SECONDS_PER_TOKEN)
+    agent = create_budgeted_react_agent(react_llm, TOOLS, REACT_PROMPT, agent_name="bench")
+    executor = AgentExecutor(agent=agent, tools=TOOLS, handle_parsing_errors=True, max_iterations=5)
+    planner = QueryPlanner(planner_llm, TOOLS, role="admin")
+
+    print(f"{staff_count} staff, tool result {estimate_tokens(dumps_str(PAYLOAD))} tokens; "
+          f"LLM: {FIRST_TOKEN_SECONDS}s first token + {SECONDS_PER_TOKEN * 1000:.0f} ms/token.\n")
+    print(f"{'mode':<12}{'latency':>10}{'LLM output tokens':>19}{'staff shown':>13}")
+
+    text = await timed(executor.ainvoke({"input": QUESTION}))
+    text_output = text["result"]["output"]
+    structured = await timed(planner.answer_structured(QUESTION))
+    structured_output = structured["result"]["output"]
+
+    rows = (
+        ("text", text["seconds"], estimate_tokens(text_output), staff_in(text_output)),
+        ("structured", structured["seconds"], estimate_tokens(structured_output["summary"]), staff_in(structured_output)),
+    )
+    for mode, seconds, tokens, shown in rows:
+        print(f"{mode:<12}{seconds:>8.2f} s{tokens:>19}{shown:>13}")
+
+    # The structured answer carries the tool result unchanged, not a re-typed copy of it.
+    assert structured_output["data"][0]["result"] == loads(dumps_str(PAYLOAD)), "structured data differs from the tool result"
+    assert rows[0][3] == rows[1][3] == staff_count, "an answer is missing staff members"
+    print(f"\nStructured mode is {text['seconds'] / structured['seconds']:.1f}x faster; both answers show every staff member.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Text vs structured chat responses on FakeLLM.")
+    parser.add_argument("--staff", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(main(args.staff))
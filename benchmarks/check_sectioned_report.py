@@ -0,0 +1,94 @@
+# In agentic-system/benchmarks/check_sectioned_report.py
+#
+# Checks sectioned report generation offline. Run from the project root:
+#   python -m benchmarks.check_sectioned_report
+#
+# Partition: every field of a cleaned form lands in exactly one section, with its value
+#            unchanged, and the sections come in REPORT_SECTIONS order.
+# Stitching: a fake writer answers each section call with a marker per field it was given
+#            (and, like real models sometimes do, with the section heading first). The
+#            stitched report must have one heading per section, in order, and every field's
+#            marker exactly once, under the heading of the section it was partitioned into.
+
+import asyncio
+import re
+from collections import Counter
+from typing import Any, Dict, List
+
+from langchain.chains import LLMChain
+
+from benchmarks.bench_sectioned_report import _data_points, _prompt_text, sample_funder_form
+from benchmarks.fake_llm import FakeLLM
+from generators import report_generator
+from generators.report_generator import REPORT_SECTIONS, _clean, generate_activity_report, partition_activity_data
+
+_SECTION_TITLE = re.compile(r"\*\*Section:\*\* (.+?) \(")
+
+
+def sample_forms() -> List[Dict[str, Any]]:
+    edge_cases = {
+        "Rs Spent on Snacks": 450,
+        "Men Present": 12,
+        "Next Steps": "Follow-up visit in May",
+        "Remarks": "Rain delayed the start by an hour",
+        "Beneficiary Households": ["Patil", "Shinde", "Jadhav"],
+    }
+    return [sample_funder_form(3), sample_funder_form(10), {**sample_funder_form(2), **edge_cases}, edge_cases]
+
+
+def marker(label: str) -> str:
+    return f"[field:{label}]"
+
+
+def fake_section_writer(prompt: Any) -> str:
+    text = _prompt_text(prompt)
+    if "**--- Title ---**" in text:
+        return "Activity Report"
+    heading = _SECTION_TITLE.search(text).group(1)
+    return f"{heading}\n" + " ".join(marker(label) for label in _data_points(text))
+
+
+def check_partition(form: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    cleaned = _clean(form) or {}
+    partitions = partition_activity_data(cleaned)
+    placed = Counter(label for section in partitions.values() for label in section)
+    assert set(placed) == set(cleaned), f"fields missing from the partition: {set(cleaned) - set(placed)}"
+    assert all(count == 1 for count in placed.values()), f"fields in more than one section: {[l for l, c in placed.items() if c > 1]}"
+    assert all(cleaned[label] == value for section in partitions.values() for label, value in section.items())
+    order = [key for key, _, _, _ in REPORT_SECTIONS]
+    assert list(partitions) == [key for key in order if key in partitions] and "overview" in partitions
+    return partitions
+
+
+async def check_stitching(form: Dict[str, Any], partitions: Dict[str, Dict[str, Any]]) -> None:
+    report = await generate_activity_report("We held watershed trainings for local farmers.", form, mode="sectioned")
+    text = report.report_text
+    headings = {key: heading for key, heading, _, _ in REPORT_SECTIONS}
+    written = [key for key in partitions if partitions[key]]
+    assert report.sections == list(partitions), report.sections
+    assert re.findall(r"^## (.+)$", text, flags=re.MULTILINE) == [headings[key] for key in written], text
+    assert text.splitlines()[0] == "Activity Report", text
+
+    bodies = dict(zip(written, re.split(r"^## .+$", text, flags=re.MULTILINE)[1:]))
+    for key, fields in partitions.items():
+        for label in fields:
+            assert text.count(marker(label)) == 1, f"'{label}' appears {text.count(marker(label))} times"
+            assert marker(label) in bodies[key], f"'{label}' is not in the {headings[key]} section"
+
+
+async def main():
+    fake = FakeLLM(respond=fake_section_writer)
+    report_generator.report_generation_chain = LLMChain(llm=fake, prompt=report_generator.report_generator_prompt)
+    report_generator.section_generation_chain = LLMChain(llm=fake, prompt=report_generator.section_generator_prompt)
+    report_generator.title_generation_chain = LLMChain(llm=fake, prompt=report_generator.title_generator_prompt)
+
+    for form in sample_forms():
+        partitions = check_partition(form)
+        await check_stitching(form, partitions)
+        sizes = ", ".join(f"{key} {len(fields)}" for key, fields in partitions.items())
+        print(f"Form with {len(form)} fields: {sizes}.")
+    print("Every field is in exactly one section, and once in the stitched report under that section's heading.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
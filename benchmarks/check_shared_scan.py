@@ -0,0 +1,98 @@
+# In agentic-system/benchmarks/check_shared_scan.py
+#
+# Runs the shared scan against an in-memory Firestore and checks the aggregates and the
+# tools built on them. Run from the project root:  python -m benchmarks.check_shared_scan
+#
+# The fake collections check select() field paths with the client library's own
+# split_field_path(), the check that rejected unquoted names such as "Project Name",
+# and return only the selected fields, like a real projection query.
+
+from typing import Any, Dict, List
+
+from google.cloud.firestore_v1.field_path import split_field_path
+
+from services import entity_service, scan_service
+from services.scan_service import scan_engine
+from tools.budget_tools import get_financial_report
+from tools.performance_tools import get_staff_performance
+from tools.project_tools import get_data_by_village
+
+DATA: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "VVDProjects": {
+        # A scalar 'Beneficiaries' is not matched by array-contains, so p1 has no beneficiary.
+        "p1": {"Project Name": "Watershed Phase II", "Assigned to": "Ramesh Kumar", "Village": "Kothrud", "Beneficiaries": "Farmers Group"},
+        "p2": {"Project Name": "Kitchen Gardens", "Assigned to": "Sita Devi", "Villages": ["Kothrud", "Baner"], "Beneficiary": "Women SHG"},
+    },
+    "VVDActivity": {
+        # 'Village' wins over 'Villages', as in the tools' per-document rule.
+        "a1": {"subFormName": "Farmer Training", "Assigned to": "Ramesh Kumar", "Village": "Kothrud", "Villages": ["Baner"],
+               "projectId": "p1", "projectType": "watershed", "Beneficiaries": ["Women SHG"]},
+        # A list in 'Beneficiary' is not matched by "==".
+        "a2": {"subFormName": "Seed Distribution", "Assigned to": "Sita Devi", "Villages": ["Baner"], "Beneficiary": ["Youth Club"]},
+    },
+    "vvdbudget": {
+        "b1": {"projectId": "p1", "activityId": None, "amount": 50000},
+        "b2": {"projectId": "p2", "activityId": None, "amount": 20000},
+        "b3": {"projectId": "p1", "activityId": "a1", "amount": 5000},
+        # No activityId field at all: not a project-level budget (same rule as where("activityId", "==", None)).
+        "b4": {"projectId": "p2", "amount": 999},
+    },
+}
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id: str, data: Dict[str, Any]):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self._data)
+
+
+class FakeQuery:
+    def __init__(self, name: str, fields: List[str] = None):
+        self.name = name
+        self.fields = fields
+
+    def select(self, field_paths: List[str]) -> "FakeQuery":
+        # Raises ValueError for names the real client rejects, e.g. "Project Name" unquoted.
+        return FakeQuery(self.name, [split_field_path(path)[0] for path in field_paths])
+
+    def stream(self):
+        for doc_id, data in DATA[self.name].items():
+            if self.fields is not None:
+                data = {key: value for key, value in data.items() if key in self.fields}
+            yield FakeSnapshot(doc_id, data)
+
+
+class FakeClient:
+    def collection(self, name: str) -> FakeQuery:
+        return FakeQuery(name)
+
+
+def main():
+    scan_service.firestore_db = FakeClient()
+
+    by_staff = scan_engine.get("by_staff")
+    assert by_staff["Ramesh Kumar"] == {"projects": ["Watershed Phase II"], "activities": ["Farmer Training"]}, by_staff
+    by_village = scan_engine.get("by_village")
+    assert sorted(by_village) == ["Baner", "Kothrud"], by_village
+    assert by_village["Baner"] == {"projects": ["Kitchen Gardens"], "activities": ["Seed Distribution"]}, by_village
+    # The same matches as the Beneficiary "==" and Beneficiaries "array-contains" queries.
+    assert scan_engine.get("by_beneficiary") == {"Women SHG": {"projects": ["Kitchen Gardens"], "activities": ["Farmer Training"]}}
+    assert scan_engine.get("project_budgets") == [{"projectId": "p1", "amount": 50000}, {"projectId": "p2", "amount": 20000}]
+    # Project documents have no type; a project takes the types of its activities.
+    assert scan_engine.get("by_project_type") == {"watershed": {"p1": "Watershed Phase II"}}
+    assert entity_service.get_entity_dictionary()["project"] == {"watershed phase ii": "Watershed Phase II", "kitchen gardens": "Kitchen Gardens"}
+    print("Shared scan: every aggregate built from one pass over", ", ".join(sorted(DATA)))
+
+    # The tools' unfiltered paths are served from the scan above.
+    assert get_staff_performance()["status"] == "success"
+    assert get_data_by_village()["status"] == "success"
+    report = get_financial_report()
+    assert [row["budget_amount"] for row in report["all_project_budgets"]] == [50000, 20000], report
+    print("get_staff_performance, get_data_by_village and get_financial_report answer from the shared scan.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# In agentic-system/benchmarks/fake_llm.py
+#
+# A stand-in for ChatGoogleGenerativeAI used by the benchmarks. It answers with a
+# canned (or computed) message after an injected latency and can be told to fail
+# with a given probability, which is how the resilience layer is exercised offline.
+
+import asyncio
+import random
+import time
+from typing import Any, Callable, Optional
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+
+
+class FakeServiceUnavailable(Exception):
+    """Looks like a 503 from the upstream (see services.llm_service.is_retryable)."""
+    code = 503
+
+
+class FakeLLM(Runnable[Any, Any]):
+    """
+    Args:
+        respond: Function from the prompt input to the reply text.
+        latency: Function returning the delay (seconds) for each call, e.g. a heavy-tailed sampler.
+        seconds_per_token: Extra delay per token of the reply (~4 characters), like real decoding,
+            so that calls writing long answers take longer.
+        error_rate: Probability that a call raises FakeServiceUnavailable.
+        seed: Seed for the error-injection random generator.
+    """
+
+    def __init__(
+        self,
+        respond: Callable[[Any], str] = lambda _: "Final Answer: ok",
+        latency: Callable[[], float] = lambda: 0.0,
+        seconds_per_token: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.respond = respond
+        self.latency = latency
+        self.seconds_per_token = seconds_per_token
+        self.error_rate = error_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    def _maybe_fail(self) -> None:
+        self.calls += 1
+        if self._rng.random() < self.error_rate:
+            raise FakeServiceUnavailable("injected upstream failure")
+
+    def _delay(self, reply: str) -> float:
+        return self.latency() + self.seconds_per_token * len(reply) / 4
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AIMessage:
+        reply = self.respond(input)
+        await asyncio.sleep(self._delay(reply))
+        self._maybe_fail()
+        return AIMessage(content=reply)
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AIMessage:
+        reply = self.respond(input)
+        time.sleep(self._delay(reply))
+        self._maybe_fail()
+        return AIMessage(content=reply)
+
+
+def heavy_tail_latency(median: float = 0.05, tail_probability: float = 0.05, tail: float = 1.0, seed: int = 1):
+    """Most calls take about 'median' seconds; a few take 'tail' seconds (the p99 problem)."""
+    rng = random.Random(seed)
+    return lambda: tail if rng.random() < tail_probability else rng.uniform(median * 0.5, median * 1.5)
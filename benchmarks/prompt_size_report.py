@@ -0,0 +1,44 @@
+# In agentic-system/benchmarks/prompt_size_report.py
+#
+# Prints what each role's ReAct prompt costs per LLM call, before any scratchpad.
+# Run from the project root (needs the same environment as the app, since the
+# agent modules build their tools and LLM clients on import):
+#     python -m benchmarks.prompt_size_report
+#
+# "template" is the fixed instructions, "tools" is the rendered tool descriptions
+# and schemas; every iteration of a question re-sends both, plus the scratchpad.
+
+from langchain_core.tools import render_text_description
+
+from agents import accountant_agent, admin_agent, staff_agent
+from config import settings
+from services.serialization_service import estimate_tokens
+
+AGENTS = {
+    "admin": (admin_agent.prompt, admin_agent.admin_tools),
+    "staff": (staff_agent.prompt, staff_agent.staff_tools),
+    "accountant": (accountant_agent.prompt, accountant_agent.accountant_tools),
+}
+
+SAMPLE_INPUT = {"input": "Show the performance of all staff this quarter", "user_id": "Sample User", "agent_scratchpad": ""}
+
+
+def main():
+    print(f"{'role':<12}{'template':>10}{'tools':>10}{'total':>10}{'max calls/question':>22}")
+    for role, (prompt, tools) in AGENTS.items():
+        rendered_tools = render_text_description(list(tools))
+        full = prompt.partial(
+            tools=rendered_tools,
+            tool_names=", ".join(t.name for t in tools),
+        ).invoke(SAMPLE_INPUT).to_string()
+        total = estimate_tokens(full)
+        tool_tokens = estimate_tokens(rendered_tools)
+        # How many iterations fit in the token budget if each only re-sent the bare prompt.
+        calls = min(settings.AGENT_MAX_ITERATIONS, settings.AGENT_MAX_PROMPT_TOKENS // max(total, 1))
+        print(f"{role:<12}{total - tool_tokens:>10}{tool_tokens:>10}{total:>10}{calls:>22}")
+    print(f"\nTokens are estimated at ~4 characters each. Budget: {settings.AGENT_MAX_PROMPT_TOKENS} prompt tokens "
+          f"and {settings.AGENT_MAX_ITERATIONS} iterations per question.")
+
+
+if __name__ == "__main__":
+    main()
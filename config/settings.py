@@ -1 +1,178 @@
 # settings.py
+# In agentic-system/config/settings.py
+
+import os
+
+# All tunables are read from the environment (or the .env file loaded in main.py)
+# so that deployments can change behaviour without touching the code.
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, "1" if default else "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+# --- Entity Resolver ---
+# How long the dictionary of known staff, village and project names is trusted
+# before it is rebuilt from Firestore (the default for SCAN_REFRESH_SECONDS below).
+ENTITY_REFRESH_SECONDS = _env_int("ENTITY_REFRESH_SECONDS", 300)
+# Minimum similarity (0..1) for a fuzzy match to be resolved without asking the user.
+ENTITY_AUTO_RESOLVE_SCORE = _env_float("ENTITY_AUTO_RESOLVE_SCORE", 0.88)
+# Minimum similarity (0..1) for a name to be offered as a "did you mean" candidate.
+ENTITY_CANDIDATE_SCORE = _env_float("ENTITY_CANDIDATE_SCORE", 0.5)
+ENTITY_MAX_CANDIDATES = _env_int("ENTITY_MAX_CANDIDATES", 5)
+
+# --- Deployment & Caching ---
+# Number of uvicorn worker processes. WEB_CONCURRENCY is the conventional name used by most hosts.
+WEB_WORKERS = _env_int("WEB_CONCURRENCY", 1)
+# "memory" keeps caches inside each process; "sqlite" shares them between all workers on a host.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").strip().lower()
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", os.path.join(os.getenv("TMPDIR", "/tmp"), "vvd_cache.sqlite3"))
+
+# --- Responses ---
+# Responses larger than this many bytes are gzip-compressed when the client sends Accept-Encoding: gzip.
+GZIP_MINIMUM_SIZE = _env_int("GZIP_MINIMUM_SIZE", 1024)
+
+# --- Firestore Decoding ---
+# Skip Pydantic validation when decoding documents the backend reads from its own collections.
+# Documents are still projected onto the model's fields, but values are not coerced or checked.
+TRUSTED_FIRESTORE_READS = _env_bool("TRUSTED_FIRESTORE_READS", False)
+
+# --- Report Jobs ---
+# Background generation of activity reports (POST /reports/jobs/).
+REPORT_JOB_WORKERS = _env_int("REPORT_JOB_WORKERS", 2)
+# Maximum number of accepted jobs waiting for a worker before new submissions are refused.
+REPORT_JOB_QUEUE_SIZE = _env_int("REPORT_JOB_QUEUE_SIZE", 100)
+# Finished jobs are kept this long so that clients can still collect the result.
+REPORT_JOB_RETENTION_SECONDS = _env_int("REPORT_JOB_RETENTION_SECONDS", 24 * 3600)
+REPORT_JOB_DB_PATH = os.getenv("REPORT_JOB_DB_PATH", os.path.join(os.getenv("TMPDIR", "/tmp"), "vvd_report_jobs.sqlite3"))
+
+# --- Idempotency Keys ---
+# How long a completed result is replayed for a repeated Idempotency-Key, and how many are kept.
+IDEMPOTENCY_TTL_SECONDS = _env_int("IDEMPOTENCY_TTL_SECONDS", 3600)
+IDEMPOTENCY_MAX_ENTRIES = _env_int("IDEMPOTENCY_MAX_ENTRIES", 2000)
+# Unauthenticated callers are identified by client address. X-Forwarded-For is only read when
+# this many trusted proxies (e.g. 1 behind Cloud Run's load balancer) append to it; 0 ignores it.
+TRUSTED_PROXY_HOPS = _env_int("TRUSTED_PROXY_HOPS", 0)
+
+# --- LLM Resilience ---
+# Deadline for a single LLM call (including a hedged duplicate), in seconds.
+LLM_TIMEOUT_SECONDS = _env_float("LLM_TIMEOUT_SECONDS", 30.0)
+# Retries after the first attempt for timeouts, rate limits and 5xx errors, with full-jitter backoff.
+LLM_MAX_RETRIES = _env_int("LLM_MAX_RETRIES", 2)
+LLM_RETRY_BASE_DELAY = _env_float("LLM_RETRY_BASE_DELAY", 0.5)
+LLM_RETRY_MAX_DELAY = _env_float("LLM_RETRY_MAX_DELAY", 8.0)
+# Hedging sends a duplicate request when the first one is slower than this latency percentile.
+# It trims tail latency at the cost of extra calls, so it is off by default.
+LLM_HEDGE_ENABLED = _env_bool("LLM_HEDGE_ENABLED", False)
+LLM_HEDGE_PERCENTILE = _env_float("LLM_HEDGE_PERCENTILE", 95.0)
+LLM_HEDGE_MIN_SAMPLES = _env_int("LLM_HEDGE_MIN_SAMPLES", 20)
+# The circuit opens after this many consecutive retryable failures and stays open for the reset period.
+LLM_BREAKER_FAILURE_THRESHOLD = _env_int("LLM_BREAKER_FAILURE_THRESHOLD", 5)
+LLM_BREAKER_RESET_SECONDS = _env_float("LLM_BREAKER_RESET_SECONDS", 30.0)
+
+# --- Firestore Read Accounting ---
+# Maximum number of documents one API request may read (0 = unlimited). When a tool hits the
+# budget it returns what it has so far, flagged as truncated, instead of scanning on.
+FIRESTORE_READ_BUDGET = _env_int("FIRESTORE_READ_BUDGET", 5000)
+# Estimating document sizes walks every field, so it can be switched off.
+FIRESTORE_COUNT_BYTES = _env_bool("FIRESTORE_COUNT_BYTES", True)
+
+# --- Chat Answer Cache ---
+# Identical questions are answered from cache while the collections they depend on are unchanged.
+# Opt-in. Entries are keyed by the polled document count of each collection, which changes when
+# documents are added or deleted. Nothing marks an edit to an existing document, so an answer
+# built from edited data is served until its entry expires: the TTL is how stale it can get.
+ANSWER_CACHE_ENABLED = _env_bool("ANSWER_CACHE_ENABLED", False)
+ANSWER_CACHE_TTL_SECONDS = _env_float("ANSWER_CACHE_TTL_SECONDS", 300.0)
+ANSWER_CACHE_VERSION_POLL_SECONDS = _env_float("ANSWER_CACHE_VERSION_POLL_SECONDS", 60.0)
+ANSWER_CACHE_MAX_ENTRIES = _env_int("ANSWER_CACHE_MAX_ENTRIES", 1000)
+
+# --- Chat WebSocket ---
+# Questions one connection may have in flight at the same time.
+WS_MAX_IN_FLIGHT = _env_int("WS_MAX_IN_FLIGHT", 4)
+# Seconds a client has to send its token after connecting (when it is not in the URL).
+WS_AUTH_TIMEOUT_SECONDS = _env_float("WS_AUTH_TIMEOUT_SECONDS", 10.0)
+# Tool observations streamed to the client are cut to this many characters.
+WS_OBSERVATION_PREVIEW_CHARS = _env_int("WS_OBSERVATION_PREVIEW_CHARS", 500)
+
+# --- Agent Prompt Budget ---
+# Hard cap on ReAct iterations (LLM calls) per question.
+AGENT_MAX_ITERATIONS = _env_int("AGENT_MAX_ITERATIONS", 6)
+# Estimated prompt tokens one question may send to the LLM across all iterations.
+AGENT_MAX_PROMPT_TOKENS = _env_int("AGENT_MAX_PROMPT_TOKENS", 30000)
+# The newest observations stay verbatim in the scratchpad; older ones are cut to a preview.
+AGENT_SCRATCHPAD_KEEP_STEPS = _env_int("AGENT_SCRATCHPAD_KEEP_STEPS", 2)
+AGENT_OLD_OBSERVATION_CHARS = _env_int("AGENT_OLD_OBSERVATION_CHARS", 400)
+
+# --- Report Prompt Compaction ---
+# Estimated tokens the activity data may take up in a report prompt after compaction.
+# Larger payloads have long values and lists shortened until they fit.
+REPORT_DATA_MAX_TOKENS = _env_int("REPORT_DATA_MAX_TOKENS", 4000)
+
+# --- Client Disconnects ---
+# How often a running /chat/ or report request checks whether its client is still connected.
+DISCONNECT_POLL_SECONDS = _env_float("DISCONNECT_POLL_SECONDS", 1.0)
+# When every client waiting on an idempotent execution has gone, it is cancelled after this
+# many seconds unless a retry with the same key attaches in the meantime.
+IDEMPOTENCY_ABANDON_GRACE_SECONDS = _env_float("IDEMPOTENCY_ABANDON_GRACE_SECONDS", 10.0)
+
+# --- Speculative Prefetch ---
+# Staff and accountants nearly always need the same first tool result; it is fetched in the
+# background while the LLM is still choosing the tool.
+PREFETCH_ENABLED = _env_bool("PREFETCH_ENABLED", True)
+PREFETCH_WORKERS = _env_int("PREFETCH_WORKERS", 4)
+
+# --- Request Deadlines ---
+# Overall time budget of an API request (or one WebSocket question), in seconds; 0 disables it.
+# Keep it below the gateway timeout so a partial answer arrives before the gateway gives up.
+REQUEST_DEADLINE_SECONDS = _env_float("REQUEST_DEADLINE_SECONDS", 55.0)
+# Clients may send their own budget in X-Request-Deadline (seconds), up to this maximum.
+REQUEST_DEADLINE_MAX_SECONDS = _env_float("REQUEST_DEADLINE_MAX_SECONDS", 300.0)
+# The agent does not start another LLM iteration with less time than this left.
+AGENT_MIN_ITERATION_SECONDS = _env_float("AGENT_MIN_ITERATION_SECONDS", 4.0)
+
+# --- Shared Scans ---
+# How long one full pass over the project, activity and budget collections (which feeds the
+# all-staff, all-village and budget summaries and the entity dictionary) is reused. While the
+# collection versions are polled (ANSWER_CACHE_ENABLED), an added or deleted document also starts a new pass.
+SCAN_REFRESH_SECONDS = _env_int("SCAN_REFRESH_SECONDS", ENTITY_REFRESH_SECONDS)
+
+# --- Event Loop Stall Monitor ---
+# Opt-in: a heartbeat measures event loop lag and a watchdog thread captures the stack
+# and route of every stall longer than the threshold (see GET /debug/loop-stalls).
+LOOP_MONITOR_ENABLED = _env_bool("LOOP_MONITOR_ENABLED", False)
+LOOP_MONITOR_INTERVAL_SECONDS = _env_float("LOOP_MONITOR_INTERVAL_SECONDS", 0.05)
+LOOP_STALL_THRESHOLD_SECONDS = _env_float("LOOP_STALL_THRESHOLD_SECONDS", 0.1)
+# How many stalls are kept for the debug endpoint, and how many stack frames each keeps.
+LOOP_STALL_HISTORY = _env_int("LOOP_STALL_HISTORY", 200)
+LOOP_STALL_STACK_DEPTH = _env_int("LOOP_STALL_STACK_DEPTH", 25)
+
+# --- Query Planner ---
+# Compound admin and accountant questions are planned in one LLM call, their tool calls run
+# concurrently and one more call writes the answer, instead of a ReAct round trip per part.
+PLANNER_ENABLED = _env_bool("PLANNER_ENABLED", True)
+PLANNER_MAX_CALLS = _env_int("PLANNER_MAX_CALLS", 4)
+
+# --- Structured Chat Responses ---
+# With "response_mode": "structured" the tool data goes to the client as JSON and the LLM
+# only writes a short summary, from a preview of the data at most this many tokens long.
+STRUCTURED_SUMMARY_MAX_PROMPT_TOKENS = _env_int("STRUCTURED_SUMMARY_MAX_PROMPT_TOKENS", 2000)
+
+# --- Sampling Profiler ---
+# Opt-in: lets admins profile the whole process (POST /debug/profile) or their own requests
+# sent with "X-Profile: 1" (see GET /debug/profiles); the header is ignored for everyone else. Off, it costs one settings check per request.
+PROFILER_ENABLED = _env_bool("PROFILER_ENABLED", False)
+PROFILER_INTERVAL_SECONDS = _env_float("PROFILER_INTERVAL_SECONDS", 0.01)
+# Longest process-wide profile one call may take.
+PROFILER_MAX_SECONDS = _env_float("PROFILER_MAX_SECONDS", 60.0)
+# How many request profiles are kept, and how many requests may be profiled at once.
+PROFILER_HISTORY = _env_int("PROFILER_HISTORY", 20)
+PROFILER_MAX_CONCURRENT_REQUESTS = _env_int("PROFILER_MAX_CONCURRENT_REQUESTS", 2)
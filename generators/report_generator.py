@@ -1,9 +1,19 @@
 import os
-import json # We'll use this to format the dictionary nicely for the prompt
+import re
+import json # Used to measure what the old, indented prompt payload would have cost
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Dict, List, Tuple
+
 from langchain.chains import LLMChain
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 
+from config import settings
+from models.report_models import ReportResponse
+from services.cancellation_service import record_llm_tokens
+from services.llm_service import create_chat_model
+from services.serialization_service import dumps_str, estimate_tokens
+
 # It's better to manage settings in a dedicated config file, but for now,
 # we'll load the API key directly from the environment as this is a self-contained module.
 # Assumes load_dotenv() has been called in main.py
@@ -38,6 +48,48 @@ You are a professional report writer for an NGO. Your primary task is to write a
 # Create the PromptTemplate instance from the text above.
 report_generator_prompt = PromptTemplate.from_template(REPORT_PROMPT_TEMPLATE)
 
+# In sectioned mode (see section 5) each section is written by its own LLM call, at the
+# same time as the others, so the prompt asks for the body of one section only.
+SECTION_PROMPT_TEMPLATE = """
+You are a professional report writer for an NGO, writing one section of a formal activity report. The report is for internal records and for sharing with stakeholders or funders. Other writers are producing the other sections ({other_sections}) at the same time, so cover only this section's topic.
+
+**Section:** {section_title} ({section_focus})
+
+**Key Instructions:**
+1.  Write only the body of the "{section_title}" section, in one to three paragraphs. Do not add a report title or a section heading.
+2.  Weave every one of the "Data Points for this Section" into the narrative. The keys are the labels from the form, and the values are the data.
+3.  Do not simply list the data. For example, instead of writing "Male Attendees: 25", write "The event saw participation from 25 male attendees."
+4.  Use the "Staff's Summary" for context only; do not repeat parts of it that belong to other sections.
+5.  Maintain a professional, objective, and positive tone throughout.
+6.  The final output must be ONLY the section text. Do not include any extra commentary or conversational text.
+
+**--- Data Provided for this Section ---**
+
+**Staff's Summary:**
+{user_description}
+
+**Data Points for this Section:**
+{section_data_str}
+
+**--- {section_title} ---**
+"""
+
+TITLE_PROMPT_TEMPLATE = """
+You are a professional report writer for an NGO. Write a suitable title for a formal activity report about the activity described below.
+The final output must be ONLY the title, on a single line, without quotes or formatting.
+
+**Staff's Summary:**
+{user_description}
+
+**Key Facts:**
+{activity_data_str}
+
+**--- Title ---**
+"""
+
+section_generator_prompt = PromptTemplate.from_template(SECTION_PROMPT_TEMPLATE)
+title_generator_prompt = PromptTemplate.from_template(TITLE_PROMPT_TEMPLATE)
+
 
 # --- 2. The Language Model (LLM) ---
 # Initialize the Gemini model. We use a slightly higher temperature
@@ -46,7 +98,8 @@ if not google_api_key:
     print("WARNING: GOOGLE_API_KEY not found. Report generator will not work.")
     llm = None
 else:
-    llm = ChatGoogleGenerativeAI(
+    # create_chat_model adds a per-call timeout, retries and the shared circuit breaker.
+    llm = create_chat_model(
         model="gemini-2.0-flash", # A good balance of cost and capability for writing tasks.
         temperature=0.4,
         google_api_key=google_api_key
@@ -58,30 +111,289 @@ else:
 # This is a direct "prompt -> LLM -> output" sequence.
 if llm:
     report_generation_chain = LLMChain(llm=llm, prompt=report_generator_prompt)
+    section_generation_chain = LLMChain(llm=llm, prompt=section_generator_prompt)
+    title_generation_chain = LLMChain(llm=llm, prompt=title_generator_prompt)
     print("Report Generator Chain created successfully.")
 else:
     report_generation_chain = None
+    section_generation_chain = None
+    title_generation_chain = None
+
+
+# --- 4. Payload Compaction ---
+# Activity forms carry photo URLs, base64 signatures, empty fields and long lists of
+# repeated values. None of that helps the narrative, but all of it costs prompt tokens
+# and latency, so the data is cleaned up before it goes into the prompt.
+
+_URL_PATTERN = re.compile(r"^(https?|gs|ftp)://\S+$", re.IGNORECASE)
+_DATA_URI_PATTERN = re.compile(r"^data:[\w/+.-]+;base64,", re.IGNORECASE)
+_BASE64_PATTERN = re.compile(r"^[A-Za-z0-9+/\s]+={0,2}$")
+# Shorter strings can be ordinary words or IDs; only long runs are treated as encoded binary.
+_MIN_BASE64_LENGTH = 120
+
+# Once the data is over the ceiling, strings and lists are cut to these lengths, halving each round.
+_INITIAL_STRING_LIMIT = 2000
+_MIN_STRING_LIMIT = 80
+_INITIAL_LIST_LIMIT = 50
+_MIN_LIST_LIMIT = 3
+
+
+def _is_noise(value: Any) -> bool:
+    """True for values that add nothing to a written report: binary, base64, bare URLs."""
+    if isinstance(value, (bytes, bytearray)):
+        return True
+    if not isinstance(value, str):
+        return False
+    text = value.strip()
+    if _URL_PATTERN.match(text) or _DATA_URI_PATTERN.match(text):
+        return True
+    return len(text) >= _MIN_BASE64_LENGTH and " " not in text and bool(_BASE64_PATTERN.match(text))
+
 
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip()) or (isinstance(value, (list, dict)) and not value)
+
+
+def _collapse_repeats(items: list) -> list:
+    """["Farmer", "Farmer", "Farmer", "Trainer"] -> ["Farmer (x3)", "Trainer"], keeping first-seen order."""
+    counts = Counter(dumps_str(item) for item in items)
+    if len(counts) == len(items):
+        return items
+    collapsed, seen = [], set()
+    for item in items:
+        key = dumps_str(item)
+        if key in seen:
+            continue
+        seen.add(key)
+        count = counts[key]
+        if count == 1:
+            collapsed.append(item)
+        elif isinstance(item, (str, int, float)):
+            collapsed.append(f"{item} (x{count})")
+        else:
+            collapsed.append({"value": item, "count": count})
+    return collapsed
+
+
+def _clean(value: Any) -> Any:
+    if isinstance(value, dict):
+        cleaned = {}
+        for key, item in value.items():
+            item = _clean(item)
+            if not _is_empty(item):
+                cleaned[key] = item
+        return cleaned
+    if isinstance(value, (list, tuple, set)):
+        items = [_clean(item) for item in value if not _is_noise(item)]
+        return _collapse_repeats([item for item in items if not _is_empty(item)])
+    if _is_noise(value):
+        return None
+    return value.strip() if isinstance(value, str) else value
+
+
+def _shorten(value: Any, string_limit: int, list_limit: int) -> Any:
+    if isinstance(value, dict):
+        return {key: _shorten(item, string_limit, list_limit) for key, item in value.items()}
+    if isinstance(value, list):
+        shortened = [_shorten(item, string_limit, list_limit) for item in value[:list_limit]]
+        if len(value) > list_limit:
+            shortened.append(f"... and {len(value) - list_limit} more")
+        return shortened
+    if isinstance(value, str) and len(value) > string_limit:
+        return value[:string_limit] + "..."
+    return value
+
+
+def compact_activity_data(activity_data: Dict[str, Any], max_tokens: int = settings.REPORT_DATA_MAX_TOKENS) -> Tuple[str, bool]:
+    """
+    Prepares the form data for the report prompt: drops binary/base64 values, bare URLs
+    and empty fields, collapses repeated list entries and serialises compactly.
+    If the result is still larger than 'max_tokens', long strings and lists are
+    shortened step by step until it fits.
 
-# --- 4. The Main Function ---
+    Args:
+        activity_data: The dynamic form fields from the request.
+        max_tokens: Ceiling for the estimated tokens of the serialised data (0 = no ceiling).
+
+    Returns:
+        The compact JSON text and whether anything had to be shortened to fit.
+    """
+    cleaned = _clean(activity_data) or {}
+    text = dumps_str(cleaned)
+    if not max_tokens or estimate_tokens(text) <= max_tokens:
+        return text, False
+
+    string_limit, list_limit = _INITIAL_STRING_LIMIT, _INITIAL_LIST_LIMIT
+    while True:
+        text = dumps_str(_shorten(cleaned, string_limit, list_limit))
+        if estimate_tokens(text) <= max_tokens:
+            return text, True
+        if string_limit <= _MIN_STRING_LIMIT and list_limit <= _MIN_LIST_LIMIT:
+            break
+        string_limit = max(string_limit // 2, _MIN_STRING_LIMIT)
+        list_limit = max(list_limit // 2, _MIN_LIST_LIMIT)
+
+    # Even minimal values do not fit (a form with hundreds of fields): cut the text itself.
+    print(f"Activity data still exceeds {max_tokens} tokens after shortening; cutting it off.")
+    return text[: max_tokens * 4] + " ...(truncated)", True
+
+
+# --- 5. Sectioned Mode ---
+# The time a report takes is dominated by how much text the LLM has to write, so long
+# funder reports are slow as one call. In sectioned mode the form fields are split by
+# topic, every section (and the title) is written by its own call at the same time,
+# and the pieces are joined in a fixed order. Latency becomes that of the longest section.
+
+# (key, heading, what the section covers, form-label words that belong to it).
+# A field goes to the first section with a matching word; everything else is overview.
+REPORT_SECTIONS: List[Tuple[str, str, str, Tuple[str, ...]]] = [
+    ("overview", "Overview", "what took place, where, when and who organised it", ()),
+    ("finances", "Finances", "what was spent and how the activity was funded", (
+        "budget", "cost", "amount", "expense", "expenditure", "fund", "funder", "funding", "spent", "spend", "grant",
+        "rupee", "rupees", "inr", "rs", "price", "payment", "reimbursement", "honorarium",
+    )),
+    ("participation", "Participation", "who took part and in what numbers", (
+        "attendee", "attendance", "attended", "participant", "participation", "beneficiary", "beneficiaries",
+        "male", "female", "women", "men", "youth", "children", "farmer", "farmers", "people",
+        "household", "households", "member", "members", "audience", "headcount", "trainee", "trainees",
+    )),
+    ("outcomes", "Outcomes", "what the activity achieved, what was learned and what comes next", (
+        "outcome", "result", "impact", "achievement", "achieved", "feedback", "learning", "lesson",
+        "challenge", "next", "follow", "recommendation", "success", "improvement", "output",
+    )),
+]
+
+_LABEL_WORD_PATTERN = re.compile(r"[a-z]+")
+
+
+def _section_for_label(label: str) -> str:
+    words = _LABEL_WORD_PATTERN.findall(str(label).lower())
+    for key, _, _, keywords in REPORT_SECTIONS[1:]:
+        # Short keywords ("rs", "men") must match a whole word; longer ones may be a prefix ("attendee" -> "attendees").
+        if any(word == kw or (len(kw) >= 5 and word.startswith(kw)) for word in words for kw in keywords):
+            return key
+    return "overview"
+
+
+def partition_activity_data(activity_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Splits the form fields by report section, keeping the form's field order.
+    Every field lands in exactly one section; sections without fields are left out
+    (except the overview, which is always written from the staff's summary).
+    """
+    partitions: Dict[str, Dict[str, Any]] = {"overview": {}}
+    for label, value in activity_data.items():
+        partitions.setdefault(_section_for_label(label), {})[label] = value
+    return {key: partitions[key] for key, _, _, _ in REPORT_SECTIONS if key in partitions}
+
+
+def _strip_heading(text: str, heading: str) -> str:
+    # Models sometimes start with the section heading despite the instructions; it is added back when stitching.
+    lines = text.strip().splitlines()
+    if lines and lines[0].strip(" #*:").lower() == heading.lower():
+        lines = lines[1:]
+    return "\n".join(lines).strip()
+
+
+async def _gather_or_cancel(calls: List[Awaitable[Any]]) -> List[Any]:
+    """Like asyncio.gather, but a failing call cancels the others instead of leaving them running."""
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+async def _generate_sectioned_report(user_description: str, activity_data: dict) -> Tuple[str, int, bool, List[str]]:
+    """
+    Writes the title and every section concurrently and stitches them together.
+
+    Returns:
+        The report text, the estimated tokens of the compacted data across all sections,
+        whether any section's data had to be shortened, and the keys of the sections written.
+    """
+    headings = {key: (heading, focus) for key, heading, focus, _ in REPORT_SECTIONS}
+    sections = []
+    truncated = False
+    for key, data in partition_activity_data(_clean(activity_data) or {}).items():
+        # Each section call gets the full data ceiling; none of them sees the whole form.
+        data_str, section_truncated = compact_activity_data(data)
+        truncated = truncated or section_truncated
+        sections.append((key, data_str))
+
+    heading_list = [headings[key][0] for key, _ in sections]
+    section_inputs = [
+        {
+            "section_title": headings[key][0],
+            "section_focus": headings[key][1],
+            "other_sections": ", ".join(h for h in heading_list if h != headings[key][0]) or "none",
+            "user_description": user_description,
+            "section_data_str": data_str,
+        }
+        for key, data_str in sections
+    ]
+    title_input = {"user_description": user_description, "activity_data_str": sections[0][1]}
+
+    prompt_tokens = estimate_tokens(title_generator_prompt.format(**title_input)) + sum(
+        estimate_tokens(section_generator_prompt.format(**section_input)) for section_input in section_inputs
+    )
+    record_llm_tokens(expected=prompt_tokens)
+
+    title_response, *section_responses = await _gather_or_cancel(
+        [title_generation_chain.ainvoke(title_input)]
+        + [section_generation_chain.ainvoke(section_input) for section_input in section_inputs]
+    )
+    record_llm_tokens(spent=prompt_tokens)
+
+    title = title_response.get("text", "").strip().strip('"#* ') or "Activity Report"
+    parts = [title]
+    for section_input, response in zip(section_inputs, section_responses):
+        heading = section_input["section_title"]
+        body = _strip_heading(response.get("text", ""), heading)
+        if body:
+            parts.append(f"## {heading}\n\n{body}")
+    data_tokens = sum(estimate_tokens(data_str) for _, data_str in sections)
+    return "\n\n".join(parts), data_tokens, truncated, [key for key, _ in sections]
+
+
+# --- 6. The Main Function ---
 # This is the function that our router will call.
-async def generate_activity_report(user_description: str, activity_data: dict) -> str:
+async def generate_activity_report(user_description: str, activity_data: dict, mode: str = "single") -> ReportResponse:
     """
     Invokes the LLMChain to generate a narrative report from dynamic, structured data.
 
     Args:
         user_description: The summary written by the user.
         activity_data: A dictionary containing all dynamic fields from the form.
+        mode: "single" writes the report in one LLM call; "sectioned" writes its sections
+            concurrently (see section 5), which is faster for forms with many data points.
 
     Returns:
-        The generated report text as a string.
+        A ReportResponse with the generated report text and how many prompt tokens compaction saved.
     """
     if not report_generation_chain:
-        return "Error: The report generation service is not configured correctly. Please check the API key."
+        return ReportResponse(report_text="Error: The report generation service is not configured correctly. Please check the API key.")
 
-    # We format the dictionary into a clean, human-readable string for the prompt.
-    # Using json.dumps with indentation makes it easier for the LLM to parse.
-    activity_data_str = json.dumps(activity_data, indent=2)
+    # The data used to go into the prompt as indented JSON; compaction keeps only what the
+    # narrative needs. The indented form is still measured to report the saving.
+    original_tokens = estimate_tokens(json.dumps(activity_data, indent=2, default=str))
+
+    if mode == "sectioned":
+        report_text, data_tokens, truncated, section_keys = await _generate_sectioned_report(user_description, activity_data)
+        print(f"Sectioned report written in {len(section_keys)} parallel sections: {', '.join(section_keys)}.")
+        return ReportResponse(
+            report_text=report_text,
+            prompt_tokens_saved=max(original_tokens - data_tokens, 0),
+            data_truncated=truncated,
+            mode="sectioned",
+            sections=section_keys,
+        )
+
+    activity_data_str, truncated = compact_activity_data(activity_data)
+    tokens_saved = max(original_tokens - estimate_tokens(activity_data_str), 0)
+    print(f"Report data compacted: ~{original_tokens} -> ~{original_tokens - tokens_saved} tokens (truncated={truncated}).")
 
     # Prepare the final input dictionary for the chain.
     input_data = {
@@ -89,8 +401,17 @@ async def generate_activity_report(user_description: str, activity_data: dict) -
         "activity_data_str": activity_data_str
     }
     
+    # If the client disconnects while the LLM is writing, these are the tokens the cancellation saves.
+    prompt_tokens = estimate_tokens(report_generator_prompt.format(**input_data))
+    record_llm_tokens(expected=prompt_tokens)
+
     # We use ainvoke for asynchronous execution, which is best practice in FastAPI.
     response = await report_generation_chain.ainvoke(input_data)
+    record_llm_tokens(spent=prompt_tokens)
     
     # The response from an LLMChain is a dictionary that contains a 'text' key.
-    return response.get('text', 'Error: Could not generate a valid report text from the provided data.')
\ No newline at end of file
+    return ReportResponse(
+        report_text=response.get('text', 'Error: Could not generate a valid report text from the provided data.'),
+        prompt_tokens_saved=tokens_saved,
+        data_truncated=truncated,
+    )
@@ -1,6 +1,7 @@
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from dotenv import load_dotenv
 import uvicorn
 
@@ -10,15 +11,29 @@ load_dotenv()
 # --- Import your routers ---
 # CHANGED: Import both the chat router and the new report router
 from routers import chat_router
+from routers import chat_ws_router
 from routers import report_router
+from routers import export_router
+from routers import metrics_router
+from routers import debug_router
 
 # This will initialize the DB client on startup
 from services import firestore_service 
+from config import settings
+from services.serialization_service import CompactJSONResponse
+from services.llm_service import circuit_breaker_states
+from services.read_accounting_service import ReadAccountingMiddleware
+from services.answer_cache_service import collection_versions
+from services.deadline_service import DeadlineMiddleware
+from services.loop_monitor_service import loop_monitor
+from services.profiler_service import ProfilingMiddleware
 
 app = FastAPI(
     title="Multi-Role Agentic System",
     description="An AI agent system with role-based access control and report generation.",
-    version="0.2.0" # Good practice to bump the version when adding a new feature
+    version="0.2.0", # Good practice to bump the version when adding a new feature
+    # Serialise every JSON response with orjson (compact, sorted keys) instead of the stdlib encoder.
+    default_response_class=CompactJSONResponse,
 )
 
 # Configure CORS
@@ -39,11 +54,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Large summaries (all staff, all villages) compress very well, which matters on slow mobile links.
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE)
+
+# Counts the Firestore reads of every request and enforces the per-request read budget.
+app.add_middleware(ReadAccountingMiddleware)
+
+# Puts every request under a deadline (REQUEST_DEADLINE_SECONDS or the X-Request-Deadline header).
+app.add_middleware(DeadlineMiddleware)
+
+# Outermost, so a request sent with "X-Profile: 1" is profiled from end to end (only with PROFILER_ENABLED).
+app.add_middleware(ProfilingMiddleware)
+
 # --- Include all the routers in the application ---
 # This makes the /chat/... endpoints from the chat_router available
 app.include_router(chat_router.router)
+# /chat/ws is the WebSocket version: one authentication per connection, several questions at once
+app.include_router(chat_ws_router.router)
 # CHANGED: This makes the /reports/... endpoints from the report_router available
 app.include_router(report_router.router)
+# The /exports/... endpoints stream full collection dumps for admins and accountants
+app.include_router(export_router.router)
+# GET /metrics exposes Firestore read counts and other process metrics
+app.include_router(metrics_router.router)
+# GET /debug/loop-stalls lists event loop stalls; /debug/profile(s) serve sampling profiles (admins only)
+app.include_router(debug_router.router)
+
+
+@app.on_event("startup")
+async def start_background_workers():
+    # Starts the report job workers and resumes jobs accepted before the last restart.
+    await report_router.report_job_pool.start()
+    # A poller keeps the data versions that invalidate cached chat answers (and shared scans).
+    if settings.ANSWER_CACHE_ENABLED:
+        collection_versions.start()
+    # Opt-in detection of blocking calls on the event loop.
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await report_router.report_job_pool.stop()
+    collection_versions.stop()
+    await loop_monitor.stop()
 
 
 @app.get("/", tags=["Health Check"])
@@ -51,6 +105,21 @@ async def root():
     return {"status": "ok", "message": "Welcome to the Multi-Role Agentic System!"}
 
 
+@app.get("/health/llm", tags=["Health Check"])
+async def llm_health():
+    # Circuit breaker state per upstream model; "open" means LLM calls are currently failing fast.
+    breakers = circuit_breaker_states()
+    degraded = any(b["state"] != "closed" for b in breakers.values())
+    return {"status": "degraded" if degraded else "ok", "circuit_breakers": breakers}
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run("main:app", host="0.0.0.0", port=port)
\ No newline at end of file
+    # Multi-worker mode: set WEB_CONCURRENCY to run several processes and use all cores.
+    # Each worker imports this module separately, so in-process caches are not shared;
+    # set CACHE_BACKEND=sqlite so that all workers on the host use one cache file.
+    workers = max(settings.WEB_WORKERS, 1)
+    if workers > 1 and settings.CACHE_BACKEND == "memory":
+        print(f"WARNING: Running {workers} workers with CACHE_BACKEND=memory. "
+              "Each worker will keep its own copy of every cache; consider CACHE_BACKEND=sqlite.")
+    uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers)
\ No newline at end of file
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Any
+from typing import Dict, Any, List, Literal, Optional
+from datetime import datetime
 
 class GenerateReportPayload(BaseModel):
     """
@@ -17,7 +18,31 @@ class GenerateReportPayload(BaseModel):
     # as it's a core piece of input for the report narrative.
     user_description: str = Field(..., description="The short summary of the activity written by the staff member.")
 
+    # Long funder reports are faster in "sectioned" mode, where the overview, participation,
+    # outcomes and finances sections are written concurrently and joined under one title.
+    mode: Literal["single", "sectioned"] = Field("single", description="'single' writes the report in one pass; 'sectioned' writes its sections in parallel.")
+
 
 class ReportResponse(BaseModel):
     """The JSON response containing the generated report."""
-    report_text: str
\ No newline at end of file
+    report_text: str
+    prompt_tokens_saved: int = Field(0, description="Estimated prompt tokens saved by compacting the activity data before prompting.")
+    data_truncated: bool = Field(False, description="True if long values had to be shortened to fit the prompt size ceiling.")
+    mode: str = Field("single", description="How the report was written: 'single' or 'sectioned'.")
+    sections: List[str] = Field(default_factory=list, description="The sections written in parallel, in report order (sectioned mode only).")
+
+class ReportJobAccepted(BaseModel):
+    """Returned immediately when a report is submitted as a background job."""
+    job_id: str = Field(..., description="The ID to poll at /reports/jobs/{job_id}.")
+    status: str = Field(..., description="The job status at submission time (always 'queued').")
+    status_url: str = Field(..., description="Relative URL where the job status can be polled.")
+
+
+class ReportJobStatus(BaseModel):
+    """The current state of a background report job."""
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    created_at: datetime
+    updated_at: datetime
+    result: Optional[ReportResponse] = Field(None, description="The generated report, once the job has succeeded.")
+    error: Optional[str] = Field(None, description="Why the job failed, if it did.")
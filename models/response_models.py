@@ -17,6 +17,9 @@ class ChatResponse(BaseModel):
     # We can make it optional for now.
     session_id: Optional[str] = Field(None, description="The session ID for the conversation, if applicable.")
 
+    # True when the agent stopped early (deadline or prompt budget) and the answer may be incomplete.
+    partial: bool = Field(False, description="Whether the answer is a partial one, cut short by the request's time or size limits.")
+
 
 class HealthCheckResponse(BaseModel):
     """
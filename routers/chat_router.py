@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
-from typing import Optional
+import time
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Literal, Optional, Tuple
 
 # Import the models we'll use
 from models.user_models import User
@@ -8,11 +9,19 @@ from models.response_models import ChatResponse
 
 # Import the authentication dependency
 from services.auth_service import get_current_user
+from services.idempotency_service import IDEMPOTENCY_HEADER, request_fingerprint, run_idempotent
+from services.answer_cache_service import get_cached_answer, store_answer
+from services.read_accounting_service import current_ledger, stop_reads_on_cancel
+from services.cancellation_service import cancel_on_disconnect
+from services.prefetch_service import prefetch_for
+from services.deadline_service import DeadlineExceededError
+from services.metrics_service import metrics
+from config import settings
 
-# Import the three agent executors we have built
-from agents.admin_agent import admin_agent_executor
-from agents.staff_agent import staff_agent_executor
-from agents.accountant_agent import accountant_agent_executor
+# Import the three agent executors we have built, and the planners for compound questions
+from agents.admin_agent import admin_agent_executor, admin_planner
+from agents.staff_agent import staff_agent_executor, staff_planner
+from agents.accountant_agent import accountant_agent_executor, accountant_planner
 
 
 # --- Define the Router ---
@@ -27,6 +36,9 @@ router = APIRouter(
 class ChatRequestPayload(BaseModel):
     # CHANGED: The field is now 'query' to match the frontend.
     query: str
+    # "structured" returns {"summary", "data"}: the tool results as JSON plus a one- or two-sentence
+    # summary, instead of the LLM re-writing long lists (all staff, all villages) as prose.
+    response_mode: Literal["text", "structured"] = Field("text", description="'text' for a prose answer, 'structured' for the tool data as JSON with a short summary.")
 
 
 # --- The Main Chat Endpoint ---
@@ -35,7 +47,10 @@ class ChatRequestPayload(BaseModel):
 async def handle_chat(
     # CHANGED: The request body is now validated against our new model.
     request: ChatRequestPayload,
-    current_user: User = Depends(get_current_user)
+    http_request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
 ):
     """
     This is the main endpoint for the agentic system. It performs the following steps:
@@ -44,7 +59,113 @@ async def handle_chat(
     3. Selects the appropriate agent (Admin, Staff, or Accountant).
     4. Invokes the agent with the user's query and their unique ID.
     5. Returns the agent's final response.
+
+    If the client sends an `Idempotency-Key` header, a retry with the same key attaches to the
+    running request or receives its stored result (marked with `Idempotent-Replayed: true`).
+
+    If the client disconnects before the answer is ready, the agent run is cancelled.
     """
+    return await cancel_on_disconnect(
+        http_request,
+        run_idempotent(
+            idempotency_key,
+            principal=f"chat:{current_user.uid}",
+            fingerprint=request_fingerprint(request.model_dump()),
+            response=response,
+            execute=lambda: stop_reads_on_cancel(answer_chat(request, current_user)),
+        ),
+        kind="chat",
+    )
+
+
+# Returned when the request deadline passes before the agent has gathered anything.
+DEADLINE_ANSWER = "I ran out of time before I could answer. Please try again, or ask a narrower question."
+
+# The agent executor for each role, and the name used in the logs.
+AGENT_EXECUTORS = {
+    "admin": ("Admin Agent", admin_agent_executor),
+    "staff": ("Staff Agent", staff_agent_executor),
+    "accountant": ("Accountant Agent", accountant_agent_executor),
+}
+
+# Roles whose compound questions are planned into concurrent tool calls first (see agents/planner.py).
+# Staff have a single tool, so there is nothing to run in parallel.
+PLANNERS = {
+    "admin": admin_planner,
+    "accountant": accountant_planner,
+}
+
+# Structured responses use the planner for every role; staff have one tool, always called for themselves.
+STRUCTURED_PLANNERS = {
+    **PLANNERS,
+    "staff": staff_planner,
+}
+
+metrics.describe("chat_answer_seconds", "Time to answer a chat question (cache misses), by role and path (planned, structured, agent).")
+
+
+async def answer_with_planner(role: str, query: str) -> Optional[Dict[str, Any]]:
+    """The planner's result for a compound question, or None if the agent should answer it."""
+    planner = PLANNERS.get(role) if settings.PLANNER_ENABLED else None
+    if planner is None:
+        return None
+    return await planner.answer(query)
+
+
+async def answer_structured(role: str, query: str, current_user: User) -> Optional[Dict[str, Any]]:
+    """The tool data and a short summary for the question, or None if there is no data to look up."""
+    planner = STRUCTURED_PLANNERS.get(role)
+    if planner is None:
+        return None
+    calls = None
+    if role == "staff":
+        calls = [{"question": query, "tool": "get_my_performance_tool", "args": {"user_id": current_user.display_name}}]
+    return await planner.answer_structured(query, calls=calls)
+
+
+async def answer_without_agent(role: str, query: str, current_user: User, response_mode: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Tries the planner paths first. Returns (result, path); the result is None when the
+    question should go to the role's ReAct agent.
+    """
+    if response_mode == "structured":
+        return await answer_structured(role, query, current_user), "structured"
+    return await answer_with_planner(role, query), "planned"
+
+
+def as_structured(agent_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Wraps a prose agent answer (small talk, a clarifying question) in the structured shape."""
+    return {**agent_result, "output": {"summary": agent_result.get("output", "The agent did not provide a final answer."), "data": []}}
+
+
+def deadline_answer(response_mode: str) -> Any:
+    return {"summary": DEADLINE_ANSWER, "data": []} if response_mode == "structured" else DEADLINE_ANSWER
+
+
+def build_agent_input(query: str, current_user: User) -> Dict[str, Any]:
+    # The input for the agent executor must be a dictionary.
+    # It's crucial to pass the user's details so that tools can use them.
+    # Note: We pass the user's display_name as user_id because our tools expect a name.
+    return {
+        "input": query,
+        "user_id": current_user.display_name, # Pass the user's name
+        "user_role": current_user.primary_role # Pass the user's role for defense-in-depth checks
+    }
+
+
+def remember_answer(cache_key: Optional[str], role: str, agent_result: Dict[str, Any]) -> None:
+    """Stores a finished agent answer in the answer cache when it is complete enough to reuse."""
+    final_answer = agent_result.get("output")
+    # Answers built from a read-budget-truncated scan, or cut off by the iteration or token limit, are not worth keeping.
+    ledger = current_ledger()
+    summary = final_answer.get("summary") if isinstance(final_answer, dict) else final_answer
+    completed = isinstance(summary, str) and not summary.startswith("Agent stopped") and not agent_result.get("partial")
+    if cache_key and completed and not (ledger and ledger.truncations):
+        store_answer(cache_key, role, final_answer)
+
+
+async def answer_chat(request: ChatRequestPayload, current_user: User) -> ChatResponse:
+    """Routes the query to the agent for the user's role and returns its final answer."""
     role = current_user.primary_role
     # CHANGED: We now access the 'query' attribute from the request body.
     query = request.query
@@ -53,43 +174,49 @@ async def handle_chat(
     print(f"User: {current_user.email} (Role: {role})")
     print(f"Query: '{query}'")
 
-    # The input for the agent executor must be a dictionary.
-    # It's crucial to pass the user's details so that tools can use them.
-    # Note: We pass the user's display_name as user_id because our tools expect a name.
-    agent_input = {
-        "input": query,
-        "user_id": current_user.display_name, # Pass the user's name
-        "user_role": role # Pass the user's role for defense-in-depth checks
-    }
+    # Repeated questions are answered from the cache while the underlying data is unchanged.
+    cache_key, cached_answer = get_cached_answer(query, role, current_user.uid, request.response_mode)
+    if cached_answer is not None:
+        print("Answered from the answer cache.")
+        return ChatResponse(response=cached_answer)
+
+    agent_input = build_agent_input(query, current_user)
 
     try:
         # --- Role-based Agent Routing ---
-        if role == "admin":
-            print("Routing to: Admin Agent")
-            response = await admin_agent_executor.ainvoke(agent_input)
-        
-        elif role == "staff":
-            print("Routing to: Staff Agent")
-            response = await staff_agent_executor.ainvoke(agent_input)
-        
-        elif role == "accountant":
-            print("Routing to: Accountant Agent")
-            response = await accountant_agent_executor.ainvoke(agent_input)
-        
-        else:
+        if role not in AGENT_EXECUTORS:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"User role '{role}' does not have a corresponding agent."
             )
+        agent_name, executor = AGENT_EXECUTORS[role]
+        print(f"Routing to: {agent_name}")
+        # The role's most likely tool result is fetched while the LLM decides what to call.
+        started = time.monotonic()
+        with prefetch_for(role, current_user):
+            response, path = await answer_without_agent(role, query, current_user, request.response_mode)
+            if response is None:
+                path = "agent"
+                response = await executor.ainvoke(agent_input)
+                if request.response_mode == "structured":
+                    response = as_structured(response)
+        metrics.observe("chat_answer_seconds", time.monotonic() - started, role=role, path=path)
 
         final_answer = response.get("output", "The agent did not provide a final answer.")
         print(f"Agent Final Response: {final_answer}")
-        
-        return ChatResponse(response=final_answer)
+
+        remember_answer(cache_key, role, response)
+
+        return ChatResponse(response=final_answer, partial=bool(response.get("partial", False)))
+
+    except DeadlineExceededError as e:
+        # The deadline ran out inside an LLM call, before the agent had anything to return.
+        print(f"Agent execution stopped by the request deadline: {e}")
+        return ChatResponse(response=deadline_answer(request.response_mode), partial=True)
 
     except Exception as e:
         print(f"An error occurred during agent execution: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred while processing your request: {e}"
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,246 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+
+from config import settings
+from models.user_models import User
+from routers.chat_router import AGENT_EXECUTORS, answer_without_agent, as_structured, build_agent_input, deadline_answer, remember_answer
+from services.answer_cache_service import get_cached_answer
+from services.auth_service import authenticate_token
+from services.read_accounting_service import request_ledger, stop_reads_on_cancel
+from services.cancellation_service import begin_usage, record_cancellation
+from services.prefetch_service import prefetch_for
+from services.deadline_service import DeadlineExceededError, deadline_scope
+from services.serialization_service import dumps_str, loads
+
+# --- Define the Router ---
+# A WebSocket alternative to POST /chat/ for chatty clients. The connection is
+# authenticated once (token verification plus the Users lookup) and again only
+# after the token expires. Several questions can be in flight at once; every
+# message about a question carries the client's message ID, and the agent's
+# intermediate steps are streamed as they happen.
+#
+# Client -> server:
+#   {"type": "auth", "token": "..."}                   first message, and later a refreshed token
+#                                                      (never in the URL, which ends up in proxy and access logs)
+#   {"type": "query", "id": "q1", "query": "..."}      ask a question (add "response_mode": "structured"
+#                                                      for {"summary", "data"} instead of prose, as in POST /chat/)
+#   {"type": "cancel", "id": "q1"}                     stop a question that is still running
+# Server -> client:
+#   {"type": "ready", "role": "...", "expires_at": ...}
+#   {"type": "event", "id": "q1", "event": "action" | "observation", ...}
+#   {"type": "answer", "id": "q1", "response": "...", "cached": false, "partial": false}
+#   {"type": "error", "id": "q1", "code": "...", "message": "..."}
+#   {"type": "cancelled", "id": "q1"}
+router = APIRouter(
+    tags=["Chat Endpoint"]
+)
+
+# Close codes from the private 4000-4999 range.
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_AUTH_TIMEOUT = 4408
+
+
+class ChatConnection:
+    """State of one authenticated chat socket: the user, token expiry and the running questions."""
+
+    def __init__(self, websocket: WebSocket, user: User, expires_at: float):
+        self.websocket = websocket
+        self.user = user
+        self.expires_at = expires_at
+        self.tasks: Dict[str, asyncio.Task] = {}
+        # Several question tasks write to the same socket.
+        self._send_lock = asyncio.Lock()
+
+    @property
+    def token_expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        async with self._send_lock:
+            await self.websocket.send_text(dumps_str(message))
+
+    async def reauthenticate(self, token: Optional[str]) -> None:
+        if not token:
+            await self.send({"type": "error", "code": "bad_request", "message": "An 'auth' message needs a 'token'."})
+            return
+        try:
+            user, expires_at = await authenticate_token(token)
+        except HTTPException as e:
+            await self.send({"type": "error", "code": "unauthorized", "message": e.detail})
+            return
+        if user.uid != self.user.uid:
+            await self.send({"type": "error", "code": "unauthorized", "message": "The token belongs to a different user."})
+            return
+        self.user, self.expires_at = user, expires_at
+        await self.send({"type": "ready", "role": user.primary_role, "expires_at": expires_at})
+
+    def start_query(self, message_id: str, query: str, response_mode: str = "text") -> None:
+        task = asyncio.create_task(self._answer(message_id, query, response_mode))
+        self.tasks[message_id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(message_id, None))
+
+    async def _answer(self, message_id: str, query: str, response_mode: str) -> None:
+        role = self.user.primary_role
+        print(f"--- New WebSocket Question ---")
+        print(f"User: {self.user.email} (Role: {role}), id={message_id}")
+        print(f"Query: '{query}'")
+        usage = begin_usage()
+        try:
+            # Each question gets its own read ledger and deadline, like an HTTP request.
+            with request_ledger("/chat/ws", role=role), deadline_scope(settings.REQUEST_DEADLINE_SECONDS):
+                await stop_reads_on_cancel(self._run_agent(message_id, query, role, response_mode))
+        except asyncio.CancelledError:
+            # Cancelled by a 'cancel' message or because the socket closed.
+            record_cancellation("chat_ws", usage)
+            await self._send_quietly({"type": "cancelled", "id": message_id})
+            raise
+        except DeadlineExceededError as e:
+            print(f"WebSocket question stopped by the request deadline: {e}")
+            await self._send_quietly({"type": "answer", "id": message_id, "response": deadline_answer(response_mode), "cached": False, "partial": True})
+        except Exception as e:
+            print(f"An error occurred during agent execution over WebSocket: {e}")
+            await self._send_quietly({"type": "error", "id": message_id, "code": "agent_error", "message": f"An error occurred while processing your request: {e}"})
+
+    async def _run_agent(self, message_id: str, query: str, role: str, response_mode: str) -> None:
+        cache_key, cached_answer = get_cached_answer(query, role, self.user.uid, response_mode)
+        if cached_answer is not None:
+            await self.send({"type": "answer", "id": message_id, "response": cached_answer, "cached": True})
+            return
+
+        agent_name, executor = AGENT_EXECUTORS[role]
+        print(f"Routing to: {agent_name}")
+        with prefetch_for(role, self.user):
+            final, _ = await answer_without_agent(role, query, self.user, response_mode)
+            if final is not None:
+                # The planner's tool calls ran concurrently; report them once they are done.
+                for step in final["planned_steps"]:
+                    await self.send({"type": "event", "id": message_id, "event": "action", "tool": step["tool"], "tool_input": step["tool_input"]})
+                    await self._send_observation(message_id, step["tool"], step["observation"])
+            else:
+                final = await self._stream_agent(message_id, executor, query)
+                if response_mode == "structured":
+                    final = as_structured(final)
+
+        final_answer = final.get("output", "The agent did not provide a final answer.")
+        remember_answer(cache_key, role, final)
+        await self.send({"type": "answer", "id": message_id, "response": final_answer, "cached": False, "partial": bool(final.get("partial", False))})
+
+    async def _stream_agent(self, message_id: str, executor: Any, query: str) -> Dict[str, Any]:
+        """Runs the ReAct agent, sending its actions and observations as they happen; returns its result."""
+        final: Dict[str, Any] = {}
+        async for chunk in executor.astream(build_agent_input(query, self.user)):
+            for action in chunk.get("actions", []):
+                await self.send({
+                    "type": "event", "id": message_id, "event": "action",
+                    "tool": action.tool, "tool_input": action.tool_input,
+                })
+            for step in chunk.get("steps", []):
+                await self._send_observation(message_id, step.action.tool, str(step.observation))
+            if "output" in chunk:
+                final.update({key: value for key, value in chunk.items() if key != "messages"})
+        return final
+
+    async def _send_observation(self, message_id: str, tool: str, observation: str) -> None:
+        preview = settings.WS_OBSERVATION_PREVIEW_CHARS
+        await self.send({
+            "type": "event", "id": message_id, "event": "observation",
+            "tool": tool,
+            "observation": observation[:preview],
+            "truncated": len(observation) > preview,
+        })
+
+    async def _send_quietly(self, message: Dict[str, Any]) -> None:
+        # The socket may already be gone when a question is cancelled by a disconnect.
+        try:
+            await self.send(message)
+        except Exception:
+            pass
+
+    def cancel_all(self) -> None:
+        for task in list(self.tasks.values()):
+            task.cancel()
+
+
+async def _authenticate_connection(websocket: WebSocket) -> Optional[ChatConnection]:
+    """Authenticates with the first 'auth' message; closes the socket on failure."""
+    if "token" in websocket.query_params:
+        await websocket.close(code=CLOSE_UNAUTHORIZED, reason="Send the token in an 'auth' message, not in the URL.")
+        return None
+    try:
+        first = loads(await asyncio.wait_for(websocket.receive_text(), timeout=settings.WS_AUTH_TIMEOUT_SECONDS))
+    except asyncio.TimeoutError:
+        await websocket.close(code=CLOSE_AUTH_TIMEOUT, reason="No token received.")
+        return None
+    except ValueError:
+        first = {}
+    token = first.get("token") if isinstance(first, dict) and first.get("type") == "auth" else None
+    if not token:
+        await websocket.close(code=CLOSE_UNAUTHORIZED, reason="The first message must be {'type': 'auth', 'token': ...}.")
+        return None
+    try:
+        user, expires_at = await authenticate_token(token)
+    except HTTPException as e:
+        await websocket.close(code=CLOSE_UNAUTHORIZED, reason=str(e.detail)[:120])
+        return None
+    if user.primary_role not in AGENT_EXECUTORS:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=f"User role '{user.primary_role}' does not have a corresponding agent.")
+        return None
+    return ChatConnection(websocket, user, expires_at)
+
+
+@router.websocket("/chat/ws")
+async def chat_websocket(websocket: WebSocket):
+    """
+    Chat over a WebSocket: authenticate once, then send any number of questions,
+    several at a time, and receive the agent's steps and answers tagged with each question's ID.
+    """
+    await websocket.accept()
+    connection = await _authenticate_connection(websocket)
+    if connection is None:
+        return
+    await connection.send({"type": "ready", "role": connection.user.primary_role, "expires_at": connection.expires_at})
+
+    try:
+        while True:
+            try:
+                message = loads(await websocket.receive_text())
+            except ValueError:
+                await connection.send({"type": "error", "code": "bad_request", "message": "Messages must be JSON objects."})
+                continue
+            if not isinstance(message, dict):
+                await connection.send({"type": "error", "code": "bad_request", "message": "Messages must be JSON objects."})
+                continue
+
+            kind = message.get("type")
+            message_id = str(message.get("id") or "")
+            if kind == "auth":
+                await connection.reauthenticate(message.get("token"))
+            elif kind == "cancel":
+                task = connection.tasks.get(message_id)
+                if task is not None:
+                    task.cancel()
+            elif kind == "query":
+                query = message.get("query")
+                response_mode = message.get("response_mode", "text")
+                if not message_id or not isinstance(query, str) or not query.strip():
+                    await connection.send({"type": "error", "id": message_id or None, "code": "bad_request", "message": "A 'query' message needs an 'id' and a non-empty 'query'."})
+                elif response_mode not in ("text", "structured"):
+                    await connection.send({"type": "error", "id": message_id, "code": "bad_request", "message": "'response_mode' must be 'text' or 'structured'."})
+                elif connection.token_expired:
+                    # The only point where the connection is re-checked: send a fresh token with an 'auth' message.
+                    await connection.send({"type": "error", "id": message_id, "code": "token_expired", "message": "Your token has expired; send a new one with an 'auth' message."})
+                elif message_id in connection.tasks:
+                    await connection.send({"type": "error", "id": message_id, "code": "duplicate_id", "message": "A question with this id is still running."})
+                elif len(connection.tasks) >= settings.WS_MAX_IN_FLIGHT:
+                    await connection.send({"type": "error", "id": message_id, "code": "too_many_in_flight", "message": f"At most {settings.WS_MAX_IN_FLIGHT} questions can run at once on one connection."})
+                else:
+                    connection.start_query(message_id, query, response_mode)
+            else:
+                await connection.send({"type": "error", "id": message_id or None, "code": "bad_request", "message": f"Unknown message type '{kind}'."})
+    except WebSocketDisconnect:
+        print(f"Chat WebSocket closed by {connection.user.email}.")
+    finally:
+        connection.cancel_all()
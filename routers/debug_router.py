@@ -0,0 +1,79 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from config import settings
+from models.user_models import User
+from services.auth_service import get_current_user
+from services.loop_monitor_service import loop_monitor
+from services.profiler_service import profiler
+
+# --- Define the Router ---
+# Diagnostics for finding performance problems in production. Admins only, since
+# stack traces reveal code paths and the routes other users are calling.
+router = APIRouter(
+    prefix="/debug",
+    tags=["Diagnostics"]
+)
+
+
+async def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    if "admin" not in current_user.roles:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can use the diagnostics endpoints.")
+    return current_user
+
+
+@router.get("/loop-stalls")
+async def get_loop_stalls(current_user: User = Depends(require_admin)):
+    """
+    Lists recent event loop stalls (newest first) with the blocking stack and the route being
+    served, plus a count per blocking frame so the worst offenders stand out.
+    Only this worker's stalls are shown; recording needs LOOP_MONITOR_ENABLED.
+    """
+    return loop_monitor.report()
+
+
+def require_profiler() -> None:
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled; set PROFILER_ENABLED to use it.")
+
+
+def folded_response(result: Dict[str, Any]) -> PlainTextResponse:
+    # The body is the folded stacks (for flamegraph.pl, speedscope or inferno); the totals go in headers.
+    return PlainTextResponse(result["folded"], headers={
+        "X-Profile-Samples": str(result["samples"]),
+        "X-Profile-Idle-Samples": str(result["idle_samples"]),
+        "X-Profile-Duration": str(result["duration_seconds"]),
+    })
+
+
+@router.post("/profile", dependencies=[Depends(require_profiler)])
+async def profile_process(
+    seconds: float = Query(10.0, gt=0, le=settings.PROFILER_MAX_SECONDS, description="How long to sample for."),
+    include_idle: bool = Query(False, description="Also count threads that are waiting for work."),
+    current_user: User = Depends(require_admin),
+):
+    """
+    Samples the stacks of every thread in this worker for 'seconds' and returns them in the
+    folded format, one "frame;frame;frame count" line per stack. Only one process profile
+    runs at a time.
+    """
+    if profiler.process_profile_running:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A process profile is already running on this worker.")
+    return folded_response(await profiler.profile_process(seconds, include_idle))
+
+
+@router.get("/profiles", dependencies=[Depends(require_profiler)])
+async def list_request_profiles(current_user: User = Depends(require_admin)):
+    """Lists the kept profiles of requests sent with "X-Profile: 1" (newest first), without their stacks."""
+    return {"profiles": profiler.summaries()}
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_profiler)])
+async def get_request_profile(profile_id: str, current_user: User = Depends(require_admin)):
+    """The folded stacks of one profiled request; its ID is in the request's X-Profile-Id response header."""
+    result = profiler.results.get(profile_id)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No profile '{profile_id}' on this worker.")
+    return folded_response(result)
@@ -0,0 +1,241 @@
+import base64
+import csv
+import hashlib
+import io
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Literal, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from google.cloud import firestore
+
+from models.user_models import User
+from services.auth_service import get_current_user
+from services.firestore_service import firestore_db
+from services.read_accounting_service import disable_read_budget
+from services.deadline_service import clear_deadline
+from services.serialization_service import dumps
+
+# --- Define the Router ---
+# Full dumps of the main collections for funders. Every export pages through its
+# collection with a Firestore cursor and streams rows as they arrive, so memory use
+# is bounded by the page size no matter how large the collection is.
+router = APIRouter(
+    prefix="/exports",
+    tags=["Data Export"]
+)
+
+# Exportable datasets: URL name -> (Firestore collection, roles allowed to export it).
+EXPORTS: Dict[str, Tuple[str, set]] = {
+    "projects": ("VVDProjects", {"admin"}),
+    "activities": ("VVDActivity", {"admin"}),
+    "budgets": ("vvdbudget", {"admin", "accountant"}),
+    "rebates": ("vvdrebate", {"admin", "accountant"}),
+    "reimbursements": ("vvdreimbursement", {"admin", "accountant"}),
+}
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1000
+
+
+# --- Cursor Tokens ---
+# A token names the dataset and the last document ID that was fully written.
+# Passing it back as ?cursor= continues the export right after that document.
+# CSV cursors also carry a key for the column set (see stream_csv).
+
+def encode_cursor(dataset: str, last_id: str, columns_key: Optional[str] = None) -> str:
+    cursor = {"d": dataset, "after": last_id}
+    if columns_key:
+        cursor["c"] = columns_key
+    raw = json.dumps(cursor, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(dataset: str, token: str) -> Tuple[str, Optional[str]]:
+    """Returns (last written document ID, CSV columns key or None)."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        last_id = data["after"]
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid export cursor.")
+    if data.get("d") != dataset or not isinstance(last_id, str):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="This cursor belongs to a different export.")
+    return last_id, data.get("c")
+
+
+# --- Flattening ---
+# Form documents hold arbitrary, sometimes nested, fields. Nested maps become dotted
+# column names ("address.district"); lists stay lists in NDJSON and become JSON text in CSV.
+
+def flatten_document(data: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_document(value, prefix=f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple, set)):
+        return dumps(list(value)).decode("utf-8")
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return dumps(value).decode("utf-8").strip('"')
+
+
+def iter_pages(collection_name: str, page_size: int, after_id: Optional[str]) -> Iterator[List[Any]]:
+    """
+    Yields the collection one page of DocumentSnapshots at a time, ordered by document ID.
+    Only a single page is held in memory at any moment.
+    """
+    collection = firestore_db.collection(collection_name)
+    base_query = collection.order_by(firestore.FieldPath.document_id()).limit(page_size)
+    while True:
+        query = base_query
+        if after_id:
+            query = query.start_after({firestore.FieldPath.document_id(): collection.document(after_id)})
+        page = list(query.stream())
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        after_id = page[-1].id
+
+
+def stream_ndjson(dataset: str, collection_name: str, page_size: int, after_id: Optional[str]) -> Iterator[bytes]:
+    for page in iter_pages(collection_name, page_size, after_id):
+        lines = []
+        for doc in page:
+            row = {"id": doc.id, **flatten_document(doc.to_dict() or {})}
+            lines.append(dumps(row))
+        # A cursor record after every page lets an interrupted download resume from here.
+        lines.append(dumps({"_cursor": encode_cursor(dataset, page[-1].id)}))
+        yield b"\n".join(lines) + b"\n"
+
+
+def _columns_of(page: List[Any]) -> List[str]:
+    return sorted({key for doc in page for key in flatten_document(doc.to_dict() or {})} - {"id"})
+
+
+def _columns_key(columns: List[str], sample_size: int) -> str:
+    # Names how the columns were chosen (the first 'sample_size' documents) and what they were.
+    digest = hashlib.sha256(json.dumps(columns).encode("utf-8")).hexdigest()[:16]
+    return f"{sample_size}:{digest}"
+
+
+def resume_columns(collection_name: str, columns_key: Optional[str]) -> List[str]:
+    """
+    The column set of the CSV export a cursor came from, chosen again from the same leading
+    documents. Raises 409 if those documents have changed since, so the columns would differ.
+    """
+    try:
+        sample_size = int((columns_key or "").split(":", 1)[0])
+        if sample_size < 1:
+            raise ValueError(sample_size)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="This cursor does not come from a CSV export.")
+    first_page = next(iter_pages(collection_name, sample_size, None), [])
+    columns = _columns_of(first_page)
+    if _columns_key(columns, len(first_page)) != columns_key:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The collection's columns have changed since this export started; start a new export instead of resuming.",
+        )
+    return columns
+
+
+def stream_csv(
+    dataset: str,
+    collection_name: str,
+    page_size: int,
+    after_id: Optional[str],
+    columns: Optional[List[str]] = None,
+    columns_key: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    The column set is taken from the first page (sorted, 'id' first). Fields that only
+    appear in later pages are written as a JSON object in the '_extra' column, so the
+    header never has to change mid-stream. Every row carries the cursor that resumes
+    the export after it.
+
+    A resumed export is given the original 'columns' and their key (see resume_columns)
+    and writes no header, so its output can be appended to the interrupted file after
+    its last complete row.
+    """
+    for page in iter_pages(collection_name, page_size, after_id):
+        rows = [(doc.id, flatten_document(doc.to_dict() or {})) for doc in page]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if columns is None:
+            columns = sorted({key for _, flat in rows for key in flat} - {"id"})
+            columns_key = _columns_key(columns, len(page))
+            writer.writerow(["id", *columns, "_extra", "_cursor"])
+        known = set(columns)
+        for doc_id, flat in rows:
+            extra = {key: value for key, value in flat.items() if key not in known and key != "id"}
+            writer.writerow([
+                doc_id,
+                *(_csv_value(flat.get(column)) for column in columns),
+                dumps(extra).decode("utf-8") if extra else "",
+                encode_cursor(dataset, doc_id, columns_key),
+            ])
+        yield buffer.getvalue()
+
+
+@router.get("/{dataset}")
+def export_dataset(
+    dataset: str,
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Output format."),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Documents fetched per Firestore page."),
+    cursor: Optional[str] = Query(None, description="Resume token from a previous, interrupted export."),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Streams a full export of one collection as NDJSON or CSV.
+    Available datasets: projects, activities (admins); budgets, rebates, reimbursements (admins and accountants).
+    """
+    if dataset not in EXPORTS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown export '{dataset}'. Available: {', '.join(EXPORTS)}."
+        )
+
+    collection_name, allowed_roles = EXPORTS[dataset]
+    if not allowed_roles.intersection(current_user.roles):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Your role does not allow exporting '{dataset}'."
+        )
+
+    after_id, columns_key = decode_cursor(dataset, cursor) if cursor else (None, None)
+    columns = resume_columns(collection_name, columns_key) if format == "csv" and after_id else None
+    # A full dump is expected to read the whole collection and take a while:
+    # count its reads but cap neither the reads nor the time.
+    disable_read_budget()
+    clear_deadline()
+    print(f"Export of '{dataset}' requested by {current_user.email} (format={format}, resume_after={after_id})")
+
+    # Sync generators are iterated in Starlette's thread pool, so the blocking Firestore
+    # calls never run on the event loop.
+    if format == "csv":
+        body = stream_csv(dataset, collection_name, page_size, after_id, columns, columns_key)
+        media_type = "text/csv; charset=utf-8"
+    else:
+        body = stream_ndjson(dataset, collection_name, page_size, after_id)
+        media_type = "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'},
+    )
@@ -0,0 +1,26 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+
+from models.user_models import User
+from routers.debug_router import require_admin
+from services.metrics_service import metrics
+
+# --- Define the Router ---
+# Process-level counters (Firestore reads per route/role/tool/collection, ...).
+# With several workers each process reports only its own numbers.
+# Admins only: the labels name routes, roles, tools and principals.
+router = APIRouter(
+    tags=["Metrics"]
+)
+
+
+@router.get("/metrics")
+async def get_metrics(
+    format: Literal["json", "prometheus"] = Query("json", description="'prometheus' returns the text exposition format."),
+    current_user: User = Depends(require_admin)
+):
+    if format == "prometheus":
+        return PlainTextResponse(metrics.prometheus_text(), media_type="text/plain; version=0.0.4")
+    return metrics.snapshot()
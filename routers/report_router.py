@@ -1,12 +1,24 @@
-from fastapi import APIRouter, HTTPException, status
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 # Import the Pydantic models we defined for this feature.
-from models.report_models import GenerateReportPayload, ReportResponse
+from models.report_models import GenerateReportPayload, ReportResponse, ReportJobAccepted, ReportJobStatus
 
 # Import the generator function that contains our LangChain logic.
 from generators.report_generator import generate_activity_report
 
+from config import settings
+from services.idempotency_service import IDEMPOTENCY_HEADER, client_principal, request_fingerprint, run_idempotent
+from services.job_service import FINISHED_STATES, JobPool, JobQueueFullError, JobStore
+from services.serialization_service import dumps_str
+from services.cancellation_service import cancel_on_disconnect
+from services.deadline_service import DeadlineExceededError
+
 # --- Define the Router ---
 # We create a new router for this feature to keep it organized.
 router = APIRouter(
@@ -16,7 +28,12 @@ router = APIRouter(
 
 # --- The Public "Generate Report" Endpoint ---
 @router.post("/generate-activity-report/", response_model=ReportResponse)
-async def handle_generate_report(payload: GenerateReportPayload):
+async def handle_generate_report(
+    payload: GenerateReportPayload,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
     """
     This is an open, unauthenticated endpoint that accepts dynamic, structured 
     data from an activity form and uses an LLM to generate a narrative report.
@@ -24,7 +41,27 @@ async def handle_generate_report(payload: GenerateReportPayload):
     The request body should contain:
     - user_description: A string summary from the user.
     - activity_data: A flexible dictionary of key-value pairs from the form.
+    - mode (optional): "sectioned" writes the report's sections in parallel, for long reports.
+
+    An optional `Idempotency-Key` header makes retries reuse the first request's result.
+    Keys are scoped to the caller's address because this endpoint is unauthenticated.
+    If the client disconnects before the report is ready, the LLM call is cancelled.
     """
+    return await cancel_on_disconnect(
+        request,
+        run_idempotent(
+            idempotency_key,
+            principal=f"report:{client_principal(request)}",
+            fingerprint=request_fingerprint(payload.model_dump()),
+            response=response,
+            execute=lambda: generate_report(payload),
+        ),
+        kind="report",
+    )
+
+
+async def generate_report(payload: GenerateReportPayload) -> ReportResponse:
+    """Generates the report synchronously for handle_generate_report."""
     print(f"--- New Report Generation Request ---")
     print(f"User Description: '{payload.user_description}'")
     print(f"Dynamic Activity Data: {payload.activity_data}")
@@ -32,20 +69,28 @@ async def handle_generate_report(payload: GenerateReportPayload):
     try:
         # Call our generator function with the validated payload data.
         # The Pydantic model `payload` gives us type-safe access to the data.
-        generated_text = await generate_activity_report(
+        report = await generate_activity_report(
             user_description=payload.user_description,
-            activity_data=payload.activity_data
+            activity_data=payload.activity_data,
+            mode=payload.mode
         )
 
-        if "Error:" in generated_text:
+        if "Error:" in report.report_text:
             # This is a simple way to catch failures from the generator itself.
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail=generated_text
+                detail=report.report_text
             )
 
-        # If successful, return the text in the expected response format.
-        return ReportResponse(report_text=generated_text)
+        # If successful, return the report with its compaction statistics.
+        return report
+
+    except DeadlineExceededError as e:
+        print(f"Report generation stopped by the request deadline: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="The report could not be generated within the request's time limit. Submit it as a job at /reports/jobs/ instead."
+        )
 
     except Exception as e:
         # Catch any other unexpected errors during the process.
@@ -53,4 +98,115 @@ async def handle_generate_report(payload: GenerateReportPayload):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected internal error occurred while generating the report."
-        )
\ No newline at end of file
+        )
+
+
+# --- Background Report Jobs ---
+# Generating a report can take long enough for mobile clients on slow connections to time out
+# and retry. In job mode the POST returns a job ID at once and the report is produced by a
+# bounded worker pool; clients poll GET /reports/jobs/{job_id} or follow its event stream.
+
+async def run_report_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: generates the report for a stored GenerateReportPayload."""
+    report = await generate_activity_report(
+        user_description=payload["user_description"],
+        activity_data=payload["activity_data"],
+        # Jobs queued before sectioned mode existed have no 'mode'.
+        mode=payload.get("mode", "single")
+    )
+    if "Error:" in report.report_text:
+        raise RuntimeError(report.report_text)
+    return report.model_dump()
+
+
+report_job_pool = JobPool(
+    kind="activity_report",
+    handler=run_report_job,
+    store=JobStore(settings.REPORT_JOB_DB_PATH),
+    workers=settings.REPORT_JOB_WORKERS,
+    max_backlog=settings.REPORT_JOB_QUEUE_SIZE,
+    retention_seconds=settings.REPORT_JOB_RETENTION_SECONDS,
+)
+
+
+def _job_status(job: Dict[str, Any]) -> ReportJobStatus:
+    return ReportJobStatus(
+        job_id=job["id"],
+        status=job["status"],
+        created_at=datetime.fromtimestamp(job["created_at"], tz=timezone.utc),
+        updated_at=datetime.fromtimestamp(job["updated_at"], tz=timezone.utc),
+        result=job["result"],
+        error=job["error"],
+    )
+
+
+@router.post("/jobs/", response_model=ReportJobAccepted, status_code=status.HTTP_202_ACCEPTED)
+async def submit_report_job(
+    payload: GenerateReportPayload,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
+    """
+    Accepts the same body as /reports/generate-activity-report/ but returns immediately
+    with a job ID. The report is generated in the background.
+    With an `Idempotency-Key` header, a retried submission returns the original job ID.
+    """
+    print(f"--- New Report Job Submission ---")
+
+    async def submit() -> ReportJobAccepted:
+        try:
+            job_id = report_job_pool.submit(payload.model_dump())
+        except JobQueueFullError as e:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+        return ReportJobAccepted(job_id=job_id, status="queued", status_url=f"{router.prefix}/jobs/{job_id}")
+
+    return await run_idempotent(
+        idempotency_key,
+        principal=f"report-job:{client_principal(request)}",
+        fingerprint=request_fingerprint(payload.model_dump()),
+        response=response,
+        execute=submit,
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=ReportJobStatus)
+async def get_report_job(job_id: str):
+    """Returns the status of a report job, including the report once it has succeeded."""
+    job = report_job_pool.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Report job '{job_id}' not found.")
+    return _job_status(job)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_report_job(job_id: str):
+    """
+    Streams the job's status as Server-Sent Events until it finishes.
+    The job may be running in another worker process, so the store is polled rather than
+    waiting on an in-process event.
+    """
+    if report_job_pool.store.get(job_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Report job '{job_id}' not found.")
+
+    async def event_stream():
+        last_status = None
+        polls_since_event = 0
+        while True:
+            job = report_job_pool.store.get(job_id)
+            if job is None:
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                polls_since_event = 0
+                yield f"event: status\ndata: {dumps_str(_job_status(job).model_dump(mode='json'))}\n\n"
+            elif polls_since_event >= 15:
+                # A comment line keeps proxies from closing an idle connection.
+                polls_since_event = 0
+                yield ": keep-alive\n\n"
+            if job["status"] in FINISHED_STATES:
+                return
+            polls_since_event += 1
+            await asyncio.sleep(1.0)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
@@ -0,0 +1,173 @@
+# In agentic-system/services/answer_cache_service.py
+
+import hashlib
+import re
+import threading
+import unicodedata
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from config import settings
+from services.cache_service import get_cache
+from services.firestore_service import firestore_db
+from services.metrics_service import metrics
+
+# ==============================================================================
+#  Dashboards and returning users send the same questions word for word.
+#  Final agent answers are cached under (normalised query, role, user where the
+#  answer is personal, data version, today's date) and expire after
+#  ANSWER_CACHE_TTL_SECONDS. The data version is the document count of every
+#  collection the role's tools read, polled with cheap count() queries, so an
+#  added or deleted document changes the key within one poll interval.
+#  Edits to existing documents do NOT change it: no field is set on every write
+#  (the forms only set 'createdAt', and projects not even that), so an edited
+#  answer is served until its entry expires. For edits this is a TTL cache.
+#  The date keeps relative periods ("this quarter") from being answered with
+#  yesterday's window.
+# ==============================================================================
+
+metrics.describe("chat_answer_cache_total", "Chat answer cache lookups by role and result (hit, miss, bypass).")
+metrics.describe("chat_answer_cache_stored_total", "Chat answers written to the answer cache, by role.")
+
+# The collections each role's tools read. Admin and staff questions also go through the
+# entity resolver, which reads the same project and activity collections. Accountant
+# questions read activities for the project types (get_financial_report(project_type=...)).
+ROLE_COLLECTIONS: Dict[str, Tuple[str, ...]] = {
+    "admin": ("VVDProjects", "VVDActivity"),
+    "staff": ("Users", "VVDProjects", "VVDActivity"),
+    "accountant": ("VVDProjects", "VVDActivity", "vvdbudget", "vvdrebate"),
+}
+
+# Roles whose answers depend on who is asking (the staff agent only reports on the caller).
+PERSONAL_ROLES = {"staff"}
+
+answer_cache = get_cache(
+    "chat_answers",
+    default_ttl=settings.ANSWER_CACHE_TTL_SECONDS,
+    max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+)
+
+
+def normalize_query(query: str) -> str:
+    """Case-, accent- and whitespace-insensitive form of a question; trailing punctuation is ignored."""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(" ?!.")
+
+
+class CollectionVersions:
+    """
+    Keeps a version per collection, polled every ANSWER_CACHE_VERSION_POLL_SECONDS.
+    The version is the document count from a count() aggregation, so a poll costs about
+    one read per 1000 documents. It changes on every create and delete, but not on an
+    update (see the module comment). It is the same in every worker process that sees
+    the same data, so workers sharing a SQLite cache also share answers.
+    """
+
+    def __init__(self, collections: Iterable[str], poll_seconds: float):
+        self.collections = sorted(set(collections))
+        self.poll_seconds = poll_seconds
+        self._versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._poller is not None:
+            return
+        self._stop.clear()
+        self._poller = threading.Thread(target=self._poll_forever, name="answer-cache-versions", daemon=True)
+        self._poller.start()
+        print(f"Answer cache polling {len(self.collections)} collections for changes every {self.poll_seconds:.0f} s.")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._poller = None
+        with self._lock:
+            self._versions.clear()
+
+    def _poll_forever(self) -> None:
+        while True:
+            self.poll()
+            if self._stop.wait(self.poll_seconds):
+                return
+
+    def poll(self) -> None:
+        for name in self.collections:
+            try:
+                version = self._version_of(name)
+            except Exception as e:
+                # Without a version the cache is bypassed for roles reading this collection.
+                print(f"Could not read the answer cache version of collection '{name}': {e}")
+                version = None
+            with self._lock:
+                if version is None:
+                    self._versions.pop(name, None)
+                else:
+                    self._versions[name] = version
+
+    def _version_of(self, name: str) -> str:
+        count = firestore_db.collection(name).count().get()[0][0].value
+        # Aggregations are billed one read per 1000 index entries (at least one).
+        metrics.inc("firestore_documents_read_total", max(1, -(-count // 1000)), route="poller", role="system", tool="answer_cache", collection=name)
+        return str(count)
+
+    def stamp(self, collections: Iterable[str]) -> Optional[str]:
+        """A combined version for 'collections', or None while any of them is not yet known."""
+        with self._lock:
+            parts = []
+            for name in sorted(collections):
+                version = self._versions.get(name)
+                if version is None:
+                    return None
+                parts.append(f"{name}={version}")
+        return ";".join(parts)
+
+
+collection_versions = CollectionVersions(
+    (name for names in ROLE_COLLECTIONS.values() for name in names),
+    poll_seconds=settings.ANSWER_CACHE_VERSION_POLL_SECONDS,
+)
+
+
+def answer_cache_key(query: str, role: str, uid: str, response_mode: str = "text") -> Optional[str]:
+    """
+    The cache key for a question, or None when the answer must not be cached
+    (cache disabled, unknown role, or data versions not available yet).
+    Structured answers are cached separately from prose answers to the same question.
+    """
+    if not settings.ANSWER_CACHE_ENABLED or role not in ROLE_COLLECTIONS:
+        return None
+    stamp = collection_versions.stamp(ROLE_COLLECTIONS[role])
+    if stamp is None:
+        return None
+    principal = uid if role in PERSONAL_ROLES else "*"
+    # Tools resolve periods such as 'this_week' against today's date (see tools/query_filters.py).
+    today = datetime.now(timezone.utc).date().isoformat()
+    parts = (role, principal, stamp, today, normalize_query(query))
+    if response_mode != "text":
+        parts += (response_mode,)
+    raw = "\x1f".join(parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_cached_answer(query: str, role: str, uid: str, response_mode: str = "text") -> Tuple[Optional[str], Any]:
+    """
+    Looks the question up in the answer cache and records the outcome in the metrics.
+
+    Returns:
+        (cache key, cached answer). The key is None when the cache is bypassed;
+        the answer is None on a miss.
+    """
+    key = answer_cache_key(query, role, uid, response_mode)
+    if key is None:
+        metrics.inc("chat_answer_cache_total", role=role, result="bypass")
+        return None, None
+    answer = answer_cache.get(key)
+    metrics.inc("chat_answer_cache_total", role=role, result="hit" if answer is not None else "miss")
+    return key, answer
+
+
+def store_answer(key: str, role: str, answer: Any) -> None:
+    answer_cache.set(key, answer)
+    metrics.inc("chat_answer_cache_stored_total", role=role)
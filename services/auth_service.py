@@ -1,5 +1,7 @@
 # In agentic-system/services/auth_service.py
 
+from typing import Tuple
+
 from firebase_admin import auth
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -7,6 +9,8 @@ from fastapi.security import OAuth2PasswordBearer
 # Import our validated User model and the database client
 from models.user_models import User
 from .firestore_service import firestore_db
+from .read_accounting_service import note_principal
+from .deadline_service import deadline_expired
 
 # This scheme tells FastAPI how to find the token in the request header
 # It looks for "Authorization: Bearer <your_token>"
@@ -20,11 +24,30 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     3. Validates the data against our Pydantic 'User' model.
     4. Returns the validated 'User' object, making it available to our API endpoints.
     """
+    user, _ = await authenticate_token(token)
+    return user
+
+
+async def authenticate_token(token: str) -> Tuple[User, float]:
+    """
+    Does the work of get_current_user for a raw ID token. Long-lived connections
+    (the chat WebSocket) call this once and again only after the token has expired.
+
+    Returns:
+        The validated User and the token's expiry time (seconds since the epoch).
+    """
+    if deadline_expired():
+        # The Users query below would be cut off anyway; fail before doing any work.
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="The request deadline passed before authentication."
+        )
     try:
         # Step 1: Verify the token using Firebase Admin SDK to get UID and email
         decoded_token = auth.verify_id_token(token)
         uid = decoded_token.get('uid')
         email = decoded_token.get('email')
+        expires_at = float(decoded_token.get('exp', 0))
         
         if not uid or not email:
             raise HTTPException(
@@ -58,8 +81,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="User has an empty roles list and cannot be granted access."
             )
-        
-        return validated_user
+
+        # Attribute this request's Firestore reads to the user's primary role.
+        note_principal(validated_user.primary_role)
+
+        return validated_user, expires_at
 
     except auth.InvalidIdTokenError:
         raise HTTPException(
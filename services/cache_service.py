@@ -0,0 +1,246 @@
+# In agentic-system/services/cache_service.py
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+
+# A sentinel so that `None` can be cached as a legitimate value.
+_MISSING = object()
+
+
+class _KeyLocks:
+    """
+    One lock per key, so that concurrent misses for the same key only compute once.
+    A key's lock is dropped when its last holder or waiter is done, so only keys being
+    computed right now take up space, however many keys the cache ever sees.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> [lock, threads holding or waiting for it]
+        self._locks: Dict[str, List[Any]] = {}
+
+    @contextmanager
+    def hold(self, key: str) -> Iterator[None]:
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+
+class TTLCache:
+    """
+    A small thread-safe in-process cache where every entry expires after a time-to-live.
+    Tools run inside LangChain's thread pool, so all access is guarded by a lock.
+    Each worker process has its own copy; see SQLiteCache for a shared alternative.
+    """
+
+    def __init__(self, default_ttl: float = 300, max_entries: int = 1024):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._key_locks = _KeyLocks()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Returns the cached value for 'key', or 'default' if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Stores 'value' under 'key' for 'ttl' seconds (the cache default if omitted)."""
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._evict_locked()
+            self._entries[key] = (expires_at, value)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_set(self, key: str, factory: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        Returns the cached value for 'key', computing and storing it with 'factory' on a miss.
+        Concurrent callers that miss on the same key wait for a single computation.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._key_locks.hold(key):
+            # Another thread may have filled the entry while we were waiting.
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                value = factory()
+                self.set(key, value, ttl)
+            return value
+
+    def _evict_locked(self) -> None:
+        # Drop expired entries first; if the cache is still full, drop the entry closest to expiry.
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        if len(self._entries) >= self.max_entries:
+            oldest_key = min(self._entries, key=lambda k: self._entries[k][0])
+            del self._entries[oldest_key]
+
+
+class SQLiteCache:
+    """
+    A cache with the same get/set/TTL API as TTLCache, stored in a SQLite database in WAL mode
+    so that every uvicorn worker process on the host shares the same entries.
+    Values are pickled, so only use it for data this service produced itself.
+    """
+
+    def __init__(self, namespace: str, path: str, default_ttl: float = 300, max_entries: int = 1024):
+        self.namespace = namespace
+        self.path = path
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._key_locks = _KeyLocks()
+        self._lock = threading.Lock()
+        self._writes_since_cleanup = 0
+
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " value BLOB NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS cache_expiry ON cache (namespace, expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads, so keep one per thread.
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            # WAL lets readers in one process proceed while another process writes.
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._connection().execute(
+            "SELECT expires_at, value FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None:
+            return default
+        expires_at, value = row
+        if expires_at <= time.time():
+            self.delete(key)
+            return default
+        return pickle.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        # Wall-clock time is used because monotonic clocks are not comparable across processes.
+        expires_at = time.time() + (self.default_ttl if ttl is None else ttl)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, expires_at, value) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, expires_at, sqlite3.Binary(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))),
+        )
+        with self._lock:
+            self._writes_since_cleanup += 1
+            due = self._writes_since_cleanup >= 64
+            if due:
+                self._writes_since_cleanup = 0
+        if due:
+            self._cleanup()
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def get_or_set(self, key: str, factory: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        Same contract as TTLCache.get_or_set. Concurrent misses are collapsed within a process;
+        two processes missing at the same moment may both compute the value.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._key_locks.hold(key):
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                value = factory()
+                self.set(key, value, ttl)
+            return value
+
+    def _cleanup(self) -> None:
+        # Remove expired rows, then trim the namespace back to max_entries by soonest expiry.
+        connection = self._connection()
+        connection.execute("DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (self.namespace, time.time()))
+        connection.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key IN ("
+            " SELECT key FROM cache WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_entries),
+        )
+
+
+# --- Cache Factory ---
+# Callers ask for a cache by namespace and get whichever backend CACHE_BACKEND selects,
+# so switching a deployment to multiple workers only needs a configuration change.
+_caches: Dict[str, Any] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(namespace: str, default_ttl: float = 300, max_entries: int = 1024):
+    """
+    Returns the shared cache instance for 'namespace', creating it on first use.
+
+    Args:
+        namespace (str): A name that keeps this cache's keys apart from other caches.
+        default_ttl (float): Seconds an entry lives when 'set' is called without a ttl.
+        max_entries (int): Soft upper bound on the number of entries kept.
+
+    Returns:
+        A TTLCache or SQLiteCache, depending on the CACHE_BACKEND setting.
+    """
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            if settings.CACHE_BACKEND == "sqlite":
+                cache = SQLiteCache(namespace, settings.CACHE_SQLITE_PATH, default_ttl, max_entries)
+            elif settings.CACHE_BACKEND == "memory":
+                cache = TTLCache(default_ttl, max_entries)
+            else:
+                raise ValueError(f"Unknown CACHE_BACKEND '{settings.CACHE_BACKEND}'. Use 'memory' or 'sqlite'.")
+            _caches[namespace] = cache
+        return cache
@@ -0,0 +1,107 @@
+# In agentic-system/services/cancellation_service.py
+
+import asyncio
+from contextvars import ContextVar
+from typing import Any, Awaitable, Optional
+
+from fastapi import HTTPException, Request
+
+from config import settings
+from services.metrics_service import metrics
+
+# ==============================================================================
+#  Stops agent and LLM work whose client has gone away.
+#  Starlette keeps running an endpoint after the client disconnects, so a
+#  closed tab still costs a full agent loop. cancel_on_disconnect() runs the
+#  work as a task, polls the connection, and cancels the task when the client
+#  is gone: pending LLM calls are cancelled by asyncio, and Firestore streams
+#  in tool threads stop via the read ledger (see stop_reads_on_cancel).
+# ==============================================================================
+
+metrics.describe("cancelled_requests_total", "Requests whose work was cancelled because the client went away, by kind.")
+metrics.describe("cancelled_llm_tokens_saved_total", "Estimated LLM prompt tokens not spent thanks to cancellations, by kind.")
+
+# nginx's code for "client closed request"; nobody receives it, but it shows up in access logs.
+CLIENT_CLOSED_REQUEST = 499
+
+
+class WorkUsage:
+    """LLM tokens spent (and, if known up front, expected) by one request's work."""
+
+    def __init__(self):
+        self.spent_tokens = 0
+        self.expected_tokens: Optional[int] = None
+
+
+_current_usage: ContextVar[Optional[WorkUsage]] = ContextVar("work_usage", default=None)
+
+
+def begin_usage() -> WorkUsage:
+    """Starts token tracking for the work about to run in the current context."""
+    usage = WorkUsage()
+    _current_usage.set(usage)
+    return usage
+
+
+def record_llm_tokens(spent: int = 0, expected: Optional[int] = None) -> None:
+    """Called by the LLM callers (agents, report generator) to report their estimated prompt tokens."""
+    usage = _current_usage.get()
+    if usage is None:
+        return
+    usage.spent_tokens += spent
+    if expected is not None:
+        usage.expected_tokens = expected
+
+
+def record_cancellation(kind: str, usage: Optional[WorkUsage]) -> None:
+    """
+    Counts a cancelled request and the tokens it did not spend. When the caller did not say
+    how many tokens it expected, the average of completed agent questions is used.
+    """
+    metrics.inc("cancelled_requests_total", kind=kind)
+    if usage is None:
+        return
+    expected = usage.expected_tokens
+    if expected is None:
+        count, total = metrics.summary_totals("agent_question_prompt_tokens")
+        expected = int(total / count) if count else 0
+    saved = max(expected - usage.spent_tokens, 0)
+    if saved:
+        metrics.inc("cancelled_llm_tokens_saved_total", saved, kind=kind)
+    print(f"Cancelled {kind} work after the client disconnected (~{saved} prompt tokens saved).")
+
+
+async def cancel_on_disconnect(request: Request, work: Awaitable[Any], kind: str) -> Any:
+    """
+    Awaits 'work' while checking every DISCONNECT_POLL_SECONDS that the client is still there.
+
+    Args:
+        request: The Starlette request whose connection is watched.
+        work: The coroutine doing the request's work.
+        kind: Label for the metrics ("chat", "report").
+
+    Returns:
+        The result of 'work'. If the client disconnects first, the work is cancelled and
+        an HTTPException with status 499 is raised (the response goes nowhere).
+    """
+    usage = begin_usage()
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                break
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+    task.cancel()
+    try:
+        await task
+    except BaseException:
+        # The work's own outcome no longer matters; it is usually a CancelledError.
+        pass
+    record_cancellation(kind, usage)
+    raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="The client closed the request.")
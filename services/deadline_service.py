@@ -0,0 +1,106 @@
+# In agentic-system/services/deadline_service.py
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from config import settings
+
+# ==============================================================================
+#  Per-request deadlines.
+#  Every API request gets an overall time budget (REQUEST_DEADLINE_SECONDS, or
+#  the client's X-Request-Deadline header). It lives in a context variable, so
+#  the auth dependency, the tools' Firestore calls (as RPC timeouts), the LLM
+#  wrapper (as per-call timeouts) and the agent loop all see the same deadline
+#  without it being passed through every signature.
+# ==============================================================================
+
+DEADLINE_HEADER = "X-Request-Deadline"
+
+
+class DeadlineExceededError(Exception):
+    """Raised when work is about to start although the request's deadline has passed."""
+
+
+class Deadline:
+    """
+    An absolute point on the monotonic clock. It is a mutable object shared by the request's
+    tasks and threads, so clear() (e.g. for full exports) reaches all of them.
+    """
+
+    def __init__(self, seconds: Optional[float]):
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    def clear(self) -> None:
+        self.expires_at = None
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def parse_deadline_header(value: Optional[str]) -> float:
+    """The request's budget in seconds: the header value if valid (capped), else the configured default."""
+    if value:
+        try:
+            seconds = float(value)
+        except ValueError:
+            seconds = 0
+        if seconds > 0:
+            return min(seconds, settings.REQUEST_DEADLINE_MAX_SECONDS)
+    return settings.REQUEST_DEADLINE_SECONDS
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Runs the block under a deadline 'seconds' from now (None or 0 = no deadline)."""
+    token = _current_deadline.set(Deadline(seconds))
+    try:
+        yield _current_deadline.get()
+    finally:
+        _current_deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current deadline (may be negative), or None without a deadline."""
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def deadline_expired() -> bool:
+    remaining = remaining_time()
+    return remaining is not None and remaining <= 0
+
+
+def check_deadline(what: str) -> None:
+    """Raises DeadlineExceededError if the deadline has passed; 'what' names the work for the message."""
+    if deadline_expired():
+        raise DeadlineExceededError(f"The request deadline passed before {what}.")
+
+
+def clear_deadline() -> None:
+    """Lifts the deadline for the rest of the current request (e.g. long streaming exports)."""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.clear()
+
+
+class DeadlineMiddleware:
+    """Pure ASGI middleware that puts every HTTP request under its deadline."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = dict(scope.get("headers") or []).get(DEADLINE_HEADER.lower().encode("latin-1"))
+        seconds = parse_deadline_header(header.decode("latin-1") if header else None)
+        with deadline_scope(seconds):
+            await self.app(scope, receive, send)
@@ -0,0 +1,73 @@
+# In agentic-system/services/decoding_service.py
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+from config import settings
+
+# ==============================================================================
+#  Bulk decoding of Firestore documents into plain dicts.
+#  Building `Model(id=doc.id, **doc.to_dict()).dict()` per row pays for a model
+#  instance, a validation and a dump every time. Here each snapshot is decoded
+#  with to_dict() exactly once and the whole list is validated in one pass.
+# ==============================================================================
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    # Building a TypeAdapter compiles a validator, so keep one per model.
+    return TypeAdapter(List[model])
+
+
+def decode_documents(
+    docs: Iterable[Any],
+    model: Type[BaseModel],
+    where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    trusted: Optional[bool] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Decodes Firestore snapshots into plain dicts shaped like 'model'.
+
+    Args:
+        docs: An iterable of DocumentSnapshots (e.g. the result of `.stream()`).
+        model: The Pydantic model describing the documents. The document ID is stored in 'id'.
+        where: Optional filter applied to the raw document data before validation.
+        trusted: Skip validation and only project onto the model's fields.
+                 Defaults to the TRUSTED_FIRESTORE_READS setting.
+
+    Returns:
+        A list of dicts, one per accepted document, with the same keys `model.dict()` would produce.
+    """
+    rows = []
+    for doc in docs:
+        data = doc.to_dict() or {}
+        if where is not None and not where(data):
+            continue
+        data["id"] = doc.id
+        rows.append(data)
+    return decode_rows(rows, model, trusted)
+
+
+def decode_rows(
+    rows: List[Dict[str, Any]],
+    model: Type[BaseModel],
+    trusted: Optional[bool] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Same as decode_documents(), for document data the caller has already read with
+    to_dict() (and stored the document ID in 'id'), e.g. to inspect the raw fields first.
+    """
+    if not rows:
+        return []
+
+    if settings.TRUSTED_FIRESTORE_READS if trusted is None else trusted:
+        defaults = {
+            name: None if field.is_required() else field.get_default(call_default_factory=True)
+            for name, field in model.model_fields.items()
+        }
+        return [{name: row.get(name, default) for name, default in defaults.items()} for row in rows]
+
+    adapter = _list_adapter(model)
+    return adapter.dump_python(adapter.validate_python(rows))
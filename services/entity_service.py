@@ -0,0 +1,183 @@
+# In agentic-system/services/entity_service.py
+
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+from services.metrics_service import metrics
+from services.scan_service import Aggregator, as_list, scan_engine
+
+# ==============================================================================
+#  Users type names loosely ("ramesh", "Ramesh K.", "Kothrud village"), but the
+#  tools query Firestore with exact `==` matches. This module keeps a dictionary
+#  of the names that actually exist in the data and maps user input onto them.
+# ==============================================================================
+
+# The kinds of entity we know how to resolve, mapped to the form fields they come from.
+STAFF = "staff"
+VILLAGE = "village"
+PROJECT = "project"
+
+# Words that carry no identifying information for a given kind of entity.
+_NOISE_WORDS = {
+    STAFF: {"mr", "mrs", "ms", "miss", "dr", "shri", "smt", "sri", "sir", "madam"},
+    VILLAGE: {"village", "villages", "gram", "gaon", "vill", "gp"},
+    PROJECT: {"project", "projects", "the"},
+}
+
+metrics.describe("entity_resolution_failures_total", "Name lookups that fell back to the raw name because the entity dictionary could not be built, by kind and error.")
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_name(name: str, kind: str) -> str:
+    """
+    Reduces a name to a canonical comparison form: accents removed, lower-cased,
+    punctuation stripped and kind-specific noise words (e.g. "village") dropped.
+    """
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = _PUNCTUATION_RE.sub(" ", text)
+    tokens = [t for t in _WHITESPACE_RE.split(text) if t and t not in _NOISE_WORDS.get(kind, set())]
+    return " ".join(tokens)
+
+
+@scan_engine.register
+class EntityAggregator(Aggregator):
+    """
+    Collects, for each entity kind, a mapping of normalised name -> the most common
+    original spelling, from the shared project and activity scan.
+    """
+    name = "entities"
+    fields = {
+        "VVDProjects": ["Assigned to", "Village", "Villages", "Project Name"],
+        "VVDActivity": ["Assigned to", "Village", "Villages"],
+    }
+
+    def __init__(self):
+        self.spellings = {kind: defaultdict(Counter) for kind in (STAFF, VILLAGE, PROJECT)}
+
+    def add(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        values = {
+            STAFF: as_list(data.get("Assigned to")),
+            VILLAGE: as_list(data.get("Village") or data.get("Villages")),
+            PROJECT: as_list(data.get("Project Name")) if collection == "VVDProjects" else [],
+        }
+        for kind, raw_values in values.items():
+            for raw in raw_values:
+                if isinstance(raw, str) and raw.strip():
+                    normalized = normalize_name(raw, kind)
+                    if normalized:
+                        self.spellings[kind][normalized][raw] += 1
+
+    def result(self) -> Dict[str, Dict[str, str]]:
+        return {
+            kind: {normalized: counts.most_common(1)[0][0] for normalized, counts in by_name.items()}
+            for kind, by_name in self.spellings.items()
+        }
+
+
+def get_entity_dictionary() -> Dict[str, Dict[str, str]]:
+    """Returns the entity dictionary from the shared scan, which is redone when the refresh window has passed."""
+    return scan_engine.get("entities")
+
+
+def _similarity(query: str, candidate: str) -> float:
+    """
+    Scores how well a normalised query matches a normalised candidate (0..1).
+    Abbreviated names ("ramesh k" -> "ramesh kumar") score highly because every
+    query token is a prefix of the candidate's tokens in order.
+    """
+    if query == candidate:
+        return 1.0
+
+    query_tokens = query.split()
+    candidate_tokens = candidate.split()
+    score = SequenceMatcher(None, query, candidate).ratio()
+
+    # Every query token is the start of a distinct candidate token, in order.
+    position = 0
+    matched = 0
+    for token in query_tokens:
+        while position < len(candidate_tokens) and not candidate_tokens[position].startswith(token):
+            position += 1
+        if position == len(candidate_tokens):
+            break
+        matched += 1
+        position += 1
+    if query_tokens and matched == len(query_tokens):
+        coverage = len(query.replace(" ", "")) / max(len(candidate.replace(" ", "")), 1)
+        score = max(score, 0.85 + 0.15 * coverage)
+
+    # Same set of words in a different order ("kumar ramesh").
+    if sorted(query_tokens) == sorted(candidate_tokens):
+        score = max(score, 0.95)
+
+    return score
+
+
+def resolve_entity(kind: str, name: str) -> Tuple[Optional[str], List[str]]:
+    """
+    Maps a user-supplied name onto the canonical spelling stored in Firestore.
+
+    Args:
+        kind (str): One of STAFF, VILLAGE or PROJECT.
+        name (str): The name as typed by the user.
+
+    Returns:
+        A tuple (canonical_name, candidates). 'canonical_name' is None when the name
+        could not be resolved confidently; 'candidates' then lists the closest known names.
+    """
+    known = get_entity_dictionary().get(kind, {})
+    query = normalize_name(name, kind)
+    if not query:
+        return None, []
+
+    if query in known:
+        return known[query], []
+
+    ranked = sorted(
+        ((_similarity(query, normalized), original) for normalized, original in known.items()),
+        reverse=True,
+    )
+    ranked = [(score, original) for score, original in ranked if score >= settings.ENTITY_CANDIDATE_SCORE]
+    if not ranked:
+        return None, []
+
+    top_score, top_name = ranked[0]
+    runner_up = ranked[1][0] if len(ranked) > 1 else 0.0
+    # Only auto-resolve when the best match is strong and clearly ahead of the rest.
+    if top_score >= settings.ENTITY_AUTO_RESOLVE_SCORE and top_score - runner_up >= 0.05:
+        return top_name, []
+
+    return None, [original for _, original in ranked[:settings.ENTITY_MAX_CANDIDATES]]
+
+
+def resolve_or_suggest(kind: str, name: str, label: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Convenience wrapper for the agent tools.
+    Returns (canonical_name, None) on success, or (None, tool_response) where the response
+    tells the agent which known names are closest so it can pick one without guessing.
+    """
+    try:
+        canonical, candidates = resolve_entity(kind, name)
+    except Exception as e:
+        # Never block a query because the dictionary could not be built; fall back to the raw name.
+        # The fallback hides the failure from the agent, so make it visible in the logs and metrics.
+        metrics.inc("entity_resolution_failures_total", kind=kind, error=type(e).__name__)
+        print(f"ERROR: The entity dictionary could not be built; resolving {kind} name '{name}' as typed. "
+              f"{type(e).__name__}: {e}")
+        return name, None
+
+    if canonical:
+        return canonical, None
+
+    if candidates:
+        message = f"No {label} named '{name}' was found. The closest matches are listed in 'candidates'."
+    else:
+        message = f"No {label} named '{name}' was found, and no similar names are known."
+    return None, {"status": "not_found", "message": message, "candidates": candidates}
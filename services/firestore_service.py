@@ -2,7 +2,11 @@
 
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.cloud.firestore_v1.field_path import FieldPath
 import os
+from typing import Iterable, List
+
+from services.read_accounting_service import instrument_client
 
 # This logic runs once when the module is first imported (e.g., in main.py)
 if not firebase_admin._apps:
@@ -27,5 +31,14 @@ if not firebase_admin._apps:
                   "or your environment is configured for ADC.")
             raise
 
-# Export the firestore database client for use in other services and tools
-firestore_db = firestore.client()
\ No newline at end of file
+# Export the firestore database client for use in other services and tools.
+# It is wrapped so that every document read is counted against the current request (see read_accounting_service).
+firestore_db = instrument_client(firestore.client())
+
+
+def field_paths(names: Iterable[str]) -> List[str]:
+    """
+    Field paths for Query.select(). Form field names such as "Project Name" or "Assigned to"
+    contain spaces, which select() rejects unless the name is quoted (`Project Name`).
+    """
+    return [FieldPath(name).to_api_repr() for name in names]
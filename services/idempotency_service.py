@@ -0,0 +1,164 @@
+# In agentic-system/services/idempotency_service.py
+
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException, Request, Response, status
+
+from config import settings
+from services.cache_service import get_cache
+from services.metrics_service import metrics
+from services.serialization_service import dumps
+
+# ==============================================================================
+#  Idempotency keys for expensive endpoints.
+#  Clients on flaky connections retry requests they already sent. When a retry
+#  carries the same Idempotency-Key header as an earlier request from the same
+#  principal, it attaches to the execution that is still running or gets the
+#  stored result back, instead of starting another LLM pipeline.
+# ==============================================================================
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+_MAX_KEY_LENGTH = 255
+
+# Completed results live in the configured cache backend, so with CACHE_BACKEND=sqlite
+# a retry that lands on another worker process is still answered from the stored result.
+_results = get_cache(
+    "idempotency",
+    default_ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+    max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+)
+metrics.describe("idempotent_executions_abandoned_total", "Idempotent executions cancelled because every waiting client went away.")
+
+
+class _InFlight:
+    """A running execution and the number of requests currently waiting on it."""
+
+    def __init__(self, fingerprint: str, task: "asyncio.Task"):
+        self.fingerprint = fingerprint
+        self.task = task
+        self.waiters = 0
+        self.abandon_handle: Optional[asyncio.TimerHandle] = None
+
+
+# Executions that are still running can only be shared within this process.
+_in_flight: Dict[str, _InFlight] = {}
+
+
+def request_fingerprint(payload: Any) -> str:
+    """A stable hash of the request body, used to reject a reused key with a different body."""
+    return hashlib.sha256(dumps(payload)).hexdigest()
+
+
+def client_principal(request: Request) -> str:
+    """
+    Identifies the caller of an unauthenticated endpoint by its client address.
+    Clients can write anything into X-Forwarded-For, so only the entries appended by our own
+    proxies (the last TRUSTED_PROXY_HOPS of them) are trusted; the leftmost is never used.
+    """
+    hops = settings.TRUSTED_PROXY_HOPS
+    forwarded = [entry.strip() for entry in request.headers.get("x-forwarded-for", "").split(",") if entry.strip()]
+    if hops > 0 and len(forwarded) >= hops:
+        return "ip:" + forwarded[-hops]
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+async def run_idempotent(
+    idempotency_key: Optional[str],
+    principal: str,
+    fingerprint: str,
+    response: Response,
+    execute: Callable[[], Awaitable[Any]],
+) -> Any:
+    """
+    Runs 'execute' at most once per (principal, idempotency key).
+
+    Args:
+        idempotency_key: The value of the Idempotency-Key header, or None to run normally.
+        principal: Who is calling and on which endpoint (e.g. "chat:<uid>"); keys are scoped to it.
+        fingerprint: Hash of the request body (see request_fingerprint).
+        response: The endpoint's Response, used to mark replayed results with a header.
+        execute: Zero-argument coroutine function that does the real work.
+
+    Returns:
+        The result of 'execute', either freshly computed or replayed.
+    """
+    if not idempotency_key:
+        return await execute()
+
+    if len(idempotency_key) > _MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{IDEMPOTENCY_HEADER} must be at most {_MAX_KEY_LENGTH} characters."
+        )
+
+    scoped_key = f"{principal}:{idempotency_key}"
+
+    stored = _results.get(scoped_key)
+    if stored is not None:
+        stored_fingerprint, result = stored
+        _check_fingerprint(stored_fingerprint, fingerprint)
+        response.headers[REPLAYED_HEADER] = "true"
+        return result
+
+    in_flight = _in_flight.get(scoped_key)
+    if in_flight is not None:
+        _check_fingerprint(in_flight.fingerprint, fingerprint)
+        response.headers[REPLAYED_HEADER] = "true"
+        return await _wait_for(in_flight)
+
+    async def execute_and_store():
+        result = await execute()
+        # Only successful results are stored; a failed request may be retried with the same key.
+        _results.set(scoped_key, (fingerprint, result))
+        return result
+
+    task = asyncio.ensure_future(execute_and_store())
+    in_flight = _InFlight(fingerprint, task)
+    _in_flight[scoped_key] = in_flight
+    task.add_done_callback(lambda finished: _forget_in_flight(scoped_key, finished))
+    return await _wait_for(in_flight)
+
+
+async def _wait_for(in_flight: _InFlight) -> Any:
+    """
+    Waits on a shared execution. shield() keeps one waiter giving up from cancelling the
+    execution the others wait on; once the last waiter has gone, the execution is
+    cancelled after a grace period unless a retry attaches to it first.
+    """
+    in_flight.waiters += 1
+    if in_flight.abandon_handle is not None:
+        in_flight.abandon_handle.cancel()
+        in_flight.abandon_handle = None
+    try:
+        return await asyncio.shield(in_flight.task)
+    finally:
+        in_flight.waiters -= 1
+        if in_flight.waiters == 0 and not in_flight.task.done():
+            in_flight.abandon_handle = asyncio.get_running_loop().call_later(
+                settings.IDEMPOTENCY_ABANDON_GRACE_SECONDS, _abandon, in_flight
+            )
+
+
+def _abandon(in_flight: _InFlight) -> None:
+    in_flight.abandon_handle = None
+    if in_flight.waiters == 0 and not in_flight.task.done():
+        print("Cancelling an idempotent execution that no client is waiting for any more.")
+        metrics.inc("idempotent_executions_abandoned_total")
+        in_flight.task.cancel()
+
+
+def _forget_in_flight(scoped_key: str, task: "asyncio.Task") -> None:
+    entry = _in_flight.get(scoped_key)
+    if entry is not None and entry.task is task:
+        del _in_flight[scoped_key]
+
+
+def _check_fingerprint(expected: str, actual: str) -> None:
+    if expected != actual:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"This {IDEMPOTENCY_HEADER} was already used with a different request body."
+        )
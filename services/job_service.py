@@ -0,0 +1,220 @@
+# In agentic-system/services/job_service.py
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# ==============================================================================
+#  Background jobs for slow LLM work (report generation).
+#  A POST stores the job in a local SQLite file and returns straight away; a
+#  small pool of asyncio workers in each process picks jobs up. Because the
+#  state lives on disk, jobs accepted before a restart are picked up again.
+# ==============================================================================
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while the pool already has its maximum backlog."""
+
+
+class JobStore:
+    """
+    Persists jobs in SQLite (WAL mode, so several worker processes can share the file).
+    Every job row records the PID of the process that owns it, which lets a restarted
+    process tell abandoned jobs apart from jobs another live worker is running.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " result TEXT,"
+                " error TEXT,"
+                " owner_pid INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def create(self, kind: str, payload: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO jobs (id, kind, status, payload, owner_pid, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, json.dumps(payload), os.getpid(), now, now),
+        )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def update(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        self._connection().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+            (status, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+        )
+
+    def claim_abandoned(self, kind: str) -> List[str]:
+        """
+        Takes ownership of unfinished jobs whose owning process is no longer alive
+        and returns their IDs. The compare-and-swap on owner_pid makes sure that two
+        workers starting at the same time never claim the same job.
+        """
+        connection = self._connection()
+        rows = connection.execute(
+            "SELECT id, owner_pid FROM jobs WHERE kind = ? AND status IN (?, ?) ORDER BY created_at",
+            (kind, QUEUED, RUNNING),
+        ).fetchall()
+        claimed = []
+        for row in rows:
+            if row["owner_pid"] != os.getpid() and _process_alive(row["owner_pid"]):
+                continue
+            cursor = connection.execute(
+                "UPDATE jobs SET owner_pid = ?, status = ?, updated_at = ? WHERE id = ? AND owner_pid = ?",
+                (os.getpid(), QUEUED, time.time(), row["id"], row["owner_pid"]),
+            )
+            if cursor.rowcount:
+                claimed.append(row["id"])
+        return claimed
+
+    def purge_finished(self, older_than: float) -> None:
+        self._connection().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (SUCCEEDED, FAILED, time.time() - older_than),
+        )
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to another user.
+        return True
+    return True
+
+
+class JobPool:
+    """
+    A bounded pool of asyncio workers that runs one kind of job.
+
+    Args:
+        kind (str): The job type stored with each job (e.g. "activity_report").
+        handler: An async function that takes the job payload and returns a JSON-serialisable
+                 result dict. Exceptions mark the job as failed with the exception message.
+        store (JobStore): Where job state is persisted.
+        workers (int): Number of jobs that may run at the same time in this process.
+        max_backlog (int): Number of accepted-but-unfinished jobs after which submissions are refused.
+        retention_seconds (float): How long finished jobs are kept.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        store: JobStore,
+        workers: int,
+        max_backlog: int,
+        retention_seconds: float,
+    ):
+        self.kind = kind
+        self.handler = handler
+        self.store = store
+        self.workers = max(workers, 1)
+        self.max_backlog = max_backlog
+        self.retention_seconds = retention_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._backlog = 0
+
+    async def start(self) -> None:
+        """Starts the workers and resumes any jobs left unfinished by a previous process."""
+        self._queue = asyncio.Queue()
+        self.store.purge_finished(self.retention_seconds)
+        for job_id in self.store.claim_abandoned(self.kind):
+            print(f"Resuming {self.kind} job {job_id} from a previous run.")
+            self._enqueue(job_id)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        print(f"{self.kind} job pool started with {self.workers} workers.")
+
+    async def stop(self) -> None:
+        # Unfinished jobs stay in the store and are resumed by the next process to start.
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, payload: Dict[str, Any]) -> str:
+        """Persists a new job and queues it. Raises JobQueueFullError if the backlog is full."""
+        if self._queue is None:
+            raise RuntimeError(f"The {self.kind} job pool has not been started.")
+        if self._backlog >= self.max_backlog:
+            raise JobQueueFullError(f"Too many {self.kind} jobs are waiting; please retry later.")
+        job_id = self.store.create(self.kind, payload)
+        self._enqueue(job_id)
+        return job_id
+
+    def _enqueue(self, job_id: str) -> None:
+        self._backlog += 1
+        self._queue.put_nowait(job_id)
+
+    async def _worker(self, worker_number: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._backlog -= 1
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINISHED_STATES:
+            return
+        self.store.update(job_id, RUNNING)
+        try:
+            result = await self.handler(job["payload"])
+        except asyncio.CancelledError:
+            # Shutting down: leave the job for the next process to resume.
+            raise
+        except Exception as e:
+            print(f"An error occurred while running {self.kind} job {job_id}: {e}")
+            self.store.update(job_id, FAILED, error=str(e))
+            return
+        self.store.update(job_id, SUCCEEDED, result=result)
@@ -0,0 +1,338 @@
+# In agentic-system/services/llm_service.py
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from config import settings
+from services.deadline_service import DeadlineExceededError, remaining_time
+
+# ==============================================================================
+#  Every Gemini call in the agents and the report generator goes through
+#  ResilientLLM. It adds what the raw ChatGoogleGenerativeAI client lacks:
+#    - a per-call timeout, shortened to what is left of the request deadline,
+#    - an optional hedged second request once the first one is slower than
+#      the recent latency percentile,
+#    - retries with full-jitter backoff for errors worth retrying,
+#    - a circuit breaker that fails fast while the upstream is degraded.
+#  The wrapped object can be any LangChain Runnable, so tests and benchmarks
+#  can substitute a fake model that injects latency and errors.
+# ==============================================================================
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the LLM while its circuit breaker is open."""
+
+
+# Exception class names (from google.api_core, httpx, grpc, ...) that indicate a transient problem.
+_RETRYABLE_ERROR_NAMES = {
+    "TimeoutError",
+    "ResourceExhausted",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "InternalServerError",
+    "TooManyRequests",
+    "Aborted",
+    "ConnectError",
+    "ReadTimeout",
+}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Returns True for timeouts, connection errors, rate limits and 5xx responses."""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in _RETRYABLE_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return isinstance(code, int) and (code == 429 or 500 <= code < 600)
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker. 'closed' lets calls through; after 'failure_threshold'
+    consecutive failures it turns 'open' and rejects calls for 'reset_timeout' seconds;
+    then it goes 'half_open' and lets a single trial call decide whether to close again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_progress = False
+        self.total_rejections = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state_locked()
+
+    def _current_state_locked(self) -> str:
+        if self._state == "open" and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = "half_open"
+            self._trial_in_progress = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self._current_state_locked()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_progress:
+                self._trial_in_progress = True
+                return True
+            self.total_rejections += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = "closed"
+            self._consecutive_failures = 0
+            self._trial_in_progress = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+                if self._state != "open":
+                    print(f"Circuit breaker '{self.name}' opened after {self._consecutive_failures} consecutive failures.")
+                self._state = "open"
+                self._opened_at = self._clock()
+                self._trial_in_progress = False
+
+    def release_trial(self) -> None:
+        """Ends a call that says nothing about the upstream's health (e.g. our own deadline ran out)."""
+        with self._lock:
+            self._trial_in_progress = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state_locked()
+            retry_in = max(self.reset_timeout - (self._clock() - self._opened_at), 0.0) if state == "open" else 0.0
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "rejected_calls": self.total_rejections,
+                "retry_in_seconds": round(retry_in, 1),
+            }
+
+
+class LatencyTracker:
+    """Keeps the most recent successful call latencies to derive the hedging threshold."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percentile: float, min_samples: int) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < max(min_samples, 1):
+                return None
+            ordered = sorted(self._samples)
+        index = min(int(len(ordered) * percentile / 100.0), len(ordered) - 1)
+        return ordered[index]
+
+
+# One breaker per upstream model: if Gemini is degraded, every agent should fail fast together.
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.LLM_BREAKER_RESET_SECONDS,
+            )
+        return _breakers[name]
+
+
+def circuit_breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Returns the state of every circuit breaker, for the health endpoint."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+class ResilientLLM(Runnable[Any, Any]):
+    """
+    Wraps a chat model (or any Runnable) with a deadline, hedging, retries and a circuit breaker.
+    It is a Runnable itself, so it can be handed to create_react_agent, LLMChain or `prompt | llm`.
+
+    Args:
+        llm: The Runnable to call.
+        breaker: The CircuitBreaker guarding the upstream service.
+        timeout: Seconds allowed per attempt (hedged duplicates share the same deadline).
+        max_retries: Extra attempts after the first for retryable errors.
+        base_delay / max_delay: Full-jitter backoff bounds, in seconds.
+        hedge: Whether to send a duplicate request after the latency percentile.
+        hedge_percentile / hedge_min_samples: When hedging kicks in.
+    """
+
+    def __init__(
+        self,
+        llm: Runnable,
+        breaker: CircuitBreaker,
+        timeout: float = settings.LLM_TIMEOUT_SECONDS,
+        max_retries: int = settings.LLM_MAX_RETRIES,
+        base_delay: float = settings.LLM_RETRY_BASE_DELAY,
+        max_delay: float = settings.LLM_RETRY_MAX_DELAY,
+        hedge: bool = settings.LLM_HEDGE_ENABLED,
+        hedge_percentile: float = settings.LLM_HEDGE_PERCENTILE,
+        hedge_min_samples: int = settings.LLM_HEDGE_MIN_SAMPLES,
+    ):
+        self.llm = llm
+        self.breaker = breaker
+        self.timeout = timeout
+        self.max_retries = max(max_retries, 0)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = LatencyTracker()
+        self.hedged_calls = 0
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": a uniform delay up to the exponential bound spreads out retry storms.
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _call_timeout(self) -> float:
+        """The timeout for the next call: the configured one, or less if the request deadline is closer."""
+        remaining = remaining_time()
+        if remaining is None:
+            return self.timeout
+        if remaining <= 0:
+            raise DeadlineExceededError("The request deadline passed before the LLM call.")
+        return min(self.timeout, remaining)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        last_error: Optional[BaseException] = None
+        for attempt in range(self.max_retries + 1):
+            timeout = self._call_timeout()
+            if not self.breaker.allow_request():
+                raise CircuitOpenError(f"The LLM circuit '{self.breaker.name}' is open; failing fast.") from last_error
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(self._hedged_call(input, config, **kwargs), timeout=timeout)
+            except asyncio.CancelledError:
+                self.breaker.release_trial()
+                raise
+            except asyncio.TimeoutError as e:
+                if timeout < self.timeout:
+                    # Cut short by the request deadline, not by a slow upstream: no retry, no breaker failure.
+                    self.breaker.release_trial()
+                    raise DeadlineExceededError("The request deadline passed during the LLM call.") from e
+                self.breaker.record_failure()
+                last_error = e
+                print(f"LLM call timed out on attempt {attempt + 1} after {timeout:.1f}s.")
+                if attempt < self.max_retries:
+                    await self._sleep_before_retry(attempt)
+                continue
+            except Exception as e:
+                if not is_retryable(e):
+                    # A bad request says nothing about the upstream's health: neither trip the
+                    # breaker nor reset its failure count (or close it from half-open).
+                    self.breaker.release_trial()
+                    raise
+                self.breaker.record_failure()
+                last_error = e
+                print(f"LLM call failed on attempt {attempt + 1} ({type(e).__name__}: {e}).")
+                if attempt < self.max_retries:
+                    await self._sleep_before_retry(attempt)
+                continue
+            self.breaker.record_success()
+            self.latencies.record(time.monotonic() - started)
+            return result
+        raise last_error
+
+    async def _sleep_before_retry(self, attempt: int) -> None:
+        delay = self._backoff(attempt)
+        remaining = remaining_time()
+        if remaining is not None and remaining <= delay:
+            raise DeadlineExceededError("Not enough time left before the request deadline to retry the LLM call.")
+        await asyncio.sleep(delay)
+
+    async def _hedged_call(self, input: Any, config: Optional[RunnableConfig], **kwargs: Any) -> Any:
+        threshold = self.latencies.percentile(self.hedge_percentile, self.hedge_min_samples) if self.hedge else None
+        primary = asyncio.ensure_future(self.llm.ainvoke(input, config, **kwargs))
+        if threshold is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=threshold)
+        if done:
+            return primary.result()
+
+        # The first request is in the slow tail: race it against a duplicate.
+        self.hedged_calls += 1
+        backup = asyncio.ensure_future(self.llm.ainvoke(input, config, **kwargs))
+        pending = {primary, backup}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            # Both attempts failed; surface the primary's error.
+            return primary.result()
+        finally:
+            for task in (primary, backup):
+                if not task.done():
+                    task.cancel()
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        """
+        Synchronous path with retries and the circuit breaker. The deadline and hedging need
+        an event loop, so they only apply to ainvoke (which is what the FastAPI routes use).
+        """
+        last_error: Optional[BaseException] = None
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow_request():
+                raise CircuitOpenError(f"The LLM circuit '{self.breaker.name}' is open; failing fast.") from last_error
+            try:
+                result = self.llm.invoke(input, config, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.release_trial()
+                    raise
+                self.breaker.record_failure()
+                last_error = e
+                if attempt < self.max_retries:
+                    time.sleep(self._backoff(attempt))
+                continue
+            self.breaker.record_success()
+            return result
+        raise last_error
+
+
+def create_chat_model(model: str = "gemini-2.0-flash", **kwargs: Any) -> ResilientLLM:
+    """
+    Builds a ChatGoogleGenerativeAI client wrapped in ResilientLLM.
+    The client's own retry loop is reduced to a single attempt so that retries
+    are not multiplied between the two layers.
+
+    Args:
+        model (str): The Gemini model name.
+        **kwargs: Passed through to ChatGoogleGenerativeAI (temperature, api key, ...).
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    kwargs.setdefault("max_retries", 1)
+    llm = ChatGoogleGenerativeAI(model=model, **kwargs)
+    return ResilientLLM(llm, breaker=get_circuit_breaker(model))
@@ -0,0 +1,162 @@
+# In agentic-system/services/loop_monitor_service.py
+
+import asyncio
+import collections
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Deque, Dict, List, Optional
+
+from config import settings
+from services.metrics_service import metrics
+
+# ==============================================================================
+#  Event-loop stall detector.
+#  Blocking work inside `async def` code (a sync Firestore call, a slow print to
+#  a full pipe, CPU-heavy parsing) freezes every request on the worker, and we
+#  only notice when p99 jumps. A heartbeat task measures how late the loop wakes
+#  up; a watchdog thread notices when the heartbeat is overdue, and while the
+#  loop is still blocked it captures the loop thread's stack and the route being
+#  served. Stalls are printed and kept for GET /debug/loop-stalls.
+#
+#  Opt-in (LOOP_MONITOR_ENABLED): the cost is one wake-up per interval on the
+#  loop and on the watchdog thread.
+# ==============================================================================
+
+metrics.describe("event_loop_lag_seconds", "How late the event loop heartbeat woke up.")
+metrics.describe("event_loop_stalls_total", "Event loop stalls longer than LOOP_STALL_THRESHOLD_SECONDS, by route.")
+
+# Frames from these files are the machinery around the blocking call, not the call itself.
+_FRAMEWORK_PATHS = ("/asyncio/", "/starlette/", "/fastapi/", "/uvicorn/", "/anyio/")
+
+
+def _route_of(frames: List[Any]) -> Dict[str, Optional[str]]:
+    """Finds the ASGI scope of the request being served by walking the blocked stack outwards."""
+    for frame in frames:
+        scope = frame.f_locals.get("scope")
+        if isinstance(scope, dict) and scope.get("type") in ("http", "websocket"):
+            return {"route": scope.get("path"), "method": scope.get("method", "WS")}
+    return {"route": None, "method": None}
+
+
+def _capture(thread_id: int, limit: int) -> Dict[str, Any]:
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return {"route": None, "method": None, "stack": [], "blocking_frame": None}
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    route = _route_of(frames)
+    stack = traceback.StackSummary.extract(((f, f.f_lineno) for f in reversed(frames)), limit=None, lookup_lines=True)
+    lines = [f"{entry.filename}:{entry.lineno} in {entry.name}" + (f": {entry.line}" if entry.line else "") for entry in stack]
+    # The innermost frame that is our own code (or a library it called) is what blocked.
+    blocking = next((line for line in reversed(lines) if not any(path in line for path in _FRAMEWORK_PATHS)), None)
+    return {**route, "stack": lines[-limit:], "blocking_frame": blocking}
+
+
+class LoopMonitor:
+    """Heartbeat on the event loop plus a watchdog thread that captures stalls."""
+
+    def __init__(self, interval: float, threshold: float, history: int, stack_depth: int):
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_depth = stack_depth
+        self.stalls: Deque[Dict[str, Any]] = collections.deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._last_beat = time.monotonic()
+        self._pending: Optional[Dict[str, Any]] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+        self.max_lag = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._heartbeat is not None
+
+    def start(self) -> None:
+        """Starts monitoring the running event loop. Must be called from that loop."""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat = asyncio.get_running_loop().create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        print(f"Event loop monitor started (stall threshold {self.threshold * 1000:.0f} ms).")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._stop.set()
+        self._heartbeat.cancel()
+        try:
+            await self._heartbeat
+        except asyncio.CancelledError:
+            pass
+        self._heartbeat = None
+
+    async def _beat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(now - expected, 0.0)
+            with self._lock:
+                self._last_beat = now
+                stall, self._pending = self._pending, None
+            metrics.observe("event_loop_lag_seconds", lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                # The watchdog normally captured the stack already; a stall shorter than
+                # its polling gap is still recorded, without a stack.
+                self._record(stall or {"route": None, "method": None, "stack": [], "blocking_frame": None}, lag)
+
+    def _watch(self) -> None:
+        poll = min(self.interval, self.threshold) / 2
+        while not self._stop.wait(poll):
+            with self._lock:
+                overdue = time.monotonic() - self._last_beat - self.interval
+                if overdue < self.threshold or self._pending is not None:
+                    continue
+            # Captured outside the lock: walking the frames takes a moment.
+            captured = _capture(self._loop_thread_id, self.stack_depth)
+            captured["detected_after_seconds"] = round(overdue, 3)
+            with self._lock:
+                # Only keep it if the loop is still blocked in the same stall.
+                if time.monotonic() - self._last_beat - self.interval >= self.threshold:
+                    self._pending = captured
+
+    def _record(self, stall: Dict[str, Any], lag: float) -> None:
+        stall["duration_seconds"] = round(lag, 3)
+        stall["at"] = time.time()
+        self.stalls.append(stall)
+        metrics.inc("event_loop_stalls_total", route=stall.get("route") or "-")
+        print(f"Event loop stalled for {lag * 1000:.0f} ms in {stall.get('method') or ''} {stall.get('route') or '(no request)'}; "
+              f"blocking frame: {stall.get('blocking_frame') or 'not captured'}")
+        if stall["stack"]:
+            print("  " + "\n  ".join(stall["stack"]))
+
+    def report(self) -> Dict[str, Any]:
+        """The recorded stalls (newest first) and their totals per blocking frame."""
+        stalls = list(self.stalls)[::-1]
+        by_frame = collections.Counter(s.get("blocking_frame") or "not captured" for s in stalls)
+        return {
+            "enabled": self.running,
+            "threshold_seconds": self.threshold,
+            "max_lag_seconds": round(self.max_lag, 3),
+            "stalls_by_blocking_frame": dict(by_frame.most_common()),
+            "stalls": stalls,
+        }
+
+
+loop_monitor = LoopMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL_SECONDS,
+    threshold=settings.LOOP_STALL_THRESHOLD_SECONDS,
+    history=settings.LOOP_STALL_HISTORY,
+    stack_depth=settings.LOOP_STALL_STACK_DEPTH,
+)
@@ -0,0 +1,102 @@
+# In agentic-system/services/metrics_service.py
+
+import threading
+from typing import Any, Dict, List, Tuple
+
+# ==============================================================================
+#  A minimal in-process metrics registry.
+#  Counters only ever go up; summaries keep count/sum/max of observed values.
+#  Everything is exposed by GET /metrics as JSON or in the Prometheus text format.
+#  With several worker processes each one reports its own numbers.
+# ==============================================================================
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._summaries: Dict[str, Dict[LabelKey, List[float]]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        """Registers a one-line description shown in the Prometheus output."""
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._summaries.setdefault(name, {})
+            stats = series.get(key)
+            if stats is None:
+                series[key] = [1, value, value]
+            else:
+                stats[0] += 1
+                stats[1] += value
+                stats[2] = max(stats[2], value)
+
+    def counter_value(self, name: str, **labels: Any) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def summary_totals(self, name: str) -> Tuple[int, float]:
+        """(count, sum) of a summary across all of its label sets."""
+        with self._lock:
+            series = self._summaries.get(name, {})
+            return int(sum(stats[0] for stats in series.values())), sum(stats[1] for stats in series.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics as JSON-friendly data: {name: [{"labels": {...}, "value": ...}, ...]}."""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            summaries = {
+                name: [
+                    {"labels": dict(key), "count": int(stats[0]), "sum": stats[1], "max": stats[2]}
+                    for key, stats in series.items()
+                ]
+                for name, series in self._summaries.items()
+            }
+        return {"counters": counters, "summaries": summaries}
+
+    def prometheus_text(self) -> str:
+        def render_labels(key: LabelKey, extra: str = "") -> str:
+            parts = [f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in key]
+            if extra:
+                parts.append(extra)
+            return "{" + ",".join(parts) + "}" if parts else ""
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{render_labels(key)} {value:g}")
+            for name, series in sorted(self._summaries.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} summary")
+                for key, (count, total, maximum) in series.items():
+                    lines.append(f"{name}_count{render_labels(key)} {count:g}")
+                    lines.append(f"{name}_sum{render_labels(key)} {total:g}")
+                    lines.append(f"{name}_max{render_labels(key)} {maximum:g}")
+        return "\n".join(lines) + "\n"
+
+
+# The process-wide registry used by every service.
+metrics = MetricsRegistry()
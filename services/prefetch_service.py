@@ -0,0 +1,132 @@
+# In agentic-system/services/prefetch_service.py
+
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import settings
+from models.user_models import User
+from services.metrics_service import metrics
+from services.read_accounting_service import count_reads
+from tools.budget_tools import get_financial_report
+from tools.performance_tools import get_my_performance
+
+# ==============================================================================
+#  Speculative prefetch of the tool result a question most likely needs.
+#  Staff almost always ask about their own assignments and accountants about
+#  the budget overview, yet the Firestore query only starts after the first
+#  LLM round trip has picked the tool. While the agent is thinking, the likely
+#  result is fetched in the background; when the agent calls that tool with
+#  the same arguments, the wrapper takes the in-flight or finished result
+#  instead of querying again.
+# ==============================================================================
+
+metrics.describe("prefetch_total", "Speculative prefetches by tool and outcome (hit_ready, hit_in_flight, wasted).")
+metrics.describe("prefetch_wasted_reads_total", "Firestore documents read by prefetches whose result was never used, by tool.")
+
+_executor = ThreadPoolExecutor(max_workers=max(settings.PREFETCH_WORKERS, 1), thread_name_prefix="prefetch")
+
+PrefetchKey = Tuple[str, Tuple[Tuple[str, Any], ...]]
+
+
+def _key(tool_name: str, kwargs: Dict[str, Any]) -> PrefetchKey:
+    # Arguments left at None are the tool defaults, so {"project_name": None} matches {}.
+    return tool_name, tuple(sorted((k, v) for k, v in kwargs.items() if v is not None))
+
+
+# Per role: which tool to prefetch and with which arguments, given the user.
+PREFETCH_PLANS: Dict[str, Tuple[str, Callable[..., Any], Callable[[User], Dict[str, Any]]]] = {
+    # The staff agent passes the user's display name as user_id (see build_agent_input).
+    "staff": ("get_my_performance", get_my_performance, lambda user: {"user_id": user.display_name}),
+    # Accountants mostly start with the overview of all project budgets.
+    "accountant": ("get_financial_report", get_financial_report, lambda user: {}),
+}
+
+
+class _Prefetch:
+    def __init__(self, tool_name: str, future: Future, counter_box: list):
+        self.tool_name = tool_name
+        self.future = future
+        self.counter_box = counter_box
+        self.used = False
+
+
+class PrefetchSet:
+    """The prefetches started for one question."""
+
+    def __init__(self):
+        self._entries: Dict[PrefetchKey, _Prefetch] = {}
+        self._lock = threading.Lock()
+
+    def start(self, tool_name: str, func: Callable[..., Any], kwargs: Dict[str, Any]) -> None:
+        counter_box: list = []
+
+        def run():
+            # The copied context carries the request's read ledger, so prefetch reads are
+            # accounted (and budgeted) like the tool's own.
+            with count_reads() as counter:
+                counter_box.append(counter)
+                return func(**kwargs)
+
+        future = _executor.submit(contextvars.copy_context().run, run)
+        with self._lock:
+            self._entries[_key(tool_name, kwargs)] = _Prefetch(tool_name, future, counter_box)
+
+    def take(self, tool_name: str, kwargs: Dict[str, Any]) -> Optional[_Prefetch]:
+        with self._lock:
+            entry = self._entries.get(_key(tool_name, kwargs))
+            if entry is None or entry.used:
+                return None
+            entry.used = True
+        metrics.inc("prefetch_total", tool=tool_name, outcome="hit_ready" if entry.future.done() else "hit_in_flight")
+        return entry
+
+    def close(self) -> None:
+        """Records the prefetches that were never used and cancels those that have not started."""
+        with self._lock:
+            unused = [entry for entry in self._entries.values() if not entry.used]
+            self._entries.clear()
+        for entry in unused:
+            entry.future.cancel()
+            metrics.inc("prefetch_total", tool=entry.tool_name, outcome="wasted")
+            if entry.future.done() and not entry.future.cancelled() and entry.counter_box:
+                metrics.inc("prefetch_wasted_reads_total", entry.counter_box[0].documents, tool=entry.tool_name)
+
+
+_current_prefetches: contextvars.ContextVar[Optional[PrefetchSet]] = contextvars.ContextVar("prefetches", default=None)
+
+
+@contextmanager
+def prefetch_for(role: str, user: User):
+    """
+    Starts the role's prefetch (if any) for the question answered inside this block,
+    and books unused prefetches as wasted when the block exits.
+    """
+    prefetches = PrefetchSet()
+    plan = PREFETCH_PLANS.get(role) if settings.PREFETCH_ENABLED else None
+    token = _current_prefetches.set(prefetches)
+    try:
+        if plan is not None:
+            tool_name, func, make_kwargs = plan
+            prefetches.start(tool_name, func, make_kwargs(user))
+        yield prefetches
+    finally:
+        _current_prefetches.reset(token)
+        prefetches.close()
+
+
+def use_prefetched(tool_name: str, func: Callable[..., Any], **kwargs: Any) -> Any:
+    """
+    For tool wrappers: returns the prefetched result of func(**kwargs) when this question
+    prefetched exactly that call (waiting for it if it is still running), else calls func.
+    """
+    prefetches = _current_prefetches.get()
+    entry = prefetches.take(tool_name, kwargs) if prefetches is not None else None
+    if entry is not None:
+        try:
+            return entry.future.result()
+        except Exception as e:
+            print(f"Prefetched {tool_name} failed ({e}); querying again.")
+    return func(**kwargs)
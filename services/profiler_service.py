@@ -0,0 +1,339 @@
+# In agentic-system/services/profiler_service.py
+
+import asyncio
+import collections
+import contextvars
+import functools
+import itertools
+import os
+import sys
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional
+
+from config import settings
+from services.metrics_service import metrics
+
+# ==============================================================================
+#  On-demand sampling profiler.
+#  When the service degrades we need to see where the time goes (Pydantic
+#  validation in the tools, LangChain output parsing, JSON encoding, the auth
+#  path) without redeploying. A sampler thread reads every thread's stack with
+#  sys._current_frames() at a fixed interval and counts the stacks in the
+#  "folded" format (one "frame;frame;frame count" line per stack), which
+#  flamegraph.pl, speedscope and inferno read directly.
+#
+#  Two ways to use it, both opt-in (PROFILER_ENABLED) and admins only:
+#    - POST /debug/profile?seconds=N samples the whole process for N seconds.
+#    - An admin's request sent with "X-Profile: 1" is profiled on its own: only samples
+#      of its asyncio tasks (and tasks they start) and of the worker threads
+#      running its sync tools count. The response carries X-Profile-Id; the
+#      result is read from GET /debug/profiles/{id}.
+#
+#  Samples are wall-clock: a thread blocked in a gRPC call counts as busy in
+#  that call. Threads that are only waiting for work (the idle event loop, idle
+#  pool workers) are left out. When nothing is being profiled nothing runs: no
+#  sampler thread, no task factory, and the middleware checks one setting.
+# ==============================================================================
+
+metrics.describe("profiles_total", "Profiles taken, by kind (process, request).")
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# The request being profiled, inherited by the tasks and executor calls it starts.
+_profile_session: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("profile_session", default=None)
+
+# Innermost frames of a thread that is waiting for work rather than doing any.
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+_PATH_PREFIXES = sorted({p for p in sys.path if p and os.path.isdir(p)} | {os.getcwd()}, key=len, reverse=True)
+
+
+@functools.lru_cache(maxsize=8192)
+def _label(code: Any) -> str:
+    # Keyed on the function's first line, so every sample of one function folds into one frame.
+    filename = code.co_filename
+    for prefix in _PATH_PREFIXES:
+        if filename.startswith(prefix + os.sep):
+            filename = filename[len(prefix) + 1:]
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _is_idle(frame: Any) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_LEAVES
+
+
+def _fold(frame: Any, root: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    labels.append(root)
+    return ";".join(reversed(labels))
+
+
+def _thread_context(frame: Any) -> Optional[contextvars.Context]:
+    """
+    The context a worker thread is running its current call in. Executor calls made by
+    LangChain, asyncio.to_thread and anyio all run as context.run(func), so the Context
+    sits in a 'run' frame near the bottom of the thread's stack.
+    """
+    while frame is not None:
+        if frame.f_code.co_name == "run":
+            local_vars = frame.f_locals
+            # anyio's WorkerThread.run
+            context = local_vars.get("context")
+            if isinstance(context, contextvars.Context):
+                return context
+            # concurrent.futures' _WorkItem.run, whose fn is partial(context.run, ...)
+            fn = getattr(local_vars.get("self"), "fn", None)
+            owner = getattr(getattr(fn, "func", None), "__self__", None)
+            if isinstance(owner, contextvars.Context):
+                return owner
+        frame = frame.f_back
+    return None
+
+
+class StackSampler:
+    """
+    Samples thread stacks on a background thread and counts them as folded stacks.
+
+    Args:
+        interval: Seconds between samples.
+        root_for: Called with (thread id, thread name, frame) for every thread; returns the
+            root frame label for the sample, or None to skip the thread.
+        include_idle: Count threads that are waiting for work (as '(idle)' stacks).
+    """
+
+    def __init__(self, interval: float, root_for: Callable[[int, str, Any], Optional[str]], include_idle: bool = False):
+        self.interval = interval
+        self.root_for = root_for
+        self.include_idle = include_idle
+        self.counts: collections.Counter = collections.Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self.stopped_at = time.monotonic()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                root = self.root_for(thread_id, names.get(thread_id, str(thread_id)), frame)
+                if root is None:
+                    continue
+                if _is_idle(frame):
+                    self.idle_samples += 1
+                    if not self.include_idle:
+                        continue
+                    self.counts[f"{root};(idle)"] += 1
+                else:
+                    self.counts[_fold(frame, root)] += 1
+                self.samples += 1
+
+    def folded(self) -> str:
+        """The samples in folded format, most frequent stacks first."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common()) + "\n"
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "duration_seconds": round(self.stopped_at - self.started_at, 3),
+            "interval_seconds": self.interval,
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "folded": self.folded(),
+        }
+
+
+class RequestProfile:
+    """One profiled request: its tasks on the event loop and the samples that belong to it."""
+
+    def __init__(self, profile_id: str, method: str, route: str, interval: float):
+        self.id = profile_id
+        self.method = method
+        self.route = route
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        # Filled in by the task factory; weak so finished tasks are not kept alive.
+        self.tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
+        self.sampler = StackSampler(interval, self._root_for)
+
+    def _root_for(self, thread_id: int, thread_name: str, frame: Any) -> Optional[str]:
+        if thread_id == self.loop_thread_id:
+            # Only while one of this request's tasks holds the loop; other requests interleave with it.
+            return "event-loop" if asyncio.current_task(self.loop) in self.tasks else None
+        context = _thread_context(frame)
+        if context is not None and context.get(_profile_session) is self:
+            return f"thread:{thread_name}"
+        return None
+
+
+class Profiler:
+    """Runs process-wide profiles and keeps the results of profiled requests."""
+
+    def __init__(self, interval: float, history: int, max_requests: int):
+        self.interval = interval
+        self.max_requests = max_requests
+        self.results: "collections.OrderedDict[str, Dict[str, Any]]" = collections.OrderedDict()
+        self.history = history
+        self._active: Dict[str, RequestProfile] = {}
+        self._ids = itertools.count(1)
+        self._process_lock = asyncio.Lock()
+        self._previous_factory: Any = None
+
+    @property
+    def process_profile_running(self) -> bool:
+        return self._process_lock.locked()
+
+    async def profile_process(self, seconds: float, include_idle: bool = False) -> Dict[str, Any]:
+        """Samples every thread for 'seconds'. Only one process profile runs at a time."""
+        async with self._process_lock:
+            sampler = StackSampler(self.interval, lambda thread_id, name, frame: f"thread:{name}", include_idle)
+            print(f"Profiling the whole process for {seconds:.1f} s.")
+            sampler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                sampler.stop()
+            metrics.inc("profiles_total", kind="process")
+            return sampler.result()
+
+    # --- Single requests ---
+
+    def begin_request(self, method: str, route: str) -> Optional[RequestProfile]:
+        """
+        Starts profiling the request running in the current task. Returns None when
+        PROFILER_MAX_CONCURRENT_REQUESTS requests are already being profiled.
+        """
+        if len(self._active) >= self.max_requests:
+            return None
+        session = RequestProfile(f"{os.getpid()}-{next(self._ids)}", method, route, self.interval)
+        if not self._active:
+            self._install_task_factory(session.loop)
+        self._active[session.id] = session
+        session.tasks.add(asyncio.current_task())
+        session.sampler.start()
+        return session
+
+    def finish_request(self, session: RequestProfile) -> None:
+        session.sampler.stop()
+        self._active.pop(session.id, None)
+        if not self._active:
+            self._remove_task_factory(session.loop)
+        self.results[session.id] = {"id": session.id, "method": session.method, "route": session.route, "finished_at": time.time(), **session.sampler.result()}
+        while len(self.results) > self.history:
+            self.results.popitem(last=False)
+        metrics.inc("profiles_total", kind="request")
+        print(f"Profiled {session.method} {session.route}: {session.sampler.samples} samples (profile {session.id}).")
+
+    def _install_task_factory(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Tasks started by a profiled request belong to it (gathered tool calls, the planner's calls).
+        previous = loop.get_task_factory()
+        self._previous_factory = previous
+
+        def factory(loop, coro, context=None):
+            if previous is not None:
+                task = previous(loop, coro) if context is None else previous(loop, coro, context=context)
+            else:
+                task = asyncio.Task(coro, loop=loop, context=context)
+            session = context.get(_profile_session) if context is not None else _profile_session.get()
+            if session is not None:
+                session.tasks.add(task)
+            return task
+
+        loop.set_task_factory(factory)
+
+    def _remove_task_factory(self, loop: asyncio.AbstractEventLoop) -> None:
+        loop.set_task_factory(self._previous_factory)
+        self._previous_factory = None
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """The kept request profiles (newest first), without their stacks."""
+        return [{key: value for key, value in result.items() if key != "folded"} for result in reversed(self.results.values())]
+
+
+profiler = Profiler(
+    interval=settings.PROFILER_INTERVAL_SECONDS,
+    history=settings.PROFILER_HISTORY,
+    max_requests=settings.PROFILER_MAX_CONCURRENT_REQUESTS,
+)
+
+
+async def _sent_by_admin(headers: Dict[bytes, bytes]) -> bool:
+    """True if the request's bearer token belongs to an admin; any failure counts as no."""
+    # Imported here so the sampler itself works without Firebase (see benchmarks/bench_profiler.py).
+    from services.auth_service import authenticate_token
+
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return False
+    try:
+        user, _ = await authenticate_token(token.strip())
+    except Exception:
+        return False
+    return "admin" in user.roles
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware that profiles HTTP requests sent with the X-Profile header by an admin.
+    The header is ignored for anyone else, so other callers cannot take up the profiling slots
+    or push admins' profiles out of the history. Does nothing (beyond one settings lookup)
+    unless PROFILER_ENABLED is set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not settings.PROFILER_ENABLED or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        header = headers.get(PROFILE_HEADER.lower().encode("latin-1"))
+        session = None
+        if header and header.decode("latin-1").strip().lower() not in ("0", "false", "no") and await _sent_by_admin(headers):
+            # The token is verified again by the endpoint; profiled requests are rare enough to pay twice.
+            session = profiler.begin_request(scope.get("method", ""), scope.get("path", ""))
+        if session is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers") or [])
+                headers.append((PROFILE_ID_HEADER.lower().encode("latin-1"), session.id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _profile_session.set(session)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            _profile_session.reset(token)
+            profiler.finish_request(session)
@@ -0,0 +1,425 @@
+# In agentic-system/services/read_accounting_service.py
+
+import asyncio
+import functools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+from google.cloud.firestore_v1.base_collection import BaseCollectionReference
+from google.cloud.firestore_v1.base_document import BaseDocumentReference
+from google.cloud.firestore_v1.base_query import BaseQuery
+
+from config import settings
+from services.deadline_service import check_deadline, deadline_expired, remaining_time
+from services.metrics_service import metrics
+
+# ==============================================================================
+#  Firestore bills per document read, so every read made through `firestore_db`
+#  is counted here: per request (route and role), per tool and per collection,
+#  in documents and estimated bytes. Each API request also gets a read budget;
+#  once it is used up, further streams stop early and the tool that was running
+#  returns what it has, flagged as truncated, instead of scanning on.
+# ==============================================================================
+
+metrics.describe("firestore_documents_read_total", "Firestore documents read, by route, role, tool and collection.")
+metrics.describe("firestore_bytes_read_total", "Estimated bytes of Firestore documents read, by route, role, tool and collection.")
+metrics.describe("firestore_documents_per_request", "Firestore documents read per API request, by route and role.")
+metrics.describe("firestore_read_budget_truncations_total", "Requests whose Firestore reads were cut off by the read budget or the request deadline, by reason.")
+metrics.describe("firestore_streams_cancelled_total", "Firestore streams stopped because their request was cancelled, by tool.")
+
+_NO_TOOL = "none"
+
+
+class ReadsCancelledError(Exception):
+    """Raised inside a Firestore stream whose request has been cancelled (e.g. the client disconnected)."""
+
+
+class ReadLedger:
+    """Collects the Firestore reads of one API request."""
+
+    def __init__(self, route: str, budget: Optional[int]):
+        self.route = route
+        self.role = "anonymous"
+        self.budget = budget or None
+        self.documents = 0
+        self.truncations = 0
+        self.truncation_reasons: set = set()
+        # Set when the work of this request is cancelled; tool threads stop reading at the next document.
+        self.cancelled = False
+        self._by_source: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def remaining(self) -> Optional[int]:
+        if self.budget is None:
+            return None
+        return max(self.budget - self.documents, 0)
+
+    def exhausted(self) -> bool:
+        return self.budget is not None and self.documents >= self.budget
+
+    def charge(self, tool: str, collection: str, documents: int, size: int) -> None:
+        with self._lock:
+            self.documents += documents
+            totals = self._by_source.setdefault((tool, collection), [0, 0])
+            totals[0] += documents
+            totals[1] += size
+
+    def note_truncation(self, reason: str = "budget") -> None:
+        with self._lock:
+            self.truncations += 1
+            self.truncation_reasons.add(reason)
+
+    def reads_by_tool(self) -> Dict[str, int]:
+        with self._lock:
+            totals: Dict[str, int] = {}
+            for (tool, _), (documents, _) in self._by_source.items():
+                totals[tool] = totals.get(tool, 0) + documents
+            return totals
+
+    def flush_metrics(self) -> None:
+        with self._lock:
+            sources = list(self._by_source.items())
+        for (tool, collection), (documents, size) in sources:
+            labels = {"route": self.route, "role": self.role, "tool": tool, "collection": collection}
+            metrics.inc("firestore_documents_read_total", documents, **labels)
+            if size:
+                metrics.inc("firestore_bytes_read_total", size, **labels)
+        metrics.observe("firestore_documents_per_request", self.documents, route=self.route, role=self.role)
+        for reason in self.truncation_reasons:
+            metrics.inc("firestore_read_budget_truncations_total", route=self.route, reason=reason)
+
+
+class ReadCounter:
+    """Counts the documents read inside one count_reads() block, independently of the ledger."""
+
+    def __init__(self):
+        self.documents = 0
+
+
+_current_ledger: ContextVar[Optional[ReadLedger]] = ContextVar("firestore_read_ledger", default=None)
+_read_counters: ContextVar[Tuple[ReadCounter, ...]] = ContextVar("firestore_read_counters", default=())
+_current_tool: ContextVar[str] = ContextVar("firestore_read_tool", default=_NO_TOOL)
+_budget_exempt: ContextVar[bool] = ContextVar("firestore_read_budget_exempt", default=False)
+
+
+def current_ledger() -> Optional[ReadLedger]:
+    return _current_ledger.get()
+
+
+def note_principal(role: str) -> None:
+    """Records the authenticated user's role on the current request's ledger."""
+    ledger = _current_ledger.get()
+    if ledger is not None:
+        ledger.role = role
+
+
+def disable_read_budget() -> None:
+    """Lifts the read budget for the rest of the current request (e.g. full exports)."""
+    ledger = _current_ledger.get()
+    if ledger is not None:
+        ledger.budget = None
+
+
+async def stop_reads_on_cancel(work: Awaitable[Any]) -> Any:
+    """
+    Awaits 'work' and, if it is cancelled, flags the current request's ledger so that Firestore
+    streams still running in tool threads (which asyncio cannot cancel) stop at their next document.
+    Wrap the work itself rather than the request handler, so that work shared with other
+    requests (idempotent retries) only stops when it is really cancelled.
+    """
+    try:
+        return await work
+    except asyncio.CancelledError:
+        ledger = _current_ledger.get()
+        if ledger is not None:
+            ledger.cancelled = True
+        raise
+
+
+@contextmanager
+def count_reads():
+    """Yields a ReadCounter of the documents read in this block (on this thread or task)."""
+    counter = ReadCounter()
+    token = _read_counters.set(_read_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _read_counters.reset(token)
+
+
+@contextmanager
+def exempt_from_read_budget():
+    """
+    Reads inside this block are counted but never truncated. Used for shared work such as
+    the entity dictionary, which is cached for everyone and must not be built from a partial scan.
+    """
+    token = _budget_exempt.set(True)
+    try:
+        yield
+    finally:
+        _budget_exempt.reset(token)
+
+
+def track_reads(tool_name: str) -> Callable:
+    """
+    Decorator for tool functions: attributes their reads to 'tool_name' and, if the read
+    budget cut one of their queries short, marks the returned dict as truncated.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            ledger = _current_ledger.get()
+            truncations_before = ledger.truncations if ledger is not None else 0
+            token = _current_tool.set(tool_name)
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                _current_tool.reset(token)
+            if ledger is not None and ledger.truncations > truncations_before and isinstance(result, dict):
+                result["truncated"] = True
+                if "deadline" in ledger.truncation_reasons:
+                    reason = "This request ran out of time while reading data, so the results are incomplete."
+                else:
+                    reason = f"This request reached its budget of {ledger.budget} Firestore document reads, so the results are incomplete."
+                result["truncation_reason"] = reason + " Ask a narrower question (a name, a period or a project type) for complete data."
+            return result
+        return wrapper
+    return decorator
+
+
+# --- Document Size Estimation ---
+# Follows Firestore's storage-size rules closely enough for cost attribution.
+
+def _value_size(value: Any) -> int:
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime, date)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode("utf-8")) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(k).encode("utf-8")) + 1 + _value_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(_value_size(v) for v in value)
+    if hasattr(value, "path"):
+        return len(value.path.encode("utf-8")) + 1
+    return 16  # GeoPoint and other fixed-size types
+
+
+def estimate_document_size(snapshot: Any) -> int:
+    # `_data` avoids the deep copy that to_dict() makes on every call.
+    data = getattr(snapshot, "_data", None)
+    if data is None:
+        data = snapshot.to_dict() if getattr(snapshot, "exists", False) else {}
+    name = getattr(getattr(snapshot, "reference", None), "path", "")
+    return len(name.encode("utf-8")) + 16 + _value_size(data or {}) + 32
+
+
+# --- Firestore Client Instrumentation ---
+
+def _collection_of(target: Any) -> str:
+    if isinstance(target, BaseCollectionReference):
+        return target.id
+    if isinstance(target, BaseDocumentReference):
+        return target.parent.id
+    parent = getattr(target, "_parent", None)
+    return getattr(parent, "id", "unknown")
+
+
+def _unwrap(value: Any) -> Any:
+    if isinstance(value, _Instrumented):
+        return value._target
+    if isinstance(value, dict):
+        return {k: _unwrap(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap(v) for v in value)
+    return value
+
+
+def _wrap(value: Any) -> Any:
+    if isinstance(value, (BaseQuery, BaseCollectionReference, BaseDocumentReference)):
+        return _Instrumented(value)
+    return value
+
+
+def _counted(snapshots: Iterator[Any], collection: Optional[str], enforce_budget: bool) -> Iterator[Any]:
+    """Yields snapshots while charging them to the current request (or straight to metrics)."""
+    ledger = _current_ledger.get()
+    tool = _current_tool.get()
+    enforce = enforce_budget and ledger is not None and not _budget_exempt.get()
+    counters = _read_counters.get()
+    count_bytes = settings.FIRESTORE_COUNT_BYTES
+    background: Dict[str, list] = {}
+    try:
+        for snapshot in snapshots:
+            if ledger is not None and ledger.cancelled:
+                metrics.inc("firestore_streams_cancelled_total", tool=tool)
+                raise ReadsCancelledError(f"The request was cancelled; stopped reading in tool '{tool}'.")
+            if enforce and ledger.exhausted():
+                ledger.note_truncation("budget")
+                print(f"Firestore read budget of {ledger.budget} documents reached in tool '{tool}'; truncating.")
+                return
+            if enforce and deadline_expired():
+                ledger.note_truncation("deadline")
+                print(f"Request deadline reached while reading in tool '{tool}'; truncating.")
+                return
+            name = collection or snapshot.reference.parent.id
+            size = estimate_document_size(snapshot) if count_bytes else 0
+            for counter in counters:
+                counter.documents += 1
+            if ledger is not None:
+                ledger.charge(tool, name, 1, size)
+            else:
+                totals = background.setdefault(name, [0, 0])
+                totals[0] += 1
+                totals[1] += size
+            yield snapshot
+    except Exception as e:
+        # The RPC timeout set from the request deadline surfaces as google.api_core's DeadlineExceeded.
+        if enforce and type(e).__name__ == "DeadlineExceeded" and deadline_expired():
+            ledger.note_truncation("deadline")
+            print(f"Request deadline reached while reading in tool '{tool}'; truncating.")
+            return
+        raise
+    finally:
+        close = getattr(snapshots, "close", None)
+        if close is not None:
+            close()
+        # Reads outside an API request (startup, background jobs) go straight to the metrics.
+        for name, (documents, size) in background.items():
+            labels = {"route": "background", "role": "system", "tool": tool, "collection": name}
+            metrics.inc("firestore_documents_read_total", documents, **labels)
+            if size:
+                metrics.inc("firestore_bytes_read_total", size, **labels)
+
+
+def _with_deadline(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Adds the time left before the request deadline as the RPC timeout (unless one was given)."""
+    remaining = remaining_time()
+    if remaining is None or "timeout" in kwargs:
+        return kwargs
+    # An already expired deadline still gets a tiny timeout; the stream then truncates itself.
+    return {**kwargs, "timeout": max(remaining, 0.01)}
+
+
+class _Instrumented:
+    """
+    Transparent proxy around a Firestore client, collection, query or document reference.
+    Builder methods (where, order_by, limit, document, ...) return proxies again, and the
+    methods that actually read (stream, get, get_all) count what they return.
+    """
+
+    __slots__ = ("_target",)
+
+    def __init__(self, target: Any):
+        self._target = target
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if name == "stream":
+            return self._stream
+        if name == "get":
+            return self._get
+        if name == "get_all":
+            return self._get_all
+        if not callable(attr):
+            return _wrap(attr)  # e.g. DocumentReference.parent
+
+        def call(*args, **kwargs):
+            return _wrap(attr(*_unwrap(args), **_unwrap(kwargs)))
+        return call
+
+    def __eq__(self, other: Any) -> bool:
+        return self._target == _unwrap(other)
+
+    def __hash__(self) -> int:
+        return hash(self._target)
+
+    def __repr__(self) -> str:
+        return f"Instrumented({self._target!r})"
+
+    def _limited_target(self) -> Any:
+        """Caps the query at the remaining budget (+1 to detect truncation) so the server stops early."""
+        target = self._target
+        ledger = _current_ledger.get()
+        if ledger is None or _budget_exempt.get() or isinstance(target, BaseDocumentReference):
+            return target
+        remaining = ledger.remaining()
+        if remaining is None or getattr(target, "_limit_to_last", False):
+            return target
+        current_limit = getattr(target, "_limit", None)
+        if current_limit is None or current_limit > remaining + 1:
+            return target.limit(remaining + 1)
+        return target
+
+    def _stream(self, *args, **kwargs) -> Iterator[Any]:
+        target = self._limited_target()
+        return _counted(target.stream(*_unwrap(args), **_with_deadline(_unwrap(kwargs))), _collection_of(self._target), enforce_budget=True)
+
+    def _get(self, *args, **kwargs) -> Any:
+        if isinstance(self._target, BaseDocumentReference):
+            # A single-document read is always billed as one read, even if it does not exist.
+            check_deadline("a Firestore document read")
+            snapshot = self._target.get(*_unwrap(args), **_with_deadline(_unwrap(kwargs)))
+            list(_counted(iter([snapshot]), _collection_of(self._target), enforce_budget=False))
+            return snapshot
+        if isinstance(self._target, (BaseQuery, BaseCollectionReference)):
+            return list(self._stream(*args, **kwargs))
+        return self._target.get(*_unwrap(args), **_unwrap(kwargs))
+
+    def _get_all(self, references, *args, **kwargs) -> Iterator[Any]:
+        snapshots = self._target.get_all(_unwrap(list(references)), *_unwrap(args), **_with_deadline(_unwrap(kwargs)))
+        return _counted(snapshots, None, enforce_budget=True)
+
+
+def instrument_client(client: Any) -> Any:
+    """Wraps a google.cloud.firestore.Client so that all reads made through it are accounted."""
+    return _Instrumented(client)
+
+
+# --- Request Middleware ---
+
+@contextmanager
+def request_ledger(route: str, role: Optional[str] = None):
+    """
+    Opens a ReadLedger for one unit of work (an HTTP request, or one question on a WebSocket)
+    and publishes its totals when the block exits.
+    """
+    ledger = ReadLedger(route=route, budget=settings.FIRESTORE_READ_BUDGET)
+    if role:
+        ledger.role = role
+    token = _current_ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _current_ledger.reset(token)
+        ledger.flush_metrics()
+
+
+class ReadAccountingMiddleware:
+    """
+    Pure ASGI middleware (so streaming responses are still inside the request when they read)
+    that gives every HTTP request its own ReadLedger and publishes its totals when it ends.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with request_ledger("unmatched") as ledger:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                # The router stores the matched route in the scope; use its template to keep labels bounded.
+                route = scope.get("route")
+                if route is not None:
+                    ledger.route = getattr(route, "path", ledger.route)
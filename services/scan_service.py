@@ -0,0 +1,256 @@
+# In agentic-system/services/scan_service.py
+
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Type
+
+from config import settings
+from services.answer_cache_service import collection_versions
+from services.cache_service import get_cache
+from services.firestore_service import field_paths, firestore_db
+from services.metrics_service import metrics
+from services.read_accounting_service import exempt_from_read_budget, track_reads
+
+# ==============================================================================
+#  One pass over the shared collections per refresh window.
+#  The all-staff, all-village and all-budget summaries (and the entity
+#  dictionary) each used to scan VVDProjects and VVDActivity on their own, so
+#  a dashboard asking for all of them read every collection several times.
+#  The scan engine reads each collection once, feeds every document to the
+#  registered aggregators and caches their results together. A new summary is
+#  a new Aggregator subclass: it adds fields to the scan, not another scan.
+#
+#  The cache key includes the collections' version stamps (see
+#  answer_cache_service), so a change starts a fresh scan once the versions
+#  have been polled; without stamps the results are trusted for SCAN_REFRESH_SECONDS.
+# ==============================================================================
+
+metrics.describe("shared_scans_total", "Full scans run by the shared scan engine.")
+metrics.describe("shared_scan_documents", "Documents read per shared scan, by collection.")
+metrics.describe("shared_scan_lookups_total", "Aggregate lookups served by the shared scan engine, by aggregate and result (hit, scan, unavailable).")
+
+
+def as_list(value: Any) -> List[Any]:
+    # Form fields may hold a single value or a list of them.
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class Aggregator:
+    """
+    Base class for a summary computed from the shared scan.
+    Subclasses set 'name' and 'fields' (collection -> field paths they read); a fresh
+    instance is created for every scan, so instances can keep their state in attributes.
+    """
+
+    name: str = ""
+    fields: Dict[str, List[str]] = {}
+
+    def add(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def result(self) -> Any:
+        """The finished aggregate. It is cached (and possibly pickled), so use plain types."""
+        raise NotImplementedError
+
+
+class ScanEngine:
+    """Runs the shared scan for all registered aggregators and caches their results."""
+
+    def __init__(self, refresh_seconds: float):
+        self._aggregators: Dict[str, Type[Aggregator]] = {}
+        self._cache = get_cache("shared_scans", default_ttl=refresh_seconds, max_entries=4)
+
+    def register(self, aggregator: Type[Aggregator]) -> Type[Aggregator]:
+        """Adds an aggregator to every future scan. Usable as a class decorator."""
+        self._aggregators[aggregator.name] = aggregator
+        return aggregator
+
+    def _fields_by_collection(self) -> Dict[str, Set[str]]:
+        fields: Dict[str, Set[str]] = defaultdict(set)
+        for aggregator in self._aggregators.values():
+            for collection, names in aggregator.fields.items():
+                fields[collection].update(names)
+        return fields
+
+    def _cache_key(self) -> str:
+        collections = sorted(self._fields_by_collection())
+        stamp = collection_versions.stamp(collections) or "-"
+        return f"scan:{','.join(sorted(self._aggregators))}:{stamp}"
+
+    @track_reads("shared_scan")
+    def _scan(self) -> Dict[str, Any]:
+        print(f"Running shared scan for aggregates: {', '.join(sorted(self._aggregators))}")
+        aggregators = [aggregator() for aggregator in self._aggregators.values()]
+        # The results are shared by every request, so they must never come from a truncated scan.
+        with exempt_from_read_budget():
+            for collection, fields in sorted(self._fields_by_collection().items()):
+                subscribers = [a for a in aggregators if collection in a.fields]
+                documents = 0
+                for doc in firestore_db.collection(collection).select(field_paths(sorted(fields))).stream():
+                    data = doc.to_dict() or {}
+                    documents += 1
+                    for aggregator in subscribers:
+                        aggregator.add(collection, doc.id, data)
+                metrics.observe("shared_scan_documents", documents, collection=collection)
+        metrics.inc("shared_scans_total")
+        return {"scanned_at": time.time(), "aggregates": {a.name: a.result() for a in aggregators}}
+
+    def get(self, name: str) -> Any:
+        """
+        Returns the aggregate 'name', scanning first if there is no current scan.
+        Concurrent misses in one process wait for a single scan.
+        """
+        key = self._cache_key()
+        scanned = self._cache.get(key)
+        result = "hit"
+        if scanned is None:
+            result = "scan"
+            scanned = self._cache.get_or_set(key, self._scan)
+        metrics.inc("shared_scan_lookups_total", aggregate=name, result=result)
+        return scanned["aggregates"][name]
+
+    def peek(self, name: str) -> Optional[Any]:
+        """Returns the aggregate 'name' only if a current scan exists (never scans); else None."""
+        scanned = self._cache.get(self._cache_key())
+        metrics.inc("shared_scan_lookups_total", aggregate=name, result="hit" if scanned is not None else "unavailable")
+        return scanned["aggregates"][name] if scanned is not None else None
+
+
+scan_engine = ScanEngine(settings.SCAN_REFRESH_SECONDS)
+
+
+# --- Aggregators ---
+# The key rules below are the same as the tools' queries for a single key, so a summary
+# answers a question the same way whether it comes from the scan or from Firestore.
+
+def staff_keys(data: Dict[str, Any]) -> List[str]:
+    """The staff member of a document, as matched by where("Assigned to", "==", name)."""
+    value = data.get("Assigned to")
+    return [value] if isinstance(value, str) else []
+
+
+def village_keys(data: Dict[str, Any]) -> List[Any]:
+    """The villages of a document: 'Village' if set, else the 'Villages' list."""
+    return as_list(data.get("Village") or data.get("Villages"))
+
+
+def beneficiary_keys(data: Dict[str, Any]) -> List[Any]:
+    """
+    The beneficiaries of a document, as matched by where("Beneficiary", "==", name)
+    (a single value) and where("Beneficiaries", "array-contains", name) (a list).
+    """
+    single, plural = data.get("Beneficiary"), data.get("Beneficiaries")
+    return ([single] if not isinstance(single, list) else []) + (plural if isinstance(plural, list) else [])
+
+
+def _names_by_key(key_fields: List[str], keys_of: Callable[[Dict[str, Any]], Iterable[Any]]) -> Type[Aggregator]:
+    """Builds the body of an aggregator grouping project and activity names by a form field."""
+
+    class _NamesByKey(Aggregator):
+        fields = {
+            "VVDProjects": key_fields + ["Project Name"],
+            "VVDActivity": key_fields + ["subFormName"],
+        }
+
+        def __init__(self):
+            self.summary: Dict[str, Dict[str, List[str]]] = defaultdict(lambda: {"projects": [], "activities": []})
+
+        def add(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+            # A document may use the singular and the plural field; count it once per key.
+            keys = {key for key in keys_of(data) if key and isinstance(key, str)}
+            if collection == "VVDProjects":
+                bucket, name = "projects", data.get("Project Name", "Unnamed Project")
+            else:
+                bucket, name = "activities", data.get("subFormName", "Unnamed Activity")
+            for key in keys:
+                self.summary[key][bucket].append(name)
+
+        def result(self) -> Dict[str, Dict[str, List[str]]]:
+            return dict(self.summary)
+
+    return _NamesByKey
+
+
+@scan_engine.register
+class StaffAggregator(_names_by_key(["Assigned to"], staff_keys)):
+    """Project and activity names per 'Assigned to' staff member."""
+    name = "by_staff"
+
+
+@scan_engine.register
+class VillageAggregator(_names_by_key(["Village", "Villages"], village_keys)):
+    """Project and activity names per village."""
+    name = "by_village"
+
+
+@scan_engine.register
+class BeneficiaryAggregator(_names_by_key(["Beneficiary", "Beneficiaries"], beneficiary_keys)):
+    """Project and activity names per beneficiary."""
+    name = "by_beneficiary"
+
+
+@scan_engine.register
+class ProjectTypeAggregator(Aggregator):
+    """
+    Project IDs and names per 'projectType'. Project documents have no type of their
+    own (see VVDProject); a project has the types of its activities.
+    """
+    name = "by_project_type"
+    fields = {
+        "VVDActivity": ["projectType", "projectId"],
+        "VVDProjects": ["Project Name"],
+    }
+
+    def __init__(self):
+        self.project_ids: Dict[str, Set[str]] = defaultdict(set)
+        self.names: Dict[str, str] = {}
+
+    def add(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        if collection == "VVDProjects":
+            self.names[doc_id] = data.get("Project Name", "Unknown Project")
+            return
+        project_type, project_id = data.get("projectType"), data.get("projectId")
+        if project_type and isinstance(project_type, str) and project_id:
+            self.project_ids[project_type].add(project_id)
+
+    def result(self) -> Dict[str, Dict[str, str]]:
+        return {
+            project_type: {pid: self.names.get(pid, "Unknown Project") for pid in sorted(ids)}
+            for project_type, ids in self.project_ids.items()
+        }
+
+
+@scan_engine.register
+class ProjectNameAggregator(Aggregator):
+    """Project name per project ID."""
+    name = "project_names"
+    fields = {"VVDProjects": ["Project Name"]}
+
+    def __init__(self):
+        self.names: Dict[str, str] = {}
+
+    def add(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        self.names[doc_id] = data.get("Project Name", "Unknown Project")
+
+    def result(self) -> Dict[str, str]:
+        return self.names
+
+
+@scan_engine.register
+class ProjectBudgetAggregator(Aggregator):
+    """The project-level budgets (activityId explicitly null), in document order."""
+    name = "project_budgets"
+    fields = {"vvdbudget": ["projectId", "activityId", "amount"]}
+
+    def __init__(self):
+        self.rows: List[Dict[str, Any]] = []
+
+    def add(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        # Same rule as the where("activityId", "==", None) query: a missing field does not match.
+        if "activityId" in data and data["activityId"] is None:
+            self.rows.append({"projectId": data.get("projectId"), "amount": data.get("amount", 0)})
+
+    def result(self) -> List[Dict[str, Any]]:
+        return self.rows
@@ -0,0 +1,95 @@
+# In agentic-system/services/serialization_service.py
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt, but keep the service usable without it.
+    orjson = None
+
+# ==============================================================================
+#  One place that turns Python objects into compact, stable JSON.
+#  Tool results are fed to the LLM as observations and large summaries are
+#  returned to clients, so both paths should pay for serialisation only once
+#  and produce the same bytes for the same data (sorted keys, no whitespace).
+# ==============================================================================
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    """
+    Converts the non-JSON types we meet in Firestore data.
+    Firestore returns timestamps as a datetime subclass, which orjson does not accept directly.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if hasattr(value, "path"):
+        # DocumentReference and similar Firestore handles.
+        return value.path
+    if hasattr(value, "latitude") and hasattr(value, "longitude"):
+        return {"latitude": value.latitude, "longitude": value.longitude}
+    return str(value)
+
+
+def dumps(value: Any) -> bytes:
+    """Serialises 'value' to compact UTF-8 JSON bytes with sorted keys."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(value, default=_default, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def dumps_str(value: Any) -> str:
+    """Same as dumps(), returned as a str for places that need text (e.g. prompts)."""
+    return dumps(value).decode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """Parses JSON produced by dumps() (bytes or str)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def to_observation(result: Any) -> str:
+    """
+    Formats a tool result for the agent's scratchpad.
+    Without this, LangChain falls back to str(dict), which is longer than JSON
+    (quotes, spaces, 'None') and is not something the LLM can reliably parse back.
+    """
+    if isinstance(result, str):
+        return result
+    return dumps_str(result)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for Gemini-style tokenisers (about four characters per token)."""
+    return estimate_tokens_for_length(len(text))
+
+
+def estimate_tokens_for_length(length: int) -> int:
+    """Same as estimate_tokens(), for a text of which only the length is known."""
+    return (length + 3) // 4
+
+
+# --- HTTP Responses ---
+# FastAPI's default JSONResponse uses the stdlib encoder with whitespace. This class is installed
+# as the app's default response class in main.py so every JSON endpoint goes through dumps().
+
+class CompactJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
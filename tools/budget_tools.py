@@ -2,22 +2,55 @@
 # In agentic-system/tools/budget_tools.py
 
 from typing import Dict, Any, Optional
-from services.firestore_service import firestore_db
+from services.firestore_service import field_paths, firestore_db
+from services.read_accounting_service import track_reads
 from models.project_models import VVDBudget, VVDRebate # Import our Pydantic models
+from services.decoding_service import decode_documents, decode_rows
+from services.scan_service import scan_engine
+from tools.query_filters import apply_filters, build_filters, describe_filters
 
-def get_financial_report(project_name: Optional[str] = None) -> Dict[str, Any]:
+# Firestore's "in" operator accepts at most 30 values per query.
+_IN_QUERY_CHUNK = 30
+
+
+def _is_project_budget(data: Dict[str, Any]) -> bool:
+    # Same rule as where("activityId", "==", None): an explicit null matches, a missing field does not.
+    return 'activityId' in data and data['activityId'] is None
+
+
+@track_reads("get_financial_report")
+def get_financial_report(
+    project_name: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    period: Optional[str] = None,
+    project_type: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
     """
     For Accountants. Provides a financial report.
     If 'project_name' is given, it details the budget, rebates, and expenses for that specific project.
     If 'project_name' is omitted, it returns a high-level summary of all project budgets.
+    The optional filters are applied in the Firestore query (see tools/query_filters.py);
+    'project_type' only narrows the all-projects summary.
     
     Args:
         project_name (Optional[str]): The name of the project to get a detailed report for.
+        start_date (Optional[str]): Only include budgets and rebates created on or after this date (YYYY-MM-DD).
+        end_date (Optional[str]): Only include budgets and rebates created on or before this date (YYYY-MM-DD).
+        period (Optional[str]): A relative window such as 'this_quarter', instead of explicit dates.
+        project_type (Optional[str]): Only summarise projects with this 'projectType'.
+        limit (Optional[int]): At most this many of the most recent budgets (and rebates).
 
     Returns:
         A dictionary containing the financial report.
     """
     print(f"Executing get_financial_report for project_name: '{project_name}'")
+    try:
+        filters = build_filters(start_date, end_date, period, project_type, limit)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
     try:
         if project_name:
             # --- Case 1: Detailed report for a single project ---
@@ -29,50 +62,108 @@ def get_financial_report(project_name: Optional[str] = None) -> Dict[str, Any]:
             
             project_id = project_docs[0].id
             
-            # Now fetch all financial documents related to this project_id
-            project_budget_q = firestore_db.collection('vvdbudget').where("projectId", "==", project_id).where("activityId", "==", None).stream()
-            activity_budgets_q = firestore_db.collection('vvdbudget').where("projectId", "==", project_id).stream()
-            rebates_q = firestore_db.collection('vvdrebate').where("projectId", "==", project_id).stream()
+            # Now fetch all financial documents related to this project_id.
+            # A single budget query covers both the project-level budget (activityId null)
+            # and the activity budgets, so every budget document is read and decoded once.
+            budgets_q = apply_filters(firestore_db.collection('vvdbudget').where("projectId", "==", project_id), filters, include_project_type=False).stream()
+            rebates_q = apply_filters(firestore_db.collection('vvdrebate').where("projectId", "==", project_id), filters, include_project_type=False).stream()
             # Note: Reimbursements are linked to activities, so a more complex query/aggregation would be needed for a full expense report.
             # For now, we focus on budgets and rebates.
             
             # Process results
-            project_budget_docs = list(project_budget_q)
-            project_budget = VVDBudget(id=project_budget_docs[0].id, **project_budget_docs[0].to_dict()).dict() if project_budget_docs else None
+            # Decoding fills a missing activityId with None, so the project-level budgets are picked
+            # from the raw data, with the same rule as where("activityId", "==", None).
+            # Each document is still read with to_dict() only once.
+            budget_rows, project_budget_ids = [], set()
+            for doc in budgets_q:
+                data = doc.to_dict() or {}
+                if _is_project_budget(data):
+                    project_budget_ids.add(doc.id)
+                data["id"] = doc.id
+                budget_rows.append(data)
+            budgets = decode_rows(budget_rows, VVDBudget)
+            project_budgets = [b for b in budgets if b['id'] in project_budget_ids]
+            project_budget = project_budgets[0] if project_budgets else None
             
             # Filter out the main project budget from the activity budgets list
-            activity_budgets = [
-                VVDBudget(id=doc.id, **doc.to_dict()).dict() for doc in activity_budgets_q if doc.to_dict().get('activityId')
-            ]
-            rebates = [VVDRebate(id=doc.id, **doc.to_dict()).dict() for doc in rebates_q]
+            activity_budgets = [b for b in budgets if b.get('activityId')]
+            rebates = decode_documents(rebates_q, VVDRebate)
 
             return {
                 "status": "success",
                 "project_name": project_name,
+                "filters": describe_filters(filters),
                 "project_budget": project_budget,
                 "activity_budgets": activity_budgets,
                 "rebates": rebates
             }
         else:
             # --- Case 2: High-level summary of all project budgets ---
-            all_budgets_q = firestore_db.collection('vvdbudget').where("activityId", "==", None).stream()
-            
-            budget_summary = []
-            for doc in all_budgets_q:
-                budget_data = doc.to_dict()
-                # We need to find the project name from the projectId
-                project_doc = firestore_db.collection('VVDProjects').document(budget_data.get('projectId')).get()
-                p_name = project_doc.to_dict().get("Project Name", "Unknown Project") if project_doc.exists else "Unknown Project"
-                
-                budget_summary.append({
-                    "project_name": p_name,
-                    "budget_amount": budget_data.get("amount", 0)
-                })
+            if not (filters["start"] or filters["end"] or filters["limit"]):
+                # Without a date window or limit the summary comes from the shared scan
+                # (see services/scan_service.py), narrowed to one project type if asked.
+                project_names = scan_engine.get("project_names")
+                budget_rows = scan_engine.get("project_budgets")
+                if filters["project_type"]:
+                    of_type = scan_engine.get("by_project_type").get(filters["project_type"])
+                    if not of_type:
+                        return {"status": "success", "message": f"No projects of type '{filters['project_type']}' found."}
+                    budget_rows = [row for row in budget_rows if row.get("projectId") in of_type]
+                budget_summary = [
+                    {
+                        "project_name": project_names.get(row.get("projectId"), "Unknown Project"),
+                        "budget_amount": row.get("amount", 0)
+                    }
+                    for row in budget_rows
+                ]
+                if not budget_summary:
+                    return {"status": "success", "message": "No project-level budgets found."}
+                return {"status": "success", "filters": describe_filters(filters), "all_project_budgets": budget_summary}
+
+            budgets_query = firestore_db.collection('vvdbudget').where("activityId", "==", None)
+            project_names = {}
+
+            if filters["project_type"]:
+                # Budgets do not carry the project type, and neither do project documents; activities
+                # do. So first find the projects with activities of that type, then fetch only their
+                # budgets with "in" queries.
+                type_query = firestore_db.collection('VVDActivity').where("projectType", "==", filters["project_type"])
+                project_ids = sorted({(doc.to_dict() or {}).get("projectId") for doc in type_query.select(field_paths(["projectId"])).stream()} - {None})
+                if not project_ids:
+                    return {"status": "success", "message": f"No projects of type '{filters['project_type']}' found."}
+
+                budget_rows = []
+                for i in range(0, len(project_ids), _IN_QUERY_CHUNK):
+                    chunk_query = budgets_query.where("projectId", "in", project_ids[i:i + _IN_QUERY_CHUNK])
+                    budget_rows.extend(doc.to_dict() or {} for doc in apply_filters(chunk_query, filters, include_project_type=False).stream())
+                if filters["limit"]:
+                    # Each chunk was limited separately; keep the overall most recent ones.
+                    # (Ordering by createdAt means every returned budget has that field.)
+                    budget_rows.sort(key=lambda row: row["createdAt"], reverse=True)
+                    budget_rows = budget_rows[:filters["limit"]]
+            else:
+                budget_rows = [doc.to_dict() or {} for doc in apply_filters(budgets_query, filters, include_project_type=False).stream()]
+
+            # Look up the names of the remaining projects in one batched read instead of one get() per budget.
+            missing_ids = {row.get('projectId') for row in budget_rows if row.get('projectId')} - set(project_names)
+            if missing_ids:
+                project_refs = [firestore_db.collection('VVDProjects').document(pid) for pid in missing_ids]
+                for project_doc in firestore_db.get_all(project_refs, field_paths=field_paths(["Project Name"])):
+                    if project_doc.exists:
+                        project_names[project_doc.id] = (project_doc.to_dict() or {}).get("Project Name", "Unknown Project")
+
+            budget_summary = [
+                {
+                    "project_name": project_names.get(row.get('projectId'), "Unknown Project"),
+                    "budget_amount": row.get("amount", 0)
+                }
+                for row in budget_rows
+            ]
             
             if not budget_summary:
                 return {"status": "success", "message": "No project-level budgets found."}
 
-            return {"status": "success", "all_project_budgets": budget_summary}
+            return {"status": "success", "filters": describe_filters(filters), "all_project_budgets": budget_summary}
 
     except Exception as e:
         print(f"An error occurred in get_financial_report: {e}")
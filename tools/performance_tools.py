@@ -2,10 +2,14 @@
 
 from typing import Dict, Any, List, Optional
 from services.firestore_service import firestore_db
+from services.read_accounting_service import track_reads
+from services.scan_service import scan_engine, staff_keys
 from collections import defaultdict
+from tools.query_filters import PROJECT_FILTER_NOTE, apply_filters, build_filters, describe_filters, has_filters
 
 # --- Tool for the Staff Agent ---
 
+@track_reads("get_my_performance")
 def get_my_performance(user_id: str) -> Dict[str, Any]:
     """
     Gets a performance summary for the currently logged-in user.
@@ -56,25 +60,45 @@ def get_my_performance(user_id: str) -> Dict[str, Any]:
 
 # --- Tool for the Admin Agent ---
 
-def get_staff_performance(staff_name: Optional[str] = None) -> Dict[str, Any]:
+@track_reads("get_staff_performance")
+def get_staff_performance(
+    staff_name: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    period: Optional[str] = None,
+    project_type: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
     """
     For Admins. Gets a performance summary for a specific staff member or all staff members.
     If 'staff_name' is provided, it returns assignments for that person.
     If 'staff_name' is omitted, it returns a summary grouped by each staff member found.
+    The optional filters are applied to the activities query; project documents have no
+    'createdAt' or 'projectType', so projects are listed in full (see tools/query_filters.py).
 
     Args:
         staff_name (Optional[str]): The full name of the staff member to look up.
+        start_date (Optional[str]): Only include records created on or after this date (YYYY-MM-DD).
+        end_date (Optional[str]): Only include records created on or before this date (YYYY-MM-DD).
+        period (Optional[str]): A relative window such as 'this_quarter', instead of explicit dates.
+        project_type (Optional[str]): Only include activities with this 'projectType'.
+        limit (Optional[int]): At most this many of the most recent activities.
 
     Returns:
         A dictionary containing performance data.
     """
     print(f"Executing get_staff_performance for staff_name: '{staff_name}'")
+    try:
+        filters = build_filters(start_date, end_date, period, project_type, limit)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
     try:
         if staff_name:
             # --- Case 1: Get performance for a specific staff member ---
             print(f"Querying for specific staff: {staff_name}")
             projects_query = firestore_db.collection('VVDProjects').where("Assigned to", "==", staff_name).stream()
-            activities_query = firestore_db.collection('VVDActivity').where("Assigned to", "==", staff_name).stream()
+            activities_query = apply_filters(firestore_db.collection('VVDActivity').where("Assigned to", "==", staff_name), filters).stream()
             
             project_list = [p.to_dict().get("Project Name", "Unnamed Project") for p in projects_query]
             activity_list = [a.to_dict().get("subFormName", "Unnamed Activity") for a in activities_query]
@@ -85,36 +109,43 @@ def get_staff_performance(staff_name: Optional[str] = None) -> Dict[str, Any]:
             return {
                 "status": "success",
                 "staff_name": staff_name,
+                "filters": describe_filters(filters),
+                "note": PROJECT_FILTER_NOTE if has_filters(filters) else None,
                 "assigned_projects": project_list,
                 "assigned_activities": activity_list
             }
         else:
             # --- Case 2: Get a summary for all staff members ---
             print("Querying for all staff performance summary...")
+            if not has_filters(filters):
+                # The unfiltered summary comes from the shared scan (see services/scan_service.py).
+                summary_by_staff = scan_engine.get("by_staff")
+                if not summary_by_staff:
+                    return {"status": "success", "message": "No assignments found for any staff member."}
+                return {"status": "success", "filters": {}, "summary_by_staff": summary_by_staff}
+
             # defaultdict simplifies adding to lists for new keys
             performance_summary = defaultdict(lambda: {"projects": [], "activities": []})
 
-            all_projects = firestore_db.collection('VVDProjects').stream()
-            for doc in all_projects:
-                data = doc.to_dict()
-                assigned_to = data.get("Assigned to")
-                if assigned_to:
-                    project_name = data.get("Project Name", "Unnamed Project")
-                    performance_summary[assigned_to]["projects"].append(project_name)
+            # Projects are not filtered (see PROJECT_FILTER_NOTE), so they come from the shared scan.
+            for assigned_to, entry in scan_engine.get("by_staff").items():
+                if entry["projects"]:
+                    performance_summary[assigned_to]["projects"] = list(entry["projects"])
 
-            all_activities = firestore_db.collection('VVDActivity').stream()
+            all_activities = apply_filters(firestore_db.collection('VVDActivity'), filters).stream()
             for doc in all_activities:
                 data = doc.to_dict()
-                assigned_to = data.get("Assigned to")
-                if assigned_to:
-                    activity_name = data.get("subFormName", "Unnamed Activity")
-                    performance_summary[assigned_to]["activities"].append(activity_name)
+                # The same rule as the shared scan's by_staff, which lists the projects above.
+                for assigned_to in staff_keys(data):
+                    if assigned_to:
+                        activity_name = data.get("subFormName", "Unnamed Activity")
+                        performance_summary[assigned_to]["activities"].append(activity_name)
             
             if not performance_summary:
                 return {"status": "success", "message": "No assignments found for any staff member."}
 
             # Convert defaultdict to a regular dict for the final response
-            return {"status": "success", "summary_by_staff": dict(performance_summary)}
+            return {"status": "success", "filters": describe_filters(filters), "note": PROJECT_FILTER_NOTE, "summary_by_staff": dict(performance_summary)}
 
     except Exception as e:
         print(f"An error occurred in get_staff_performance: {e}")
@@ -3,28 +3,51 @@
 
 from typing import Dict, Any, Optional
 from services.firestore_service import firestore_db
+from services.read_accounting_service import track_reads
+from services.scan_service import scan_engine, village_keys
 from collections import defaultdict
+from tools.query_filters import PROJECT_FILTER_NOTE, apply_filters, build_filters, describe_filters, has_filters
 
-def get_data_by_village(village_name: Optional[str] = None) -> Dict[str, Any]:
+@track_reads("get_data_by_village")
+def get_data_by_village(
+    village_name: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    period: Optional[str] = None,
+    project_type: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
     """
     For Admins. Gets a summary of projects and activities for a specific village, or for all villages.
     If 'village_name' is provided, it returns a list of projects and activities for that village.
     If 'village_name' is omitted, it returns a summary grouped by each village found.
     This tool assumes that 'Village' is a field name in the dynamic data of projects and activities.
+    The optional filters are applied to the activities query; project documents have no
+    'createdAt' or 'projectType', so projects are listed in full (see tools/query_filters.py).
     
     Args:
         village_name (Optional[str]): The name of the village to look up.
+        start_date (Optional[str]): Only include records created on or after this date (YYYY-MM-DD).
+        end_date (Optional[str]): Only include records created on or before this date (YYYY-MM-DD).
+        period (Optional[str]): A relative window such as 'this_quarter', instead of explicit dates.
+        project_type (Optional[str]): Only include activities with this 'projectType'.
+        limit (Optional[int]): At most this many of the most recent activities.
 
     Returns:
         A dictionary containing project and activity data related to the village(s).
     """
     print(f"Executing get_data_by_village for village_name: '{village_name}'")
+    try:
+        filters = build_filters(start_date, end_date, period, project_type, limit)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
     try:
         if village_name:
             # --- Case 1: Get data for a specific village ---
             print(f"Querying for specific village: {village_name}")
             projects_query = firestore_db.collection('VVDProjects').where("Village", "==", village_name).stream()
-            activities_query = firestore_db.collection('VVDActivity').where("Village", "==", village_name).stream()
+            activities_query = apply_filters(firestore_db.collection('VVDActivity').where("Village", "==", village_name), filters).stream()
             
             project_list = [p.to_dict().get("Project Name", "Unnamed Project") for p in projects_query]
             activity_list = [a.to_dict().get("subFormName", "Unnamed Activity") for a in activities_query]
@@ -35,49 +58,48 @@ def get_data_by_village(village_name: Optional[str] = None) -> Dict[str, Any]:
             return {
                 "status": "success",
                 "village_name": village_name,
+                "filters": describe_filters(filters),
+                "note": PROJECT_FILTER_NOTE if has_filters(filters) else None,
                 "projects": project_list,
                 "activities": activity_list
             }
         else:
             # --- Case 2: Get a summary for all villages ---
             print("Querying for all village data summary...")
+            if not has_filters(filters):
+                # The unfiltered summary comes from the shared scan (see services/scan_service.py).
+                summary_by_village = scan_engine.get("by_village")
+                if not summary_by_village:
+                    return {"status": "success", "message": "No village data found in any projects or activities."}
+                return {"status": "success", "filters": {}, "summary_by_village": summary_by_village}
+
             village_summary = defaultdict(lambda: {"projects": [], "activities": []})
 
-            all_projects = firestore_db.collection('VVDProjects').stream()
-            for doc in all_projects:
-                data = doc.to_dict()
-                # Your forms might save a single village or a list of them
-                villages = data.get("Village") or data.get("Villages", [])
-                if not isinstance(villages, list):
-                    villages = [villages] # Handle single string case
-                
-                for v_name in villages:
-                    if v_name:
-                        project_name = data.get("Project Name", "Unnamed Project")
-                        village_summary[v_name]["projects"].append(project_name)
-
-            all_activities = firestore_db.collection('VVDActivity').stream()
+            # Projects are not filtered (see PROJECT_FILTER_NOTE), so they come from the shared scan.
+            for v_name, entry in scan_engine.get("by_village").items():
+                if entry["projects"]:
+                    village_summary[v_name]["projects"] = list(entry["projects"])
+
+            all_activities = apply_filters(firestore_db.collection('VVDActivity'), filters).stream()
             for doc in all_activities:
                 data = doc.to_dict()
-                villages = data.get("Village") or data.get("Villages", [])
-                if not isinstance(villages, list):
-                    villages = [villages]
-                
-                for v_name in villages:
-                    if v_name:
+                # The same rule as the shared scan's by_village, which lists the projects above.
+                for v_name in set(village_keys(data)):
+                    if v_name and isinstance(v_name, str):
                         activity_name = data.get("subFormName", "Unnamed Activity")
                         village_summary[v_name]["activities"].append(activity_name)
             
             if not village_summary:
                 return {"status": "success", "message": "No village data found in any projects or activities."}
 
-            return {"status": "success", "summary_by_village": dict(village_summary)}
+            return {"status": "success", "filters": describe_filters(filters), "note": PROJECT_FILTER_NOTE, "summary_by_village": dict(village_summary)}
 
     except Exception as e:
         print(f"An error occurred in get_data_by_village: {e}")
         return {"status": "error", "message": "An internal error occurred while fetching village data."}
 
 
+@track_reads("get_projects_by_beneficiary")
 def get_projects_by_beneficiary(beneficiary_name: str) -> Dict[str, Any]:
     """
     Finds all projects and activities associated with a specific beneficiary name.
@@ -91,8 +113,21 @@ def get_projects_by_beneficiary(beneficiary_name: str) -> Dict[str, Any]:
     """
     print(f"Executing get_projects_by_beneficiary for: '{beneficiary_name}'")
     try:
-        # Note: Firestore's "==" query on an array field checks if the value exists in the array.
-        # This is powerful. We check for 'Beneficiary' (single) and 'Beneficiaries' (plural).
+        # When a shared scan is current, answer from it; a single beneficiary is not worth starting one.
+        summary_by_beneficiary = scan_engine.peek("by_beneficiary")
+        if summary_by_beneficiary is not None:
+            related = summary_by_beneficiary.get(beneficiary_name)
+            if not related:
+                return {"status": "success", "message": f"No projects or activities found for beneficiary '{beneficiary_name}'."}
+            return {
+                "status": "success",
+                "beneficiary_name": beneficiary_name,
+                "related_projects": list(set(related["projects"])),
+                "related_activities": list(set(related["activities"])),
+            }
+
+        # 'Beneficiary' (single) is matched with "==" and 'Beneficiaries' (plural) with
+        # "array-contains", the same rule as the scan's by_beneficiary (see beneficiary_keys).
         projects_q1 = firestore_db.collection('VVDProjects').where("Beneficiary", "==", beneficiary_name).stream()
         projects_q2 = firestore_db.collection('VVDProjects').where("Beneficiaries", "array-contains", beneficiary_name).stream()
         
@@ -104,7 +139,7 @@ def get_projects_by_beneficiary(beneficiary_name: str) -> Dict[str, Any]:
         project_names.update({p.to_dict().get("Project Name", "Unnamed Project") for p in projects_q2})
         
         activity_names = {a.to_dict().get("subFormName", "Unnamed Activity") for a in activities_q1}
-        activity_names.update({a.to_to_dict().get("subFormName", "Unnamed Activity") for a in activities_q2})
+        activity_names.update({a.to_dict().get("subFormName", "Unnamed Activity") for a in activities_q2})
 
         if not project_names and not activity_names:
             return {"status": "success", "message": f"No projects or activities found for beneficiary '{beneficiary_name}'."}
@@ -0,0 +1,156 @@
+# In agentic-system/tools/query_filters.py
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Literal, Optional, Tuple, get_args
+
+from google.cloud import firestore
+from pydantic import BaseModel, Field
+
+# ==============================================================================
+#  Optional filters shared by the admin and accountant tools.
+#  Admins mostly ask about "this quarter" or one project type, so the tools
+#  accept a date window, a projectType and a result limit and push them into
+#  the Firestore query instead of scanning everything and filtering in prose.
+#  The composite indexes these queries need are in firestore.indexes.json.
+# ==============================================================================
+
+# Relative periods the LLM can pass instead of computing dates itself
+# (the agents are not told today's date).
+Period = Literal["today", "this_week", "this_month", "last_month", "this_quarter", "last_quarter", "this_year", "last_year", "last_30_days", "last_90_days"]
+PERIODS = get_args(Period)
+
+MAX_LIMIT = 500
+
+
+class QueryFilterInput(BaseModel):
+    """
+    The optional filter fields shared by the agents' tool input schemas.
+    Agent schemas inherit from this so the LLM sees the same parameters on every tool.
+    """
+    period: Optional[Period] = Field(None, description="A relative time window, e.g. 'this_quarter' or 'last_month'. Prefer this over explicit dates.")
+    start_date: Optional[str] = Field(None, description="Only include records created on or after this date (YYYY-MM-DD).")
+    end_date: Optional[str] = Field(None, description="Only include records created on or before this date (YYYY-MM-DD).")
+    project_type: Optional[str] = Field(None, description="Only include records with this project type.")
+    limit: Optional[int] = Field(None, ge=1, le=MAX_LIMIT, description="Return at most this many of the most recent records.")
+
+
+def _parse_date(value: str, field: str) -> datetime:
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        raise ValueError(f"'{field}' must be a date in YYYY-MM-DD format, got '{value}'.")
+    # Firestore timestamps are timezone-aware; treat naive input as UTC.
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _quarter_start(moment: datetime) -> datetime:
+    return moment.replace(month=3 * ((moment.month - 1) // 3) + 1, day=1)
+
+
+def resolve_period(period: str, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """Turns a relative period name into a [start, end) pair of UTC datetimes."""
+    now = now or datetime.now(timezone.utc)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "today":
+        return today, today + timedelta(days=1)
+    if period == "this_week":
+        start = today - timedelta(days=today.weekday())
+        return start, start + timedelta(days=7)
+    if period == "this_month":
+        start = today.replace(day=1)
+        return start, (start + timedelta(days=32)).replace(day=1)
+    if period == "last_month":
+        end = today.replace(day=1)
+        return (end - timedelta(days=1)).replace(day=1), end
+    if period == "this_quarter":
+        start = _quarter_start(today)
+        return start, _quarter_start(start + timedelta(days=95))
+    if period == "last_quarter":
+        end = _quarter_start(today)
+        return _quarter_start(end - timedelta(days=1)), end
+    if period == "this_year":
+        start = today.replace(month=1, day=1)
+        return start, start.replace(year=start.year + 1)
+    if period == "last_year":
+        end = today.replace(month=1, day=1)
+        return end.replace(year=end.year - 1), end
+    if period == "last_30_days":
+        return today - timedelta(days=29), today + timedelta(days=1)
+    if period == "last_90_days":
+        return today - timedelta(days=89), today + timedelta(days=1)
+    raise ValueError(f"Unknown period '{period}'. Use one of: {', '.join(PERIODS)}.")
+
+
+def build_filters(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    period: Optional[str] = None,
+    project_type: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Validates the optional tool filters and normalises them.
+    Raises ValueError with a message suitable for returning to the agent.
+
+    Returns:
+        A dict with 'start' and 'end' (UTC datetimes, end exclusive, either may be None),
+        'project_type' and 'limit'.
+    """
+    start = end = None
+    if period:
+        start, end = resolve_period(period)
+    if start_date:
+        start = _parse_date(start_date, "start_date")
+    if end_date:
+        end = _parse_date(end_date, "end_date")
+        if len(end_date.strip()) <= 10:
+            # A plain date is inclusive: include everything created on that day.
+            end += timedelta(days=1)
+    if start and end and start >= end:
+        raise ValueError("'start_date' must be before 'end_date'.")
+    if limit is not None and not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"'limit' must be between 1 and {MAX_LIMIT}.")
+    return {"start": start, "end": end, "project_type": project_type or None, "limit": limit}
+
+
+def has_filters(filters: Dict[str, Any]) -> bool:
+    return any(filters.get(key) for key in ("start", "end", "project_type", "limit"))
+
+
+# Project documents come straight from the form builder and carry neither 'createdAt' nor
+# 'projectType' (see VVDProject); filtering or ordering on a missing field drops the document.
+PROJECT_FILTER_NOTE = "Filters apply to activities; projects have no creation date or type, so they are listed in full."
+
+
+def apply_filters(query, filters: Dict[str, Any], include_project_type: bool = True):
+    """
+    Adds the filters to a Firestore query. When a date window or a limit is present the
+    results are ordered newest first, so a limit keeps the most recent records.
+    Only for collections whose documents have 'createdAt' (and 'projectType', unless
+    include_project_type is False): activities, budgets and rebates, not projects.
+    """
+    if include_project_type and filters.get("project_type"):
+        query = query.where("projectType", "==", filters["project_type"])
+    if filters.get("start"):
+        query = query.where("createdAt", ">=", filters["start"])
+    if filters.get("end"):
+        query = query.where("createdAt", "<", filters["end"])
+    if filters.get("start") or filters.get("end") or filters.get("limit"):
+        query = query.order_by("createdAt", direction=firestore.Query.DESCENDING)
+    if filters.get("limit"):
+        query = query.limit(filters["limit"])
+    return query
+
+
+def describe_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """The applied filters in a JSON-friendly form, echoed back in tool results."""
+    described = {}
+    if filters.get("start"):
+        described["from"] = filters["start"].date().isoformat()
+    if filters.get("end"):
+        described["until"] = (filters["end"] - timedelta(microseconds=1)).date().isoformat()
+    if filters.get("project_type"):
+        described["project_type"] = filters["project_type"]
+    if filters.get("limit"):
+        described["limit"] = filters["limit"]
+    return described